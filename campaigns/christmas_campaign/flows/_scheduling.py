@@ -0,0 +1,304 @@
+"""
+Shared scheduling helpers for Christmas Campaign handler flows.
+
+The no-show, onboarding and post-call handlers all schedule follow-up emails
+as flow runs of the send-email deployment. This module holds the per-process
+caches they share so each handler avoids repeating Prefect API lookups, and
+the 3-email batch scheduler used by the onboarding and post-call handlers.
+It also holds the Template Type lookup the handlers use to spot an existing
+sequence of their own kind.
+
+Author: Christmas Campaign Team
+Created: 2025-11-27
+"""
+
+from prefect.blocks.system import Secret
+from prefect.client.orchestration import get_client
+from prefect.states import Scheduled
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from uuid import UUID
+import asyncio
+import os
+import time
+
+# uvloop ships with uvicorn[standard] on Linux/macOS; fall back to the stdlib
+# loop where it is unavailable (e.g. Windows)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Python 3.12+ can start tasks eagerly: a coroutine runs inline until its first
+# real suspension, so cache hits never get scheduled on the loop at all
+_EAGER_TASK_FACTORY = getattr(asyncio, "eager_task_factory", None)
+
+# Deployment used to send each scheduled email
+SEND_EMAIL_DEPLOYMENT_NAME = "christmas-send-email/christmas-send-email"
+
+# TESTING_MODE timing shared by every sequence: 1min, 2min, 3min
+TESTING_DELAYS = (timedelta(minutes=1), timedelta(minutes=2), timedelta(minutes=3))
+
+# Deployment IDs are immutable for the lifetime of a deployment, so cache the
+# lookup per process: {deployment_name: (deployment_id, cached_at_monotonic)}
+DEPLOYMENT_ID_CACHE_TTL_SECONDS = 3600
+_DEPLOYMENT_ID_CACHE: Dict[str, Tuple[UUID, float]] = {}
+
+
+async def get_deployment_id(client, deployment_name: str = SEND_EMAIL_DEPLOYMENT_NAME) -> UUID:
+    """
+    Resolve a deployment name to its ID, reusing a cached ID when fresh.
+
+    Only the UUID is cached (not the client-bound deployment object), so the
+    cache is safe to share across event loops and client instances. No lock
+    is taken: concurrent misses just perform a redundant lookup.
+
+    Args:
+        client: Open Prefect client
+        deployment_name: "<flow-name>/<deployment-name>"
+
+    Returns:
+        Deployment ID
+
+    Example:
+        async with get_client() as client:
+            deployment_id = await get_deployment_id(client)
+    """
+    cached = _DEPLOYMENT_ID_CACHE.get(deployment_name)
+    if cached and time.monotonic() - cached[1] < DEPLOYMENT_ID_CACHE_TTL_SECONDS:
+        return cached[0]
+
+    deployment = await client.read_deployment_by_name(deployment_name)
+    _DEPLOYMENT_ID_CACHE[deployment_name] = (deployment.id, time.monotonic())
+    return deployment.id
+
+
+# TESTING_MODE changes rarely, so cache the Secret block value per process:
+# {secret_name: (testing_mode, cached_at_monotonic)}
+TESTING_MODE_CACHE_TTL_SECONDS = 300
+_TESTING_MODE_CACHE: Dict[str, Tuple[bool, float]] = {}
+
+
+@lru_cache(maxsize=1)
+def _env_testing_mode() -> bool:
+    """Parse the TESTING_MODE env var fallback once per process."""
+    return os.getenv("TESTING_MODE", "false").strip().lower() == "true"
+
+
+async def get_testing_mode(logger) -> bool:
+    """
+    Resolve TESTING_MODE from the "testing-mode" Secret block, cached with a TTL.
+
+    Falls back to the TESTING_MODE environment variable if the Secret block
+    cannot be loaded. Fallback values are not cached so the Secret block is
+    retried on the next call.
+
+    Args:
+        logger: Run logger for status messages
+
+    Returns:
+        True if testing mode (fast delays) is enabled
+
+    Example:
+        testing_mode = await get_testing_mode(logger)
+    """
+    cached = _TESTING_MODE_CACHE.get("testing-mode")
+    if cached and time.monotonic() - cached[1] < TESTING_MODE_CACHE_TTL_SECONDS:
+        return cached[0]
+
+    try:
+        secret = await Secret.aload("testing-mode")
+        value = secret.get()
+        logger.info("✅ Loaded TESTING_MODE from Secret block: %s", value)
+    except Exception as e:
+        logger.warning("⚠️ Failed to load testing-mode Secret: %s", e)
+        return _env_testing_mode()
+
+    # Handle both boolean and string values
+    testing_mode = value if isinstance(value, bool) else str(value).lower() == "true"
+    _TESTING_MODE_CACHE["testing-mode"] = (testing_mode, time.monotonic())
+    return testing_mode
+
+
+def run_async(coro):
+    """
+    Run a coroutine to completion on a fresh event loop, using uvloop if installed.
+
+    Intended for script entry points; flows awaited by Prefect or the FastAPI
+    server (uvicorn already selects uvloop) run on the caller's loop instead.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result
+
+    Example:
+        result = run_async(onboarding_handler_flow(email="test@example.com", ...))
+    """
+    if uvloop is not None:
+        return uvloop.run(coro)
+    return asyncio.run(coro)
+
+
+async def gather_eager(*coros: Awaitable[Any]) -> List[Any]:
+    """
+    Run coroutines concurrently like asyncio.gather(), starting each task eagerly.
+
+    Eager start is applied per task rather than via loop.set_task_factory(), so
+    the shared Prefect/uvicorn event loop is left untouched. On Python < 3.12
+    the tasks are created normally.
+
+    Args:
+        *coros: Coroutines to run
+
+    Returns:
+        Results in the same order as the coroutines
+
+    Example:
+        results = await gather_eager(*(schedule_one(n) for n in range(1, 4)))
+    """
+    loop = asyncio.get_running_loop()
+    if _EAGER_TASK_FACTORY is None:
+        tasks = [loop.create_task(coro) for coro in coros]
+    else:
+        tasks = [_EAGER_TASK_FACTORY(loop, coro) for coro in coros]
+    return list(await asyncio.gather(*tasks))
+
+
+def get_template_type(sequence: Dict[str, Any]) -> Optional[str]:
+    """
+    Extract the "Template Type" select value from a Notion sequence page.
+
+    Uses direct indexing instead of chained .get() calls with empty-dict
+    defaults, so the miss path allocates nothing.
+
+    Args:
+        sequence: Notion page dict for an email sequence
+
+    Returns:
+        Template type name, or None if the property is missing/empty
+
+    Example:
+        if get_template_type(existing_sequence) == "Onboarding": ...
+    """
+    try:
+        return sequence["properties"]["Template Type"]["select"]["name"]
+    except (KeyError, TypeError):
+        return None
+
+
+def _format_delays(delays: Sequence[timedelta]) -> str:
+    """Render delays for logging, e.g. "1h, 24h, 72h" or "1min, 2min, 3min"."""
+    parts = []
+    for delay in delays:
+        seconds = int(delay.total_seconds())
+        parts.append(f"{seconds // 3600}h" if seconds % 3600 == 0 else f"{seconds // 60}min")
+    return ", ".join(parts)
+
+
+async def schedule_email_batch(
+    logger,
+    sequence_name: str,
+    template_prefix: str,
+    base_params: Dict[str, Any],
+    production_delays: Sequence[timedelta],
+    testing_delays: Sequence[timedelta] = TESTING_DELAYS,
+    deployment_name: str = SEND_EMAIL_DEPLOYMENT_NAME
+) -> List[Dict[str, Any]]:
+    """
+    Schedule one send-email flow run per delay, all created concurrently.
+
+    Email N uses template "<template_prefix><N>" and is scheduled at a common
+    UTC base time plus the Nth delay (testing delays when TESTING_MODE is on).
+
+    Parameters whose value is None are not sent: the child flow falls back to
+    its own defaults, and each stored flow run stays smaller.
+
+    Args:
+        logger: Run logger for status messages
+        sequence_name: Human-readable sequence name for logs (e.g. "Onboarding")
+        template_prefix: Template ID prefix (e.g. "onboarding_phase1_email_")
+        base_params: Flow-run parameters shared by every email in the batch
+            (None values are dropped)
+        production_delays: Delay from now for each email in production
+        testing_delays: Delay from now for each email in TESTING_MODE
+        deployment_name: "<flow-name>/<deployment-name>" to schedule
+
+    Returns:
+        List of scheduled flow run details, in email order
+
+    Example:
+        scheduled = await schedule_email_batch(
+            logger, "Onboarding", "onboarding_phase1_email_",
+            {"email": email, "first_name": first_name, ...},
+            (timedelta(hours=1), timedelta(hours=24), timedelta(hours=72))
+        )
+    """
+    # Each flow run stores its own copy of the parameters, so ship only the
+    # values that are actually set
+    shared_params = {key: value for key, value in base_params.items() if value is not None}
+
+    try:
+        testing_mode = await get_testing_mode(logger)
+
+        if testing_mode:
+            delays = testing_delays
+            logger.info("⚡ TESTING MODE: Using fast delays (%s)", _format_delays(delays))
+        else:
+            delays = production_delays
+            logger.info("🚀 PRODUCTION MODE: Using standard delays (%s)", _format_delays(delays))
+
+        async with get_client() as client:
+            try:
+                deployment_id = await get_deployment_id(client, deployment_name)
+                logger.info("✅ Found deployment: %s", deployment_id)
+            except Exception as e:
+                logger.error("❌ Failed to find deployment: %s", e)
+                raise
+
+            # One base time for the whole sequence keeps the offsets exact
+            now = datetime.now(timezone.utc)
+
+            async def schedule_one(email_number: int, delay: timedelta) -> Dict[str, Any]:
+                delay_hours = delay.total_seconds() / 3600
+                scheduled_dt = now + delay
+                template_id = f"{template_prefix}{email_number}"
+
+                logger.info(
+                    "📧 Scheduling %s Email #%d (%s) for %s (%.2f hours from now)",
+                    sequence_name, email_number, template_id,
+                    scheduled_dt.strftime('%Y-%m-%d %H:%M:%S'), delay_hours
+                )
+
+                flow_run = await client.create_flow_run_from_deployment(
+                    deployment_id=deployment_id,
+                    parameters={
+                        **shared_params,
+                        "template_id": template_id,
+                        "email_number": email_number
+                    },
+                    state=Scheduled(scheduled_time=scheduled_dt)
+                )
+
+                logger.info("✅ Scheduled Email %d: Flow Run ID = %s", email_number, flow_run.id)
+
+                return {
+                    "email_number": email_number,
+                    "template_id": template_id,
+                    "flow_run_id": str(flow_run.id),
+                    "scheduled_time": scheduled_dt.isoformat(),
+                    "delay_hours": delay_hours
+                }
+
+            scheduled_flows = await gather_eager(
+                *(schedule_one(n, delay) for n, delay in enumerate(delays, start=1))
+            )
+
+        logger.info("✅ Successfully scheduled %d %s emails", len(scheduled_flows), sequence_name.lower())
+        return scheduled_flows
+
+    except Exception as e:
+        logger.error("❌ Error scheduling %s emails: %s", sequence_name.lower(), e)
+        raise
@@ -15,9 +15,13 @@ Created: 2025-11-27
 """
 
 from prefect import flow, get_run_logger
+from prefect.client.orchestration import get_client
+from prefect.states import Scheduled
 from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
-import os
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import re
 
 # Import Notion operations
 from campaigns.christmas_campaign.tasks.notion_operations import (
@@ -25,13 +29,30 @@ from campaigns.christmas_campaign.tasks.notion_operations import (
     create_noshow_sequence,
     search_email_sequence_by_email
 )
+from campaigns.christmas_campaign.flows._scheduling import (
+    get_deployment_id,
+    get_template_type,
+    get_testing_mode
+)
+from campaigns.christmas_campaign.tasks.idempotency_store import (
+    get_processed_result,
+    record_processed_result
+)
 
+# Idempotency namespace for Calendly no-show events
+IDEMPOTENCY_NAMESPACE = "noshow"
+
+# Cheap input sanity checks, run before any Notion API call
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Event URIs are only required to be a non-empty token: callers also send
+# bare Calendly event IDs and URNs, not just https:// URIs
+_EVENT_URI_RE = re.compile(r"^\S+$")
 
 # ==============================================================================
 # No-Show Email Scheduling Function (Wave 2, Feature 2.3)
 # ==============================================================================
 
-def schedule_noshow_emails(
+async def schedule_noshow_emails(
     email: str,
     first_name: str,
     business_name: str,
@@ -61,7 +82,7 @@ def schedule_noshow_emails(
         List of scheduled flow run details (email_number, flow_run_id, scheduled_time)
 
     Example:
-        scheduled = schedule_noshow_emails(
+        scheduled = await schedule_noshow_emails(
             email="sarah@example.com",
             first_name="Sarah",
             business_name="Sarah's Salon",
@@ -70,28 +91,13 @@ def schedule_noshow_emails(
         )
     """
     logger = get_run_logger()
+    info = logger.isEnabledFor(logging.INFO)
 
     scheduled_flows = []
 
-    # Use async context to interact with Prefect API
-    async def schedule_all_emails():
-        from prefect.client.orchestration import get_client
-        from prefect.blocks.system import Secret
-
-        # Load TESTING_MODE from Secret block
-        testing_mode = False
-        try:
-            secret = Secret.load("testing-mode")
-            value = secret.get()
-            logger.info(f"✅ Loaded TESTING_MODE from Secret block: {value}")
-            # Handle both boolean and string values
-            if isinstance(value, bool):
-                testing_mode = value
-            else:
-                testing_mode = str(value).lower() == "true"
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to load testing-mode Secret: {e}")
-            testing_mode = os.getenv("TESTING_MODE", "false").lower() == "true"
+    try:
+        # Load TESTING_MODE from Secret block (cached across invocations)
+        testing_mode = await get_testing_mode(logger)
 
         # No-show recovery email timing
         # Production: 5min, 24h (Day 1), 48h (Day 2)
@@ -103,84 +109,105 @@ def schedule_noshow_emails(
             delays_hours = [5/60, 24, 48]  # 5 minutes, 1 day, 2 days
             logger.info("🚀 PRODUCTION MODE: Using standard delays (5min, 24h, 48h)")
 
+        # Inside a flow run this reuses the run's own open client (and its
+        # connection pool); it is only closed here if it was opened here
         async with get_client() as client:
-            # Find the deployment
+            # Find the deployment (cached across invocations)
             try:
-                deployment = await client.read_deployment_by_name(
-                    "christmas-send-email/christmas-send-email"
-                )
-                logger.info(f"✅ Found deployment: {deployment.id}")
+                deployment_id = await get_deployment_id(client)
+                if info:
+                    logger.info("✅ Found deployment: %s", deployment_id)
             except Exception as e:
-                logger.error(f"❌ Failed to find deployment: {e}")
-                logger.error(f"   Make sure to run: python campaigns/christmas_campaign/deployments/deploy_christmas.py")
+                logger.error(
+                    "❌ Failed to find deployment: %s\n"
+                    "   Make sure to run: python campaigns/christmas_campaign/deployments/deploy_christmas.py",
+                    e
+                )
                 raise
 
-            # Schedule each of the 3 no-show recovery emails
+            # Parameters shared by all 3 emails (only template/email number vary)
+            base_params = {
+                "email": email,
+                "first_name": first_name,
+                "business_name": business_name,
+                "sequence_id": sequence_id,
+                "calendly_event_uri": calendly_event_uri,
+                "scheduled_time": scheduled_time,
+                "reschedule_url": reschedule_url,
+                "campaign": "Christmas 2025",
+                "template_type": "No-Show Recovery"
+            }
+
+            # Build all 3 no-show recovery emails from a common anchor
+            now = datetime.now(timezone.utc)
+            planned = []
+            creates = []
             for email_number in range(1, 4):
                 delay_hours = delays_hours[email_number - 1]
-                scheduled_dt = datetime.now() + timedelta(hours=delay_hours)
-
+                scheduled_dt = now + timedelta(hours=delay_hours)
                 template_id = f"noshow_recovery_email_{email_number}"
 
-                logger.info(
-                    f"📧 Scheduling No-Show Email #{email_number} ({template_id}) "
-                    f"for {scheduled_dt.strftime('%Y-%m-%d %H:%M:%S')} "
-                    f"({delay_hours:.2f} hours from now)"
-                )
-
-                # Create flow run with scheduled time
-                from prefect.states import Scheduled
-
-                flow_run = await client.create_flow_run_from_deployment(
-                    deployment_id=deployment.id,
+                planned.append((email_number, template_id, scheduled_dt, delay_hours))
+                creates.append(client.create_flow_run_from_deployment(
+                    deployment_id=deployment_id,
                     parameters={
-                        "email": email,
-                        "first_name": first_name,
-                        "business_name": business_name,
+                        **base_params,
                         "template_id": template_id,
-                        "email_number": email_number,
-                        "sequence_id": sequence_id,
-                        "calendly_event_uri": calendly_event_uri,
-                        "scheduled_time": scheduled_time,
-                        "reschedule_url": reschedule_url,
-                        "campaign": "Christmas 2025",
-                        "template_type": "No-Show Recovery"
+                        "email_number": email_number
                     },
                     state=Scheduled(scheduled_time=scheduled_dt)
+                ))
+
+            # Prefect has no bulk flow-run endpoint, so submit the 3 creates
+            # concurrently over one client (one round-trip of wall time)
+            flow_runs = await asyncio.gather(*creates)
+
+        for (email_number, template_id, scheduled_dt, delay_hours), flow_run in zip(planned, flow_runs):
+            scheduled_flows.append({
+                "email_number": email_number,
+                "template_id": template_id,
+                "flow_run_id": str(flow_run.id),
+                "scheduled_time": scheduled_dt.isoformat(),
+                "delay_hours": delay_hours
+            })
+
+            if info:
+                logger.info(
+                    "📧 Scheduled No-Show Email #%d (%s) for %s (%.2f hours from now): "
+                    "Flow Run ID = %s",
+                    email_number, template_id, scheduled_dt.strftime('%Y-%m-%d %H:%M:%S'),
+                    delay_hours, flow_run.id
                 )
 
-                scheduled_flows.append({
-                    "email_number": email_number,
-                    "template_id": template_id,
-                    "flow_run_id": str(flow_run.id),
-                    "scheduled_time": scheduled_dt.isoformat(),
-                    "delay_hours": delay_hours
-                })
+        if info:
+            logger.info("✅ Successfully scheduled %d no-show recovery emails", len(scheduled_flows))
+        return scheduled_flows
 
-                logger.info(f"✅ Scheduled Email {email_number}: Flow Run ID = {flow_run.id}")
+    except Exception as e:
+        logger.error("❌ Error scheduling no-show emails: %s", e)
+        raise
 
-        return scheduled_flows
 
-    # Run the async scheduling function
-    import asyncio
-    try:
-        if asyncio.get_event_loop().is_running():
-            # If we're already in an async context (e.g., during testing),
-            # create a new event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            scheduled = loop.run_until_complete(schedule_all_emails())
-            loop.close()
-        else:
-            scheduled = asyncio.run(schedule_all_emails())
+async def _search_contact_and_sequence(email: str) -> List[Any]:
+    """
+    Search for the contact and any existing email sequence concurrently.
 
-        scheduled_flows.extend(scheduled)
-        logger.info(f"✅ Successfully scheduled {len(scheduled_flows)} no-show recovery emails")
-        return scheduled_flows
+    Both Notion queries are keyed only by email, so they run in parallel
+    threads. Exceptions are returned (not raised) so the caller can keep the
+    original step order: a sequence lookup error only matters once the
+    contact has been found.
 
-    except Exception as e:
-        logger.error(f"❌ Error scheduling no-show emails: {e}")
-        raise
+    Args:
+        email: Contact email address
+
+    Returns:
+        [contact or exception, existing_sequence or exception]
+    """
+    return await asyncio.gather(
+        asyncio.to_thread(search_contact_by_email, email),
+        asyncio.to_thread(search_email_sequence_by_email, email),
+        return_exceptions=True
+    )
 
 
 @flow(
@@ -188,7 +215,7 @@ def schedule_noshow_emails(
     description="Handle Calendly no-show event and start recovery sequence",
     log_prints=True
 )
-def noshow_recovery_handler_flow(
+async def noshow_recovery_handler_flow(
     email: str,
     first_name: str,
     business_name: str,
@@ -213,7 +240,7 @@ def noshow_recovery_handler_flow(
         Flow result with status and sequence_id
 
     Example:
-        result = noshow_recovery_handler_flow(
+        result = await noshow_recovery_handler_flow(
             email="sarah@example.com",
             first_name="Sarah",
             business_name="Sarah's Salon",
@@ -223,20 +250,53 @@ def noshow_recovery_handler_flow(
         )
     """
     logger = get_run_logger()
-    logger.info(f"🚫 No-Show Recovery Handler started for {email}")
-    logger.info(f"   Business: {business_name}")
-    logger.info(f"   Event: {event_type}, Scheduled: {scheduled_time}")
+    info = logger.isEnabledFor(logging.INFO)
+    if info:
+        logger.info(
+            "🚫 No-Show Recovery Handler started for %s\n   Business: %s\n   Event: %s, Scheduled: %s",
+            email, business_name, event_type, scheduled_time
+        )
+
+    # ==============================================================================
+    # Step 0: Validate input and check webhook-level idempotency
+    # ==============================================================================
+
+    if not _EMAIL_RE.match(email):
+        logger.error("❌ Invalid email format: %s", email)
+        return {
+            "status": "error",
+            "message": "Invalid email format",
+            "email": email
+        }
+
+    if not _EVENT_URI_RE.match(calendly_event_uri):
+        logger.error("❌ Invalid Calendly event URI: %s", calendly_event_uri)
+        return {
+            "status": "error",
+            "message": "Invalid Calendly event URI",
+            "email": email
+        }
+
+    # Calendly delivers webhooks at least once; return the prior result on retry
+    prior_result = await asyncio.to_thread(
+        get_processed_result, IDEMPOTENCY_NAMESPACE, calendly_event_uri
+    )
+    if prior_result is not None:
+        if info:
+            logger.info("⚠️  Event already processed, returning prior result: %s", calendly_event_uri)
+        return prior_result
 
     # ==============================================================================
-    # Step 1: Search for contact
+    # Step 1: Search for contact and existing sequence (concurrently)
     # ==============================================================================
 
-    logger.info(f"🔍 Searching for contact {email} in BusinessX Canada Database...")
+    contact, existing_sequence = await _search_contact_and_sequence(email)
 
-    contact = search_contact_by_email(email)
+    if isinstance(contact, Exception):
+        raise contact
 
     if not contact:
-        logger.error(f"❌ Contact not found: {email}")
+        logger.error("❌ Contact not found: %s", email)
         return {
             "status": "error",
             "message": f"Contact not found: {email}",
@@ -244,38 +304,41 @@ def noshow_recovery_handler_flow(
         }
 
     contact_id = contact["id"]
-    logger.info(f"✅ Contact found: {contact_id}")
 
     # ==============================================================================
     # Step 2: Check for existing no-show recovery sequence (Idempotency)
     # ==============================================================================
 
-    logger.info(f"🔍 Checking for existing no-show recovery sequence for {email}...")
+    if isinstance(existing_sequence, Exception):
+        raise existing_sequence
 
-    existing_sequence = search_email_sequence_by_email(email)
-
-    if existing_sequence:
-        # Check if it's a no-show recovery sequence
-        template_type = existing_sequence.get("properties", {}).get("Template Type", {}).get("select", {}).get("name")
+    # Hot path for replayed webhooks: a single log record, then return
+    template_type = get_template_type(existing_sequence) if existing_sequence else None
+    if template_type == "No-Show Recovery":
+        logger.warning("⚠️  Duplicate no-show for %s", email)
+        return {
+            "status": "skipped",
+            "reason": "duplicate_noshow_sequence",
+            "email": email,
+            "existing_sequence_id": existing_sequence["id"]
+        }
 
-        if template_type == "No-Show Recovery":
-            logger.info(f"⚠️  No-show recovery sequence already exists for {email}")
-            return {
-                "status": "skipped",
-                "reason": "duplicate_noshow_sequence",
-                "email": email,
-                "existing_sequence_id": existing_sequence["id"]
-            }
+    if info:
+        if existing_sequence:
+            logger.info(
+                "✅ Contact found: %s (existing sequence is %s, will create no-show recovery)",
+                contact_id, template_type
+            )
         else:
-            logger.info(f"✅ Existing sequence is {template_type}, will create no-show recovery")
+            logger.info("✅ Contact found: %s", contact_id)
 
     # ==============================================================================
     # Step 3: Create no-show sequence tracking record
     # ==============================================================================
 
-    logger.info(f"📝 Creating no-show recovery sequence for {email}...")
-
-    sequence = create_noshow_sequence(
+    # Notion client is synchronous; keep it off the event loop
+    sequence = await asyncio.to_thread(
+        create_noshow_sequence,
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -285,15 +348,14 @@ def noshow_recovery_handler_flow(
     )
 
     sequence_id = sequence["id"]
-    logger.info(f"✅ Created no-show sequence: {sequence_id}")
+    if info:
+        logger.info("✅ Created no-show sequence: %s", sequence_id)
 
     # ==============================================================================
     # Step 4: Schedule 3-email recovery sequence
     # ==============================================================================
 
-    logger.info(f"📅 Scheduling 3 no-show recovery emails for {email}...")
-
-    scheduled_emails = schedule_noshow_emails(
+    scheduled_emails = await schedule_noshow_emails(
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -303,15 +365,17 @@ def noshow_recovery_handler_flow(
         sequence_id=sequence_id
     )
 
-    logger.info(f"✅ Scheduled {len(scheduled_emails)} emails")
-
     # ==============================================================================
     # Return result
     # ==============================================================================
 
-    logger.info(f"✅ No-Show Recovery Handler execution complete for {email}")
+    if info:
+        logger.info(
+            "✅ No-Show Recovery Handler execution complete for %s (%d emails scheduled)",
+            email, len(scheduled_emails)
+        )
 
-    return {
+    result = {
         "status": "success",
         "message": f"No-show recovery sequence created and {len(scheduled_emails)} emails scheduled",
         "email": email,
@@ -322,6 +386,12 @@ def noshow_recovery_handler_flow(
         "scheduled_emails": scheduled_emails
     }
 
+    await asyncio.to_thread(
+        record_processed_result, IDEMPOTENCY_NAMESPACE, calendly_event_uri, result
+    )
+
+    return result
+
 
 # ==============================================================================
 # Main execution (for testing)
@@ -329,12 +399,12 @@ def noshow_recovery_handler_flow(
 
 if __name__ == "__main__":
     # Test the flow with sample data
-    result = noshow_recovery_handler_flow(
+    result = asyncio.run(noshow_recovery_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Business",
         calendly_event_uri="https://calendly.com/events/TEST123",
         scheduled_time="2025-12-01T14:00:00Z",
         reschedule_url="https://calendly.com/reschedule/TEST123"
-    )
+    ))
     print(f"\nFlow Result: {result}")
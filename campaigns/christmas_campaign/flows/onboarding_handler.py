@@ -16,10 +16,16 @@ Created: 2025-11-27
 
 from prefect import flow, get_run_logger
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-import os
+from datetime import timedelta
+import re
 import asyncio
 
+from campaigns.christmas_campaign.flows._scheduling import (
+    get_template_type,
+    run_async,
+    schedule_email_batch
+)
+
 # Import Notion operations
 from campaigns.christmas_campaign.tasks.notion_operations import (
     search_contact_by_email,
@@ -27,12 +33,42 @@ from campaigns.christmas_campaign.tasks.notion_operations import (
     search_email_sequence_by_email
 )
 
+# Onboarding email timing
+# Production: 1h, Day 1 (24h), Day 3 (72h)
+# Testing: 1min, 2min, 3min (shared TESTING_DELAYS)
+_PROD_DELAYS = (timedelta(hours=1), timedelta(hours=24), timedelta(hours=72))
+
+# Cheap email sanity check, run before any Notion API call
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def should_handle_onboarding(payment_confirmed: bool, email: str) -> bool:
+    """
+    Cheap pre-flight check for onboarding webhooks.
+
+    Callers use this to skip creating a flow run (and its Prefect state
+    records) for requests the flow would reject anyway. The flow keeps the
+    same checks as a defensive guard.
+
+    Args:
+        payment_confirmed: Whether payment was confirmed
+        email: Client email address
+
+    Returns:
+        True if the onboarding flow should run
+
+    Example:
+        if should_handle_onboarding(request.payment_confirmed, request.email):
+            background_tasks.add_task(run_flow)
+    """
+    return bool(payment_confirmed) and bool(_EMAIL_RE.match(email or ""))
+
 
 # ==============================================================================
 # Onboarding Email Scheduling Function (Wave 4, Feature 4.3)
 # ==============================================================================
 
-def schedule_onboarding_emails(
+async def schedule_onboarding_emails(
     email: str,
     first_name: str,
     business_name: str,
@@ -63,105 +99,28 @@ def schedule_onboarding_emails(
         List of scheduled flow run details
     """
     logger = get_run_logger()
-    scheduled_flows = []
-
-    async def schedule_all_emails():
-        from prefect.client.orchestration import get_client
-        from prefect.blocks.system import Secret
-
-        # Load TESTING_MODE
-        testing_mode = False
-        try:
-            secret = Secret.load("testing-mode")
-            value = secret.get()
-            logger.info(f"✅ Loaded TESTING_MODE from Secret block: {value}")
-            testing_mode = value if isinstance(value, bool) else str(value).lower() == "true"
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to load testing-mode Secret: {e}")
-            testing_mode = os.getenv("TESTING_MODE", "false").lower() == "true"
-
-        # Onboarding email timing
-        # Production: 1h, Day 1 (24h), Day 3 (72h)
-        # Testing: 1min, 2min, 3min
-        if testing_mode:
-            delays_hours = [1/60, 2/60, 3/60]
-            logger.info("⚡ TESTING MODE: Using fast delays (1min, 2min, 3min)")
-        else:
-            delays_hours = [1, 24, 72]  # 1 hour, 1 day, 3 days
-            logger.info("🚀 PRODUCTION MODE: Using standard delays (1h, 24h, 72h)")
-
-        async with get_client() as client:
-            try:
-                deployment = await client.read_deployment_by_name(
-                    "christmas-send-email/christmas-send-email"
-                )
-                logger.info(f"✅ Found deployment: {deployment.id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to find deployment: {e}")
-                raise
-
-            # Schedule each of the 3 onboarding emails
-            for email_number in range(1, 4):
-                delay_hours = delays_hours[email_number - 1]
-                scheduled_dt = datetime.now() + timedelta(hours=delay_hours)
-                template_id = f"onboarding_phase1_email_{email_number}"
-
-                logger.info(
-                    f"📧 Scheduling Onboarding Email #{email_number} ({template_id}) "
-                    f"for {scheduled_dt.strftime('%Y-%m-%d %H:%M:%S')} "
-                    f"({delay_hours:.2f} hours from now)"
-                )
-
-                from prefect.states import Scheduled
-
-                flow_run = await client.create_flow_run_from_deployment(
-                    deployment_id=deployment.id,
-                    parameters={
-                        "email": email,
-                        "first_name": first_name,
-                        "business_name": business_name,
-                        "template_id": template_id,
-                        "email_number": email_number,
-                        "sequence_id": sequence_id,
-                        "payment_date": payment_date,
-                        "salon_address": salon_address,
-                        "observation_dates": observation_dates,
-                        "start_date": start_date,
-                        "campaign": "Christmas 2025",
-                        "template_type": "Onboarding"
-                    },
-                    state=Scheduled(scheduled_time=scheduled_dt)
-                )
-
-                scheduled_flows.append({
-                    "email_number": email_number,
-                    "template_id": template_id,
-                    "flow_run_id": str(flow_run.id),
-                    "scheduled_time": scheduled_dt.isoformat(),
-                    "delay_hours": delay_hours
-                })
-
-                logger.info(f"✅ Scheduled Email {email_number}: Flow Run ID = {flow_run.id}")
-
-        return scheduled_flows
-
-    # Run the async scheduling function
-    try:
-        if asyncio.get_event_loop().is_running():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            scheduled = loop.run_until_complete(schedule_all_emails())
-            loop.close()
-        else:
-            scheduled = asyncio.run(schedule_all_emails())
 
-        scheduled_flows.extend(scheduled)
-        logger.info(f"✅ Successfully scheduled {len(scheduled_flows)} onboarding emails")
-        return scheduled_flows
+    # Parameters shared by all 3 emails; each run adds its template
+    base_params = {
+        "email": email,
+        "first_name": first_name,
+        "business_name": business_name,
+        "sequence_id": sequence_id,
+        "payment_date": payment_date,
+        "salon_address": salon_address,
+        "observation_dates": observation_dates,
+        "start_date": start_date,
+        "campaign": "Christmas 2025",
+        "template_type": "Onboarding"
+    }
 
-    except Exception as e:
-        logger.error(f"❌ Error scheduling onboarding emails: {e}")
-        raise
+    return await schedule_email_batch(
+        logger,
+        sequence_name="Onboarding",
+        template_prefix="onboarding_phase1_email_",
+        base_params=base_params,
+        production_delays=_PROD_DELAYS
+    )
 
 
 @flow(
@@ -169,7 +128,7 @@ def schedule_onboarding_emails(
     description="Handle new client onboarding and start welcome sequence",
     log_prints=True
 )
-def onboarding_handler_flow(
+async def onboarding_handler_flow(
     email: str,
     first_name: str,
     business_name: str,
@@ -202,7 +161,7 @@ def onboarding_handler_flow(
         Flow result with status and sequence_id
 
     Example:
-        result = onboarding_handler_flow(
+        result = await onboarding_handler_flow(
             email="sarah@example.com",
             first_name="Sarah",
             business_name="Sarah's Salon",
@@ -216,59 +175,57 @@ def onboarding_handler_flow(
         )
     """
     logger = get_run_logger()
-    logger.info(f"🎉 Onboarding Handler started for {email}")
-    logger.info(f"   Business: {business_name}")
-    logger.info(f"   Package: {package_type}")
-    logger.info(f"   Payment: ${payment_amount:.2f} on {payment_date}")
+    logger.info("🎉 Onboarding Handler started for %s", email)
+    logger.info("   Business: %s", business_name)
+    logger.info("   Package: %s", package_type)
+    logger.info("   Payment: $%.2f on %s", payment_amount, payment_date)
 
     # ==============================================================================
-    # Step 1: Validate payment and DocuSign
+    # Step 1: Validate email, payment and DocuSign
     # ==============================================================================
 
-    if not payment_confirmed:
-        logger.error(f"❌ Payment not confirmed for {email}")
+    if not _EMAIL_RE.match(email):
+        logger.error("❌ Invalid email format: %s", email)
         return {
             "status": "error",
-            "message": f"Payment not confirmed for {email}",
+            "message": "Invalid email format",
             "email": email
         }
 
-    if not docusign_completed:
-        logger.warning(f"⚠️ DocuSign not completed for {email}")
-        # Continue anyway, but log the warning
-
-    # ==============================================================================
-    # Step 2: Search for contact
-    # ==============================================================================
-
-    logger.info(f"🔍 Searching for contact {email} in BusinessX Canada Database...")
-
-    contact = search_contact_by_email(email)
-
-    if not contact:
-        logger.error(f"❌ Contact not found: {email}")
+    if not payment_confirmed:
+        logger.error("❌ Payment not confirmed for %s", email)
         return {
             "status": "error",
-            "message": f"Contact not found: {email}",
+            "message": f"Payment not confirmed for {email}",
             "email": email
         }
 
-    contact_id = contact["id"]
-    logger.info(f"✅ Contact found: {contact_id}")
+    if not docusign_completed:
+        logger.warning("⚠️ DocuSign not completed for %s", email)
+        # Continue anyway, but log the warning
 
     # ==============================================================================
-    # Step 3: Check for existing onboarding sequence (Idempotency)
+    # Step 2: Check for existing onboarding sequence (Idempotency)
     # ==============================================================================
 
-    logger.info(f"🔍 Checking for existing onboarding sequence for {email}...")
+    logger.info("🔍 Checking for existing onboarding sequence for %s...", email)
+
+    # Start the contact lookup in parallel, but check the sequence first: on
+    # the duplicate path (webhook retries) the contact is never needed
+    contact_task = asyncio.create_task(asyncio.to_thread(search_contact_by_email, email))
 
-    existing_sequence = search_email_sequence_by_email(email)
+    try:
+        existing_sequence = await asyncio.to_thread(search_email_sequence_by_email, email)
+    except BaseException:
+        contact_task.cancel()
+        raise
 
     if existing_sequence:
-        template_type = existing_sequence.get("properties", {}).get("Template Type", {}).get("select", {}).get("name")
+        template_type = get_template_type(existing_sequence)
 
         if template_type == "Onboarding":
-            logger.info(f"⚠️  Onboarding sequence already exists for {email}")
+            contact_task.cancel()
+            logger.info("⚠️  Onboarding sequence already exists for %s", email)
             return {
                 "status": "skipped",
                 "reason": "duplicate_onboarding_sequence",
@@ -276,25 +233,45 @@ def onboarding_handler_flow(
                 "existing_sequence_id": existing_sequence["id"]
             }
         else:
-            logger.info(f"✅ Existing sequence is {template_type}, will create onboarding sequence")
+            logger.info("✅ Existing sequence is %s, will create onboarding sequence", template_type)
+
+    # ==============================================================================
+    # Step 3: Search for contact
+    # ==============================================================================
+
+    logger.info("🔍 Searching for contact %s in BusinessX Canada Database...", email)
+
+    contact = await contact_task
+
+    if not contact:
+        logger.error("❌ Contact not found: %s", email)
+        return {
+            "status": "error",
+            "message": f"Contact not found: {email}",
+            "email": email
+        }
+
+    contact_id = contact["id"]
+    logger.info("✅ Contact found: %s", contact_id)
 
     # ==============================================================================
     # Step 4: Create onboarding sequence tracking record
     # ==============================================================================
 
-    logger.info(f"📝 Creating onboarding sequence for {email}...")
+    logger.info("📝 Creating onboarding sequence for %s...", email)
 
     # Log onboarding details
     if salon_address:
-        logger.info(f"🏢 Salon Address: {salon_address}")
+        logger.info("🏢 Salon Address: %s", salon_address)
 
     if observation_dates:
-        logger.info(f"📅 Observation Dates: {', '.join(observation_dates)}")
+        logger.info("📅 Observation Dates: %s", ', '.join(observation_dates))
 
     if start_date:
-        logger.info(f"🚀 Start Date: {start_date}")
+        logger.info("🚀 Start Date: %s", start_date)
 
-    sequence = create_onboarding_sequence(
+    sequence = await asyncio.to_thread(
+        create_onboarding_sequence,
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -308,15 +285,15 @@ def onboarding_handler_flow(
     )
 
     sequence_id = sequence["id"]
-    logger.info(f"✅ Created onboarding sequence: {sequence_id}")
+    logger.info("✅ Created onboarding sequence: %s", sequence_id)
 
     # ==============================================================================
     # Step 5: Schedule 3-email onboarding sequence
     # ==============================================================================
 
-    logger.info(f"📅 Scheduling 3 onboarding welcome emails for {email}...")
+    logger.info("📅 Scheduling 3 onboarding welcome emails for %s...", email)
 
-    scheduled_emails = schedule_onboarding_emails(
+    scheduled_emails = await schedule_onboarding_emails(
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -327,13 +304,13 @@ def onboarding_handler_flow(
         sequence_id=sequence_id
     )
 
-    logger.info(f"✅ Scheduled {len(scheduled_emails)} emails")
+    logger.info("✅ Scheduled %d emails", len(scheduled_emails))
 
     # ==============================================================================
     # Return result
     # ==============================================================================
 
-    logger.info(f"✅ Onboarding Handler execution complete for {email}")
+    logger.info("✅ Onboarding Handler execution complete for %s", email)
 
     return {
         "status": "success",
@@ -356,7 +333,7 @@ def onboarding_handler_flow(
 
 if __name__ == "__main__":
     # Test the flow with sample data
-    result = onboarding_handler_flow(
+    result = run_async(onboarding_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Salon",
@@ -367,5 +344,5 @@ if __name__ == "__main__":
         salon_address="123 Main St, Toronto, ON",
         observation_dates=["2025-12-10", "2025-12-17"],
         start_date="2025-12-10"
-    )
+    ))
     print(f"\nFlow Result: {result}")
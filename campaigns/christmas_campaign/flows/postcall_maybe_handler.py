@@ -16,8 +16,14 @@ Created: 2025-11-27
 
 from prefect import flow, get_run_logger
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-import os
+from datetime import timedelta
+import asyncio
+
+from campaigns.christmas_campaign.flows._scheduling import (
+    get_template_type,
+    run_async,
+    schedule_email_batch
+)
 
 # Import Notion operations
 from campaigns.christmas_campaign.tasks.notion_operations import (
@@ -26,12 +32,17 @@ from campaigns.christmas_campaign.tasks.notion_operations import (
     search_email_sequence_by_email
 )
 
+# Post-call email timing
+# Production: 1h, Day 3 (72h), Day 7 (168h)
+# Testing: 1min, 2min, 3min (shared TESTING_DELAYS)
+_PROD_DELAYS = (timedelta(hours=1), timedelta(hours=72), timedelta(hours=168))
+
 
 # ==============================================================================
 # Post-Call Email Scheduling Function (Wave 3, Feature 3.3)
 # ==============================================================================
 
-def schedule_postcall_emails(
+async def schedule_postcall_emails(
     email: str,
     first_name: str,
     business_name: str,
@@ -60,105 +71,27 @@ def schedule_postcall_emails(
         List of scheduled flow run details
     """
     logger = get_run_logger()
-    scheduled_flows = []
-
-    async def schedule_all_emails():
-        from prefect.client.orchestration import get_client
-        from prefect.blocks.system import Secret
-
-        # Load TESTING_MODE
-        testing_mode = False
-        try:
-            secret = Secret.load("testing-mode")
-            value = secret.get()
-            logger.info(f"✅ Loaded TESTING_MODE from Secret block: {value}")
-            testing_mode = value if isinstance(value, bool) else str(value).lower() == "true"
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to load testing-mode Secret: {e}")
-            testing_mode = os.getenv("TESTING_MODE", "false").lower() == "true"
-
-        # Post-call email timing
-        # Production: 1h, Day 3 (72h), Day 7 (168h)
-        # Testing: 1min, 2min, 3min
-        if testing_mode:
-            delays_hours = [1/60, 2/60, 3/60]
-            logger.info("⚡ TESTING MODE: Using fast delays (1min, 2min, 3min)")
-        else:
-            delays_hours = [1, 72, 168]  # 1 hour, 3 days, 7 days
-            logger.info("🚀 PRODUCTION MODE: Using standard delays (1h, 72h, 168h)")
-
-        async with get_client() as client:
-            try:
-                deployment = await client.read_deployment_by_name(
-                    "christmas-send-email/christmas-send-email"
-                )
-                logger.info(f"✅ Found deployment: {deployment.id}")
-            except Exception as e:
-                logger.error(f"❌ Failed to find deployment: {e}")
-                raise
-
-            # Schedule each of the 3 post-call emails
-            for email_number in range(1, 4):
-                delay_hours = delays_hours[email_number - 1]
-                scheduled_dt = datetime.now() + timedelta(hours=delay_hours)
-                template_id = f"postcall_maybe_email_{email_number}"
-
-                logger.info(
-                    f"📧 Scheduling Post-Call Email #{email_number} ({template_id}) "
-                    f"for {scheduled_dt.strftime('%Y-%m-%d %H:%M:%S')} "
-                    f"({delay_hours:.2f} hours from now)"
-                )
-
-                from prefect.states import Scheduled
-
-                flow_run = await client.create_flow_run_from_deployment(
-                    deployment_id=deployment.id,
-                    parameters={
-                        "email": email,
-                        "first_name": first_name,
-                        "business_name": business_name,
-                        "template_id": template_id,
-                        "email_number": email_number,
-                        "sequence_id": sequence_id,
-                        "call_date": call_date,
-                        "call_notes": call_notes,
-                        "objections": objections,
-                        "campaign": "Christmas 2025",
-                        "template_type": "Post-Call Follow-Up"
-                    },
-                    state=Scheduled(scheduled_time=scheduled_dt)
-                )
-
-                scheduled_flows.append({
-                    "email_number": email_number,
-                    "template_id": template_id,
-                    "flow_run_id": str(flow_run.id),
-                    "scheduled_time": scheduled_dt.isoformat(),
-                    "delay_hours": delay_hours
-                })
-
-                logger.info(f"✅ Scheduled Email {email_number}: Flow Run ID = {flow_run.id}")
-
-        return scheduled_flows
-
-    # Run the async scheduling function
-    import asyncio
-    try:
-        if asyncio.get_event_loop().is_running():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            scheduled = loop.run_until_complete(schedule_all_emails())
-            loop.close()
-        else:
-            scheduled = asyncio.run(schedule_all_emails())
 
-        scheduled_flows.extend(scheduled)
-        logger.info(f"✅ Successfully scheduled {len(scheduled_flows)} post-call emails")
-        return scheduled_flows
+    # Parameters shared by all 3 emails; each run adds its template
+    base_params = {
+        "email": email,
+        "first_name": first_name,
+        "business_name": business_name,
+        "sequence_id": sequence_id,
+        "call_date": call_date,
+        "call_notes": call_notes,
+        "objections": objections,
+        "campaign": "Christmas 2025",
+        "template_type": "Post-Call Follow-Up"
+    }
 
-    except Exception as e:
-        logger.error(f"❌ Error scheduling post-call emails: {e}")
-        raise
+    return await schedule_email_batch(
+        logger,
+        sequence_name="Post-Call",
+        template_prefix="postcall_maybe_email_",
+        base_params=base_params,
+        production_delays=_PROD_DELAYS
+    )
 
 
 @flow(
@@ -166,7 +99,7 @@ def schedule_postcall_emails(
     description="Handle post-call maybe prospect and start follow-up sequence",
     log_prints=True
 )
-def postcall_maybe_handler_flow(
+async def postcall_maybe_handler_flow(
     email: str,
     first_name: str,
     business_name: str,
@@ -193,43 +126,33 @@ def postcall_maybe_handler_flow(
         Flow result with status and sequence_id
     """
     logger = get_run_logger()
-    logger.info(f"📞 Post-Call Maybe Handler started for {email}")
-    logger.info(f"   Business: {business_name}")
-    logger.info(f"   Call Date: {call_date}, Outcome: {call_outcome}")
-    logger.info(f"   Priority: {follow_up_priority}")
+    logger.info("📞 Post-Call Maybe Handler started for %s", email)
+    logger.info("   Business: %s", business_name)
+    logger.info("   Call Date: %s, Outcome: %s", call_date, call_outcome)
+    logger.info("   Priority: %s", follow_up_priority)
 
     # ==============================================================================
-    # Step 1: Search for contact
+    # Step 1: Check for existing post-call sequence (Idempotency)
     # ==============================================================================
 
-    logger.info(f"🔍 Searching for contact {email} in BusinessX Canada Database...")
-
-    contact = search_contact_by_email(email)
+    logger.info("🔍 Checking for existing post-call sequence for %s...", email)
 
-    if not contact:
-        logger.error(f"❌ Contact not found: {email}")
-        return {
-            "status": "error",
-            "message": f"Contact not found: {email}",
-            "email": email
-        }
-
-    contact_id = contact["id"]
-    logger.info(f"✅ Contact found: {contact_id}")
+    # Start the contact lookup in parallel, but check the sequence first: on
+    # the duplicate path (webhook retries) the contact is never needed
+    contact_task = asyncio.create_task(asyncio.to_thread(search_contact_by_email, email))
 
-    # ==============================================================================
-    # Step 2: Check for existing post-call sequence (Idempotency)
-    # ==============================================================================
-
-    logger.info(f"🔍 Checking for existing post-call sequence for {email}...")
-
-    existing_sequence = search_email_sequence_by_email(email)
+    try:
+        existing_sequence = await asyncio.to_thread(search_email_sequence_by_email, email)
+    except BaseException:
+        contact_task.cancel()
+        raise
 
     if existing_sequence:
-        template_type = existing_sequence.get("properties", {}).get("Template Type", {}).get("select", {}).get("name")
+        template_type = get_template_type(existing_sequence)
 
         if template_type == "Post-Call Follow-Up":
-            logger.info(f"⚠️  Post-call follow-up sequence already exists for {email}")
+            contact_task.cancel()
+            logger.info("⚠️  Post-call follow-up sequence already exists for %s", email)
             return {
                 "status": "skipped",
                 "reason": "duplicate_postcall_sequence",
@@ -237,21 +160,41 @@ def postcall_maybe_handler_flow(
                 "existing_sequence_id": existing_sequence["id"]
             }
         else:
-            logger.info(f"✅ Existing sequence is {template_type}, will create post-call follow-up")
+            logger.info("✅ Existing sequence is %s, will create post-call follow-up", template_type)
+
+    # ==============================================================================
+    # Step 2: Search for contact
+    # ==============================================================================
+
+    logger.info("🔍 Searching for contact %s in BusinessX Canada Database...", email)
+
+    contact = await contact_task
+
+    if not contact:
+        logger.error("❌ Contact not found: %s", email)
+        return {
+            "status": "error",
+            "message": f"Contact not found: {email}",
+            "email": email
+        }
+
+    contact_id = contact["id"]
+    logger.info("✅ Contact found: %s", contact_id)
 
     # ==============================================================================
     # Step 3: Create post-call sequence tracking record
     # ==============================================================================
 
-    logger.info(f"📝 Creating post-call follow-up sequence for {email}...")
+    logger.info("📝 Creating post-call follow-up sequence for %s...", email)
 
     if call_notes:
-        logger.info(f"📝 Call notes: {call_notes[:100]}...")
+        logger.info("📝 Call notes: %s...", call_notes[:100])
 
     if objections:
-        logger.info(f"🚧 Objections: {', '.join(objections)}")
+        logger.info("🚧 Objections: %s", ', '.join(objections))
 
-    sequence = create_postcall_sequence(
+    sequence = await asyncio.to_thread(
+        create_postcall_sequence,
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -263,15 +206,15 @@ def postcall_maybe_handler_flow(
     )
 
     sequence_id = sequence["id"]
-    logger.info(f"✅ Created post-call sequence: {sequence_id}")
+    logger.info("✅ Created post-call sequence: %s", sequence_id)
 
     # ==============================================================================
     # Step 4: Schedule 3-email follow-up sequence
     # ==============================================================================
 
-    logger.info(f"📅 Scheduling 3 post-call follow-up emails for {email}...")
+    logger.info("📅 Scheduling 3 post-call follow-up emails for %s...", email)
 
-    scheduled_emails = schedule_postcall_emails(
+    scheduled_emails = await schedule_postcall_emails(
         email=email,
         first_name=first_name,
         business_name=business_name,
@@ -281,13 +224,13 @@ def postcall_maybe_handler_flow(
         sequence_id=sequence_id
     )
 
-    logger.info(f"✅ Scheduled {len(scheduled_emails)} emails")
+    logger.info("✅ Scheduled %d emails", len(scheduled_emails))
 
     # ==============================================================================
     # Return result
     # ==============================================================================
 
-    logger.info(f"✅ Post-Call Maybe Handler execution complete for {email}")
+    logger.info("✅ Post-Call Maybe Handler execution complete for %s", email)
 
     return {
         "status": "success",
@@ -308,7 +251,7 @@ def postcall_maybe_handler_flow(
 
 if __name__ == "__main__":
     # Test the flow with sample data
-    result = postcall_maybe_handler_flow(
+    result = run_async(postcall_maybe_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Business",
@@ -316,5 +259,5 @@ if __name__ == "__main__":
         call_notes="Interested but needs to check budget",
         objections=["Price", "Timing"],
         follow_up_priority="High"
-    )
+    ))
     print(f"\nFlow Result: {result}")
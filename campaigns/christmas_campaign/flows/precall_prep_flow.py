@@ -17,12 +17,18 @@ Created: 2025-11-19
 """
 
 from prefect import flow, get_run_logger
-from prefect.client.orchestration import PrefectClient
-from typing import Dict, Any, Optional, List
+from prefect.client.orchestration import get_client
+from prefect.states import Scheduled
+from typing import Dict, Any, Optional, List, Collection
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from functools import lru_cache
 from dateutil.parser import parse as parse_datetime
 import asyncio
+import hashlib
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Import Notion operations
@@ -31,6 +37,11 @@ from campaigns.christmas_campaign.tasks.notion_operations import (
     search_contact_by_email,
     update_booking_status
 )
+from campaigns.christmas_campaign.flows._scheduling import get_deployment_id, run_async
+from campaigns.christmas_campaign.tasks.idempotency_store import (
+    get_processed_result,
+    record_processed_result
+)
 
 # Load environment variables
 load_dotenv()
@@ -38,15 +49,107 @@ load_dotenv()
 # Configuration
 TESTING_MODE = os.getenv("TESTING_MODE", "false").lower() == "true"
 
+# Reminder timing (hours before meeting), fixed for the life of the process
+# Production: 72h before, 24h before, 2h before
+# Testing: 6min before, 3min before, 1min before
+_REMINDER_DELAYS_HOURS = (6/60, 3/60, 1/60) if TESTING_MODE else (72, 24, 2)
+_MAX_REMINDER_DELAY_HOURS = max(_REMINDER_DELAYS_HOURS)
+
+# Idempotency namespace for Cal.com booking events
+IDEMPOTENCY_NAMESPACE = "precall"
+
+# Deployment that sends each reminder
+# TODO: Update this when pre-call reminder deployment is created
+PRECALL_REMINDER_DEPLOYMENT_NAME = "christmas-precall-reminder/christmas-precall-reminder"
+
+# Emails recently confirmed to have no Email Sequence record, keyed by a short
+# hash of the lowercased email: {key: cached_at_monotonic}
+# Cal.com redelivers the same booking webhook on retries; a short TTL keeps a
+# sequence created in the meantime from being missed for long. (Contact misses
+# are already cached by search_contact_by_email.)
+SEQUENCE_MISS_CACHE_MAXSIZE = 10_000
+SEQUENCE_MISS_CACHE_TTL_SECONDS = 60
+_SEQUENCE_MISS_CACHE: "OrderedDict[str, float]" = OrderedDict()
+_SEQUENCE_MISS_CACHE_LOCK = threading.Lock()
+
+@lru_cache(maxsize=1024)
+def _parse_meeting(meeting_time: str) -> datetime:
+    """
+    Parse a Cal.com meeting timestamp.
+
+    Cal.com sends strict ISO 8601, which the C-implemented
+    datetime.fromisoformat handles directly (including a "Z" suffix on
+    Python 3.11+); dateutil is only used for anything it rejects.
+
+    Cached because webhook retries deliver the same timestamp again; the
+    returned datetime is immutable, so sharing it is safe.
+
+    Args:
+        meeting_time: ISO 8601 timestamp (e.g., "2025-11-25T14:00:00Z")
+
+    Returns:
+        Parsed meeting datetime
+    """
+    try:
+        return datetime.fromisoformat(meeting_time)
+    except ValueError:
+        return parse_datetime(meeting_time)
+
+
+def _reminder_delays(hours_until_meeting: float) -> tuple:
+    """
+    Select the reminder delays that still fit before the meeting.
+
+    Args:
+        hours_until_meeting: Hours from now until the meeting starts
+
+    Returns:
+        Hours-before-meeting delays to schedule, in reminder order
+    """
+    return tuple(d for d in _REMINDER_DELAYS_HOURS if d < hours_until_meeting)
+
+
+def _search_sequence_unless_missing(email: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up the Email Sequence record, skipping Notion for a recent miss.
+
+    Args:
+        email: Customer email address
+
+    Returns:
+        Email Sequence page object, or None if not found
+    """
+    key = hashlib.blake2b(email.lower().encode("utf-8"), digest_size=8).hexdigest()
+
+    with _SEQUENCE_MISS_CACHE_LOCK:
+        cached_at = _SEQUENCE_MISS_CACHE.get(key)
+        if cached_at is not None:
+            if time.monotonic() - cached_at < SEQUENCE_MISS_CACHE_TTL_SECONDS:
+                return None
+            del _SEQUENCE_MISS_CACHE[key]
+
+    sequence = search_email_sequence_by_email(email)
+
+    if not sequence:
+        with _SEQUENCE_MISS_CACHE_LOCK:
+            _SEQUENCE_MISS_CACHE[key] = time.monotonic()
+            _SEQUENCE_MISS_CACHE.move_to_end(key)
+            while len(_SEQUENCE_MISS_CACHE) > SEQUENCE_MISS_CACHE_MAXSIZE:
+                _SEQUENCE_MISS_CACHE.popitem(last=False)
+
+    return sequence
+
 
 # ==============================================================================
 # Helper Function: Schedule Pre-Call Reminder Emails
 # ==============================================================================
 
-def schedule_precall_reminders(
+async def schedule_precall_reminders(
     email: str,
     name: str,
-    meeting_time: str
+    meeting_time: str,
+    meeting_dt: Optional[datetime] = None,
+    reminder_numbers: Optional[Collection[int]] = None
 ) -> List[Dict[str, Any]]:
     """
     Schedule 3 reminder emails before the meeting.
@@ -60,12 +163,14 @@ def schedule_precall_reminders(
         email: Customer email address
         name: Customer name
         meeting_time: ISO 8601 timestamp from Cal.com
+        meeting_dt: meeting_time already parsed by the caller (parsed here if omitted)
+        reminder_numbers: Only schedule these reminders (all that fit if omitted)
 
     Returns:
         List of scheduled flow run details (email_number, flow_run_id, scheduled_time)
 
     Example:
-        scheduled = schedule_precall_reminders(
+        scheduled = await schedule_precall_reminders(
             email="customer@example.com",
             name="Customer Name",
             meeting_time="2025-11-25T14:00:00Z"
@@ -78,12 +183,13 @@ def schedule_precall_reminders(
     """
     logger = get_run_logger()
 
-    # Parse meeting time
-    try:
-        meeting_dt = parse_datetime(meeting_time)
-    except Exception as e:
-        logger.error(f"❌ Failed to parse meeting time '{meeting_time}': {e}")
-        raise ValueError(f"Invalid meeting time format: {meeting_time}")
+    # Parse meeting time unless the caller already did
+    if meeting_dt is None:
+        try:
+            meeting_dt = _parse_meeting(meeting_time)
+        except Exception as e:
+            logger.error(f"❌ Failed to parse meeting time '{meeting_time}': {e}")
+            raise ValueError(f"Invalid meeting time format: {meeting_time}")
 
     # Calculate current time with same timezone
     now = datetime.now(meeting_dt.tzinfo) if meeting_dt.tzinfo else datetime.now()
@@ -99,23 +205,16 @@ def schedule_precall_reminders(
         logger.warning(f"⚠️ Meeting in <2 hours ({hours_until_meeting:.2f}h), skipping reminders")
         return []
 
-    # Reminder timing (hours before meeting)
-    # Production: 72h before, 24h before, 2h before
-    # Testing: 6min before, 3min before, 1min before
     if TESTING_MODE:
-        delays_hours_before = [6/60, 3/60, 1/60]  # Minutes converted to hours
         logger.info("⚡ TESTING MODE: Using fast delays (minutes before meeting)")
     else:
-        delays_hours_before = [72, 24, 2]  # Production delays (hours before)
         logger.info("🚀 PRODUCTION MODE: Using standard delays (hours before meeting)")
 
-    # Check if we have enough time for all reminders
-    max_delay = max(delays_hours_before)
-    if hours_until_meeting < max_delay:
-        logger.warning(f"⚠️ Meeting in {hours_until_meeting:.2f}h, less than max delay {max_delay}h")
+    # Keep only the reminders that fit before the meeting (single pass)
+    delays_hours_before = _reminder_delays(hours_until_meeting)
+    if len(delays_hours_before) < len(_REMINDER_DELAYS_HOURS):
+        logger.warning(f"⚠️ Meeting in {hours_until_meeting:.2f}h, less than max delay {_MAX_REMINDER_DELAY_HOURS}h")
         logger.warning(f"   Will only schedule reminders that fit before meeting")
-        # Filter delays to only those that fit
-        delays_hours_before = [d for d in delays_hours_before if d < hours_until_meeting]
 
     if not delays_hours_before:
         logger.warning(f"⚠️ No reminders fit before meeting, skipping")
@@ -123,23 +222,25 @@ def schedule_precall_reminders(
 
     scheduled_flows = []
 
-    # Use async context to interact with Prefect API
-    async def schedule_all_reminders():
-        async with PrefectClient() as client:
-            # Find the deployment
-            # TODO: Update this when pre-call reminder deployment is created
-            deployment_name = "christmas-precall-reminder/christmas-precall-reminder"
-
+    try:
+        # Inside a flow run this reuses the run's own open client (and its
+        # connection pool); it is only closed here if it was opened here
+        async with get_client() as client:
+            # Find the deployment (cached across bookings)
             try:
-                deployment = await client.read_deployment_by_name(deployment_name)
-                logger.info(f"✅ Found deployment: {deployment.id}")
+                deployment_id = await get_deployment_id(client, PRECALL_REMINDER_DEPLOYMENT_NAME)
+                logger.info(f"✅ Found deployment: {deployment_id}")
             except Exception as e:
-                logger.error(f"❌ Failed to find deployment '{deployment_name}': {e}")
+                logger.error(f"❌ Failed to find deployment '{PRECALL_REMINDER_DEPLOYMENT_NAME}': {e}")
                 logger.error(f"   Make sure pre-call reminder deployment is created")
                 raise
 
-            # Schedule each of the 3 reminder emails
+            # Submit all reminder creates concurrently
+            pending = {}
             for idx, hours_before in enumerate(delays_hours_before, start=1):
+                if reminder_numbers is not None and idx not in reminder_numbers:
+                    continue
+
                 # Calculate scheduled time (meeting_time - hours_before)
                 scheduled_time = meeting_dt - timedelta(hours=hours_before)
 
@@ -148,41 +249,124 @@ def schedule_precall_reminders(
                     f"({hours_before:.2f} hours before meeting)"
                 )
 
-                # Create flow run with scheduled time
-                flow_run = await client.create_flow_run_from_deployment(
-                    deployment_id=deployment.id,
+                create = asyncio.create_task(client.create_flow_run_from_deployment(
+                    deployment_id=deployment_id,
                     parameters={
                         "reminder_number": idx,
                         "email": email,
                         "name": name,
                         "meeting_time": meeting_time
                     },
-                    state={
-                        "type": "SCHEDULED",
-                        "timestamp": scheduled_time.isoformat()
-                    }
-                )
+                    state=Scheduled(scheduled_time=scheduled_time)
+                ))
+                pending[create] = (idx, scheduled_time, hours_before)
+
+            # Report each reminder as soon as its create finishes; one failed
+            # create must not cancel its siblings
+            errors = []
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for create in done:
+                    idx, scheduled_time, hours_before = pending.pop(create)
+
+                    if create.exception() is not None:
+                        logger.error(f"   ❌ Reminder #{idx} failed to schedule: {create.exception()}")
+                        errors.append(create.exception())
+                        continue
+
+                    flow_run = create.result()
+                    scheduled_flows.append({
+                        "reminder_number": idx,
+                        "flow_run_id": str(flow_run.id),
+                        "scheduled_time": scheduled_time.isoformat(),
+                        "hours_before_meeting": hours_before
+                    })
 
-                scheduled_flows.append({
-                    "reminder_number": idx,
-                    "flow_run_id": str(flow_run.id),
-                    "scheduled_time": scheduled_time.isoformat(),
-                    "hours_before_meeting": hours_before
-                })
+                    logger.info(f"   ✅ Reminder #{idx} scheduled: {flow_run.id}")
 
-                logger.info(f"   ✅ Reminder #{idx} scheduled: {flow_run.id}")
+            # Completion order is arbitrary; report reminders in sequence order
+            scheduled_flows.sort(key=lambda flow_info: flow_info["reminder_number"])
+
+        # Nothing scheduled: surface the failure to the caller
+        if errors and not scheduled_flows:
+            raise errors[0]
 
         return scheduled_flows
 
-    # Run the async function
-    try:
-        result = asyncio.run(schedule_all_reminders())
-        return result
     except Exception as e:
         logger.error(f"❌ Error scheduling reminder sequence: {e}")
         raise
 
 
+async def _schedule_missing_reminders(
+    prior_result: Dict[str, Any],
+    booking_id: str,
+    hours_until_meeting: float,
+    meeting_dt: datetime
+) -> Dict[str, Any]:
+    """
+    Schedule the reminders a partially scheduled booking is still missing.
+
+    Reminders whose send time has passed drop off the front of the plan, so
+    the stored reminder numbers are shifted onto the current plan and back.
+
+    Args:
+        prior_result: Recorded flow result with a "partial" scheduler_result
+        booking_id: Idempotency key of the booking
+        hours_until_meeting: Hours from now until the meeting starts
+        meeting_dt: Parsed meeting time
+
+    Returns:
+        The prior result, updated with the newly scheduled reminders
+    """
+    logger = get_run_logger()
+    scheduler_result = prior_result["scheduler_result"]
+    missing = scheduler_result["failed_reminders"]
+
+    logger.info(f"🔁 Booking partially scheduled, scheduling missing reminders {missing}")
+
+    shift = scheduler_result["planned_count"] - len(_reminder_delays(hours_until_meeting))
+    try:
+        rescheduled = await schedule_precall_reminders(
+            email=prior_result["email"],
+            name=prior_result["name"],
+            meeting_time=prior_result["meeting_time"],
+            meeting_dt=meeting_dt,
+            reminder_numbers=[n - shift for n in missing if n > shift]
+        )
+    except Exception as e:
+        logger.error(f"❌ Failed to schedule missing reminders: {e}")
+        rescheduled = []
+
+    for flow_info in rescheduled:
+        flow_info["reminder_number"] += shift
+
+    scheduled_numbers = {flow_info["reminder_number"] for flow_info in rescheduled}
+    scheduler_result["scheduled_flows"] = sorted(
+        scheduler_result["scheduled_flows"] + rescheduled,
+        key=lambda flow_info: flow_info["reminder_number"]
+    )
+    scheduler_result["scheduled_count"] = len(scheduler_result["scheduled_flows"])
+    # Reminders whose send time has passed are dropped rather than retried
+    scheduler_result["failed_reminders"] = [
+        n for n in missing if n > shift and n not in scheduled_numbers
+    ]
+    scheduler_result["failed_count"] = len(scheduler_result["failed_reminders"])
+    if not scheduler_result["failed_reminders"]:
+        scheduler_result["status"] = "success"
+        del scheduler_result["failed_reminders"]
+        del scheduler_result["failed_count"]
+
+    logger.info(f"✅ Scheduled {len(rescheduled)} of {len(missing)} missing reminders")
+
+    await asyncio.to_thread(
+        record_processed_result, IDEMPOTENCY_NAMESPACE, booking_id, prior_result
+    )
+
+    return prior_result
+
+
 # ==============================================================================
 # Main Flow: Pre-Call Prep
 # ==============================================================================
@@ -192,7 +376,7 @@ def schedule_precall_reminders(
     description="Schedule pre-call prep emails after Cal.com booking",
     log_prints=True
 )
-def precall_prep_flow(
+async def precall_prep_flow(
     email: str,
     name: str,
     meeting_time: str
@@ -202,8 +386,9 @@ def precall_prep_flow(
 
     This flow:
     1. Validates meeting is far enough in future (>2 hours)
-    2. Schedules 3 reminder emails via Prefect Deployment
-    3. Updates Notion Email Sequence DB with meeting info
+    2. Schedules 3 reminder emails via Prefect Deployment, while looking up
+       the customer's Notion records concurrently
+    3. Updates Notion contact with booking status and call date
     4. Returns scheduling status
 
     Args:
@@ -215,7 +400,7 @@ def precall_prep_flow(
         Flow result with status and scheduled_flows
 
     Example:
-        result = precall_prep_flow(
+        result = await precall_prep_flow(
             email="customer@example.com",
             name="Customer Name",
             meeting_time="2025-11-25T14:00:00Z"
@@ -230,7 +415,7 @@ def precall_prep_flow(
     # ==============================================================================
 
     try:
-        meeting_dt = parse_datetime(meeting_time)
+        meeting_dt = _parse_meeting(meeting_time)
         now = datetime.now(meeting_dt.tzinfo) if meeting_dt.tzinfo else datetime.now()
         hours_until_meeting = (meeting_dt - now).total_seconds() / 3600
 
@@ -252,41 +437,76 @@ def precall_prep_flow(
             "email": email
         }
 
+    # Cal.com retries webhook deliveries; return the prior result instead of
+    # scheduling another set of reminders for the same booking, only filling
+    # in any reminders a partially scheduled booking is missing
+    booking_id = f"{email.lower()}|{meeting_dt.isoformat()}"
+    prior_result = await asyncio.to_thread(
+        get_processed_result, IDEMPOTENCY_NAMESPACE, booking_id
+    )
+    if prior_result is not None:
+        if prior_result["scheduler_result"]["status"] == "partial":
+            return await _schedule_missing_reminders(
+                prior_result, booking_id, hours_until_meeting, meeting_dt
+            )
+
+        logger.info(f"⚠️ Booking already processed, returning prior result: {email} @ {meeting_time}")
+        return prior_result
+
     # ==============================================================================
-    # Step 2: Check if customer is in Christmas campaign
+    # Step 2: Look up Notion records and schedule reminders concurrently
     # ==============================================================================
 
+    # The Notion lookups don't depend on the scheduled reminder IDs, so all
+    # three round trips run at once; each failure is handled separately below
     logger.info(f"🔍 Checking if {email} is in Christmas campaign...")
+    logger.info(f"🚀 Scheduling 3 reminder emails before meeting")
 
-    try:
-        sequence = search_email_sequence_by_email(email)
+    sequence, scheduled_flows, contact = await asyncio.gather(
+        asyncio.to_thread(_search_sequence_unless_missing, email),
+        schedule_precall_reminders(
+            email=email,
+            name=name,
+            meeting_time=meeting_time,
+            meeting_dt=meeting_dt
+        ),
+        asyncio.to_thread(search_contact_by_email, email),
+        return_exceptions=True
+    )
 
-        if sequence:
-            sequence_id = sequence["id"]
-            campaign = sequence["properties"]["Campaign"]["select"]["name"]
-            logger.info(f"✅ Found sequence: {sequence_id}, Campaign: {campaign}")
-        else:
-            logger.warning(f"⚠️ No email sequence found for {email}")
-            logger.warning(f"   Customer may not be in Christmas campaign yet")
-            sequence_id = None
+    # ==============================================================================
+    # Step 3: Check if customer is in Christmas campaign
+    # ==============================================================================
 
-    except Exception as e:
-        logger.error(f"❌ Error searching for email sequence: {e}")
+    if isinstance(sequence, Exception):
+        logger.error(f"❌ Error searching for email sequence: {sequence}")
+        sequence_id = None
+
+    elif sequence:
+        sequence_id = sequence["id"]
+        campaign = sequence["properties"]["Campaign"]["select"]["name"]
+        logger.info(f"✅ Found sequence: {sequence_id}, Campaign: {campaign}")
+
+    else:
+        logger.warning(f"⚠️ No email sequence found for {email}")
+        logger.warning(f"   Customer may not be in Christmas campaign yet")
         sequence_id = None
 
     # ==============================================================================
-    # Step 3: Schedule 3 reminder emails via Prefect Deployment
+    # Step 4: Record reminder scheduling result
     # ==============================================================================
 
-    logger.info(f"🚀 Scheduling 3 reminder emails before meeting")
-
-    try:
-        scheduled_flows = schedule_precall_reminders(
-            email=email,
-            name=name,
-            meeting_time=meeting_time
-        )
+    if isinstance(scheduled_flows, Exception):
+        logger.error(f"❌ Failed to schedule reminder sequence: {scheduled_flows}")
+        logger.error(f"   Continuing with booking - reminders will need to be scheduled manually")
+        scheduler_result = {
+            "status": "failed",
+            "scheduled_count": 0,
+            "error": str(scheduled_flows),
+            "note": "Booking accepted but reminder scheduling failed - check deployment"
+        }
 
+    else:
         logger.info(f"✅ Scheduled {len(scheduled_flows)} reminder emails")
         for flow_info in scheduled_flows:
             logger.info(
@@ -300,18 +520,25 @@ def precall_prep_flow(
             "scheduled_flows": scheduled_flows
         }
 
-    except Exception as e:
-        logger.error(f"❌ Failed to schedule reminder sequence: {e}")
-        logger.error(f"   Continuing with booking - reminders will need to be scheduled manually")
-        scheduler_result = {
-            "status": "failed",
-            "scheduled_count": 0,
-            "error": str(e),
-            "note": "Booking accepted but reminder scheduling failed - check deployment"
-        }
+        # Some creates failed: report which, so a redelivery of this booking
+        # schedules only the missing reminders
+        planned_count = len(_reminder_delays(hours_until_meeting))
+        if len(scheduled_flows) < planned_count:
+            scheduled_numbers = {flow_info["reminder_number"] for flow_info in scheduled_flows}
+            failed_reminders = [
+                n for n in range(1, planned_count + 1) if n not in scheduled_numbers
+            ]
+            logger.warning(
+                f"⚠️ Only {len(scheduled_flows)} of {planned_count} reminders scheduled - "
+                f"reminders {failed_reminders} need to be scheduled manually"
+            )
+            scheduler_result["status"] = "partial"
+            scheduler_result["planned_count"] = planned_count
+            scheduler_result["failed_count"] = len(failed_reminders)
+            scheduler_result["failed_reminders"] = failed_reminders
 
     # ==============================================================================
-    # Step 4: Update Notion with meeting info
+    # Step 5: Update Notion with meeting info
     # ==============================================================================
 
     logger.info(f"📝 Updating Notion with meeting booking info...")
@@ -321,46 +548,42 @@ def precall_prep_flow(
         "contact_id": None
     }
 
-    try:
-        # Search for contact in BusinessX Canada database
-        contact = search_contact_by_email(email)
+    if isinstance(contact, Exception):
+        logger.error(f"❌ Error updating Notion with booking info: {contact}")
+        notion_update_result["error"] = str(contact)
 
-        if contact:
-            contact_id = contact["id"]
-            logger.info(f"✅ Found contact: {contact_id}")
+    elif contact:
+        contact_id = contact["id"]
+        logger.info(f"✅ Found contact: {contact_id}")
 
-            # Extract call date from meeting time (YYYY-MM-DD)
-            try:
-                meeting_dt = parse_datetime(meeting_time)
-                call_date = meeting_dt.strftime("%Y-%m-%d")
-
-                # Update booking status
-                update_booking_status(
-                    page_id=contact_id,
-                    status="Booked",
-                    call_date=call_date
-                )
+        # Extract call date from meeting time (YYYY-MM-DD)
+        try:
+            call_date = meeting_dt.strftime("%Y-%m-%d")
 
-                logger.info(f"✅ Updated Notion: Booking Status = Booked, Call Date = {call_date}")
+            # Update booking status
+            await asyncio.to_thread(
+                update_booking_status,
+                page_id=contact_id,
+                status="Booked",
+                call_date=call_date
+            )
 
-                notion_update_result = {
-                    "contact_updated": True,
-                    "contact_id": contact_id,
-                    "booking_status": "Booked",
-                    "call_date": call_date
-                }
+            logger.info(f"✅ Updated Notion: Booking Status = Booked, Call Date = {call_date}")
 
-            except Exception as e:
-                logger.error(f"❌ Error parsing call date or updating Notion: {e}")
-                notion_update_result["error"] = str(e)
+            notion_update_result = {
+                "contact_updated": True,
+                "contact_id": contact_id,
+                "booking_status": "Booked",
+                "call_date": call_date
+            }
 
-        else:
-            logger.warning(f"⚠️ Contact not found in BusinessX Canada database")
-            logger.warning(f"   Customer may need to be added manually")
+        except Exception as e:
+            logger.error(f"❌ Error updating Notion booking status: {e}")
+            notion_update_result["error"] = str(e)
 
-    except Exception as e:
-        logger.error(f"❌ Error updating Notion with booking info: {e}")
-        notion_update_result["error"] = str(e)
+    else:
+        logger.warning(f"⚠️ Contact not found in BusinessX Canada database")
+        logger.warning(f"   Customer may need to be added manually")
 
     # ==============================================================================
     # Return result
@@ -381,23 +604,14 @@ def precall_prep_flow(
     logger.info(f"   Meeting: {meeting_time}, Reminders scheduled: {scheduler_result['scheduled_count']}")
     logger.info(f"   Notion updated: {notion_update_result.get('contact_updated', False)}")
 
-    return result
-
-
-def precall_prep_flow_sync(**kwargs):
-    """
-    Synchronous wrapper for FastAPI BackgroundTasks.
-
-    FastAPI BackgroundTasks expects synchronous functions, but our flow
-    uses async Prefect operations internally. This wrapper handles the conversion.
-
-    Args:
-        **kwargs: All arguments to pass to precall_prep_flow
+    # A booking with no reminders scheduled is left unrecorded so a redelivery
+    # starts over; a partial one is recorded so only the gaps are retried
+    if scheduler_result["status"] != "failed":
+        await asyncio.to_thread(
+            record_processed_result, IDEMPOTENCY_NAMESPACE, booking_id, result
+        )
 
-    Returns:
-        Flow result dict
-    """
-    return precall_prep_flow(**kwargs)
+    return result
 
 
 if __name__ == "__main__":
@@ -412,11 +626,11 @@ if __name__ == "__main__":
     # Test with meeting 3 days in future
     future_meeting = (datetime.now() + timedelta(days=3)).isoformat()
 
-    test_result = precall_prep_flow(
+    test_result = run_async(precall_prep_flow(
         email="customer.test@example.com",
         name="Test Customer",
         meeting_time=future_meeting
-    )
+    ))
 
     print("\n✅ Test completed!")
     print(f"Status: {test_result['status']}")
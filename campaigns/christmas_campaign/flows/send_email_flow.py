@@ -12,13 +12,14 @@ Key Features (Wave 2):
 - Template Fetching: Pulls templates from Notion (NO FALLBACK - templates MUST exist in Notion)
 
 Flow responsibilities:
-1. Idempotency check via Email Sequence DB
-2. Determine template ID based on email number and segment
-3. Fetch template from Notion (raises error if not found)
+1. Determine template ID based on email number and segment
+2. Idempotency check via Email Sequence DB, while fetching the template from
+   Notion concurrently
+3. Validate template (raises error if not found)
 4. Substitute variables with customer data
 5. Send email via Resend
 6. Update Email Sequence DB with "Email X Sent" timestamp
-7. Log analytics
+7. Log analytics (in the background, off the critical path)
 
 Author: Christmas Campaign Team
 Created: 2025-11-16
@@ -26,14 +27,18 @@ Updated: 2025-11-19 (Wave 2 - Email Sequence DB tracking)
 """
 
 from prefect import flow, get_run_logger
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Set
+import asyncio
+import logging
+import threading
 
 # Import Notion operations (Wave 2: Email Sequence DB)
 from campaigns.christmas_campaign.tasks.notion_operations import (
     search_email_sequence_by_email,  # Search Email Sequence DB (not Contacts DB)
     update_email_sequence,            # Update Email Sequence DB
-    fetch_email_template,
+    fetch_email_template_cached,     # Template fetch with in-process TTL cache
     log_email_analytics
 )
 
@@ -46,6 +51,77 @@ from campaigns.christmas_campaign.tasks.resend_operations import (
 # Import routing utilities
 from campaigns.christmas_campaign.tasks.routing import get_email_template_id
 
+# Import event loop runner (uvloop when installed)
+from campaigns.christmas_campaign.flows._scheduling import run_async
+
+logger = logging.getLogger(__name__)
+
+# Email Sequence "Email N Sent" property names, built once per process
+EMAIL_SENT_FIELDS: Dict[int, str] = {n: f"Email {n} Sent" for n in range(1, 8)}
+
+# Analytics writes run on a small background pool so the flow returns without
+# waiting on them. At most ANALYTICS_MAX_PENDING writes are queued; beyond that
+# new entries are dropped. Pool threads are joined at interpreter exit, so
+# queued writes still complete when a worker process finishes a flow run.
+# The pool calls the undecorated log_email_analytics function: a write can
+# outlive the flow run, so going through the Prefect task would create task
+# runs outside the flow-run context and hold a pool thread through retries.
+ANALYTICS_MAX_PENDING = 100
+_ANALYTICS_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="email-analytics")
+_ANALYTICS_PENDING: Set["Future[None]"] = set()
+_ANALYTICS_PENDING_LOCK = threading.Lock()
+
+
+def _run_analytics(kwargs: Dict[str, Any]) -> None:
+    """Write one analytics entry, logging (not raising) any failure."""
+    try:
+        log_email_analytics.fn(**kwargs)
+    except Exception as e:
+        logger.warning("⚠️ Failed to log email analytics: %s", e)
+
+
+def _log_analytics_in_background(**kwargs) -> bool:
+    """
+    Queue a log_email_analytics call without waiting for it.
+
+    Args:
+        **kwargs: Arguments for log_email_analytics
+
+    Returns:
+        True if queued, False if dropped because the queue is full
+    """
+    with _ANALYTICS_PENDING_LOCK:
+        if len(_ANALYTICS_PENDING) >= ANALYTICS_MAX_PENDING:
+            logger.warning("⚠️ Analytics queue full, dropping entry for %s", kwargs.get("email"))
+            return False
+
+        future = _ANALYTICS_EXECUTOR.submit(_run_analytics, kwargs)
+        _ANALYTICS_PENDING.add(future)
+
+    future.add_done_callback(_discard_pending_analytics)
+    return True
+
+
+def _discard_pending_analytics(future: "Future[None]") -> None:
+    """Remove a finished analytics write from the pending set."""
+    with _ANALYTICS_PENDING_LOCK:
+        _ANALYTICS_PENDING.discard(future)
+
+
+def wait_for_pending_analytics(timeout: Optional[float] = None) -> None:
+    """
+    Block until queued analytics writes have finished.
+
+    Args:
+        timeout: Maximum seconds to wait (None waits indefinitely)
+
+    Example:
+        wait_for_pending_analytics(timeout=30)
+    """
+    with _ANALYTICS_PENDING_LOCK:
+        pending = list(_ANALYTICS_PENDING)
+    wait(pending, timeout=timeout)
+
 
 @flow(
     name="christmas-send-email",
@@ -53,7 +129,7 @@ from campaigns.christmas_campaign.tasks.routing import get_email_template_id
     retries=1,
     retry_delay_seconds=300
 )
-def send_email_flow(
+async def send_email_flow(
     email: str,
     email_number: int,
     first_name: str = "there",
@@ -76,7 +152,9 @@ def send_email_flow(
     Send single email in the Christmas campaign nurture sequence.
 
     This flow is deployed 7 times (one per email) and scheduled by the
-    orchestrator flow with calculated delays.
+    orchestrator flow with calculated delays. The Notion and Resend SDK calls
+    are blocking, so each one runs in a worker thread to keep the event loop
+    free for other flow runs.
 
     Args:
         email: Contact email address
@@ -100,7 +178,7 @@ def send_email_flow(
 
     Example:
         # Deployed as "christmas-email-1"
-        result = send_email_flow(
+        result = await send_email_flow(
             email="john@testcorp.com",
             email_number=1,
             first_name="John",
@@ -113,9 +191,24 @@ def send_email_flow(
     logger.info(f"🚀 Starting email #{email_number} send for {email}")
 
     try:
-        # Step 1: Fetch Email Sequence record (idempotency check + get sequence_id)
+        # Step 1: Get template ID based on email number and segment
+        logger.info(f"🎯 Determining template for email #{email_number}, segment: {segment}")
+        template_id = get_email_template_id(email_number, segment)
+        logger.info(f"📧 Using template: {template_id}")
+
+        # Step 2: Fetch Email Sequence record (idempotency check + get sequence_id)
+        # and the template from Notion together - the template ID doesn't depend
+        # on the sequence record. If the send is skipped the template is discarded.
         logger.info(f"📋 Fetching Email Sequence record: {email}")
-        sequence = search_email_sequence_by_email(email)
+        logger.info(f"📥 Fetching template from Notion (cached): {template_id}")
+        sequence, template_data = await asyncio.gather(
+            asyncio.to_thread(search_email_sequence_by_email, email),
+            asyncio.to_thread(fetch_email_template_cached, template_id),
+            return_exceptions=True
+        )
+
+        if isinstance(sequence, Exception):
+            raise sequence
 
         if not sequence:
             logger.error(f"❌ Email Sequence not found for: {email}")
@@ -129,10 +222,15 @@ def send_email_flow(
         sequence_id = sequence["id"]
         logger.info(f"✅ Email Sequence found: {sequence_id}")
 
-        # Step 1b: Idempotency check - verify email hasn't been sent yet
-        email_sent_field = f"Email {email_number} Sent"
-        if sequence["properties"].get(email_sent_field, {}).get("date"):
+        # Step 2b: Idempotency check - verify email hasn't been sent yet
+        email_sent_field = EMAIL_SENT_FIELDS.get(email_number) or f"Email {email_number} Sent"
+        try:
             sent_at = sequence["properties"][email_sent_field]["date"]["start"]
+        except (KeyError, TypeError):
+            # Property missing, or "date" is null because the email isn't sent yet
+            sent_at = None
+
+        if sent_at:
             logger.warning(f"⚠️ Email #{email_number} already sent at {sent_at}")
             logger.warning(f"   Skipping duplicate send (idempotency)")
             return {
@@ -145,16 +243,10 @@ def send_email_flow(
 
         logger.info(f"✅ Idempotency check passed - Email #{email_number} not yet sent")
 
-        # Step 2: Get template ID based on email number and segment
-        logger.info(f"🎯 Determining template for email #{email_number}, segment: {segment}")
-        template_id = get_email_template_id(email_number, segment)
-        logger.info(f"📧 Using template: {template_id}")
-
-        # Step 3: Fetch template from Notion (NO FALLBACK - templates MUST exist in Notion)
-        logger.info(f"📥 Fetching template from Notion: {template_id}")
-        template_data = fetch_email_template(template_id)
+        if isinstance(template_data, Exception):
+            raise template_data
 
-        # Step 3b: Raise error if template not found - NO FALLBACK ALLOWED
+        # Step 3: Raise error if template not found - NO FALLBACK ALLOWED
         if not template_data:
             error_msg = f"Template '{template_id}' not found in Notion. All templates must exist in Notion Email Templates database."
             logger.error(f"❌ {error_msg}")
@@ -190,7 +282,8 @@ def send_email_flow(
 
         # Step 5: Send email via Resend
         logger.info(f"📤 Sending email to {email}")
-        resend_email_id = send_template_email(
+        resend_email_id = await asyncio.to_thread(
+            send_template_email,
             to_email=email,
             subject=subject,
             template=html_body,
@@ -200,20 +293,31 @@ def send_email_flow(
 
         # Step 6: Update Email Sequence DB with "Email X Sent" timestamp
         logger.info(f"📝 Updating Email Sequence DB: Email #{email_number} sent")
-        update_email_sequence(
+        updated_sequence = await asyncio.to_thread(
+            update_email_sequence,
             sequence_id=sequence_id,
             email_number=email_number
         )
         logger.info(f"✅ Email Sequence DB updated: {sequence_id}")
 
-        # Step 7: Log email analytics
+        # Report the timestamp Notion stored, so callers see the same value
+        try:
+            sent_at = updated_sequence["properties"][email_sent_field]["date"]["start"]
+        except (KeyError, TypeError):
+            sent_at = datetime.now().isoformat()
+
+        # Step 7: Log email analytics in the background - the result isn't used,
+        # so the flow doesn't wait on it. Queued only once the sequence update
+        # succeeded, so a failed update doesn't leave both a "sent" and a
+        # "failed" row for the same email
         logger.info("📊 Logging email analytics")
-        log_email_analytics(
+        _log_analytics_in_background(
             email=email,
             template_id=template_id,
             email_number=email_number,
             status="sent",
-            resend_email_id=resend_email_id
+            resend_email_id=resend_email_id,
+            sent_at=sent_at
         )
 
         # Return success
@@ -223,23 +327,20 @@ def send_email_flow(
             "sequence_id": sequence_id,
             "resend_email_id": resend_email_id,
             "template_id": template_id,
-            "sent_at": datetime.now().isoformat()
+            "sent_at": sent_at
         }
 
     except Exception as e:
         logger.error(f"❌ Error sending email #{email_number} to {email}: {e}")
 
-        # Log failure analytics
-        try:
-            log_email_analytics(
-                email=email,
-                template_id=template_id if 'template_id' in locals() else "unknown",
-                email_number=email_number,
-                status="failed",
-                error_message=str(e)
-            )
-        except:
-            pass  # Don't fail if analytics logging fails
+        # Log failure analytics (background; failures there are only logged)
+        _log_analytics_in_background(
+            email=email,
+            template_id=template_id if 'template_id' in locals() else "unknown",
+            email_number=email_number,
+            status="failed",
+            error_message=str(e)
+        )
 
         return {
             "status": "failed",
@@ -255,12 +356,12 @@ def send_email_flow(
 
 if __name__ == "__main__":
     # Test email flow locally
-    result = send_email_flow(
+    result = run_async(send_email_flow(
         email="test@example.com",
         email_number=1,
         first_name="Test",
         business_name="Test Corp",
         segment="OPTIMIZE",
         assessment_score=50
-    )
+    ))
     print(f"\n✅ Test result: {result}")
@@ -21,12 +21,13 @@ Updated: 2025-11-28 (Changed to 5-day sequence, website-first architecture)
 """
 
 from prefect import flow, get_run_logger
-from prefect.client.schemas.schedules import IntervalSchedule
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timedelta
-import os
+from prefect.client.orchestration import get_client
+from prefect.states import Scheduled
+from typing import Any, Awaitable, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import asyncio
+import os
 
 # Import Notion operations
 from campaigns.christmas_campaign.tasks.notion_operations import (
@@ -35,6 +36,11 @@ from campaigns.christmas_campaign.tasks.notion_operations import (
     create_email_sequence,
     update_assessment_data
 )
+from campaigns.christmas_campaign.flows._scheduling import (
+    get_deployment_id,
+    get_testing_mode,
+    run_async
+)
 
 # Load environment variables
 load_dotenv()
@@ -42,12 +48,64 @@ load_dotenv()
 # Note: TESTING_MODE is loaded inside schedule_email_sequence async context
 # to properly access Prefect Secret blocks within the flow runtime
 
+# 5-Day Email Sequence Timing (hours from now), keyed by email number
+# Email 1 is sent by website immediately, so it is normally skipped
+# Production: Email 2 at +24h, Email 3 at +72h, Email 4 at +96h, Email 5 at +120h
+# Testing: Email 2 at +1min, Email 3 at +2min, Email 4 at +3min, Email 5 at +4min
+_DELAYS_HOURS_PROD: Dict[int, float] = {
+    1: 0,       # Email 1: sent by website (Day 0)
+    2: 24,      # Email 2: Day 1 (24 hours)
+    3: 72,      # Email 3: Day 3 (72 hours)
+    4: 96,      # Email 4: Day 4 (96 hours)
+    5: 120      # Email 5: Day 5 (120 hours)
+}
+_DELAYS_HOURS_TEST: Dict[int, float] = {
+    1: 0,       # Email 1: sent by website
+    2: 1/60,    # Email 2: 1 minute
+    3: 2/60,    # Email 3: 2 minutes
+    4: 3/60,    # Email 4: 3 minutes
+    5: 4/60     # Email 5: 4 minutes
+}
+
+# (email_number, "Email N Sent" property) pairs for the 5-day sequence,
+# built once per process for the idempotency check
+_EMAIL_SENT_KEYS = tuple((i, f"Email {i} Sent") for i in range(1, 6))
+
+# Cap on flow-run creates in flight per process, so a signup burst does not
+# flood the Prefect API (override with PREFECT_MAX_CONCURRENT_SCHEDULES)
+PREFECT_MAX_CONCURRENT_SCHEDULES = int(os.getenv("PREFECT_MAX_CONCURRENT_SCHEDULES", "20"))
+_PREFECT_SEM: Optional[asyncio.Semaphore] = None
+_PREFECT_SEM_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+async def _limited(coro: Awaitable[Any]) -> Any:
+    """
+    Await a Prefect API call while holding a slot of the shared semaphore.
+
+    An asyncio.Semaphore is bound to the loop it is first used on, so a new
+    one is created if the current event loop differs.
+
+    Args:
+        coro: Prefect API coroutine (not yet awaited)
+
+    Returns:
+        The coroutine's result
+    """
+    global _PREFECT_SEM, _PREFECT_SEM_LOOP
+
+    loop = asyncio.get_running_loop()
+    if _PREFECT_SEM is None or _PREFECT_SEM_LOOP is not loop:
+        _PREFECT_SEM = asyncio.Semaphore(PREFECT_MAX_CONCURRENT_SCHEDULES)
+        _PREFECT_SEM_LOOP = loop
+
+    async with _PREFECT_SEM:
+        return await coro
+
 
 # ==============================================================================
 # Helper Function: Schedule Email Sequence via Prefect Deployment
 # ==============================================================================
 
-def schedule_email_sequence(
+async def schedule_email_sequence(
     email: str,
     first_name: str,
     business_name: str,
@@ -99,7 +157,7 @@ def schedule_email_sequence(
         List of scheduled flow run details (email_number, flow_run_id, scheduled_time)
 
     Example:
-        scheduled = schedule_email_sequence(
+        scheduled = await schedule_email_sequence(
             email="sarah@example.com",
             first_name="Sarah",
             business_name="Sarah's Salon",
@@ -117,58 +175,29 @@ def schedule_email_sequence(
 
     scheduled_flows = []
 
-    # Use async context to interact with Prefect API
-    async def schedule_all_emails():
-        from prefect.client.orchestration import get_client
-        from prefect.blocks.system import Secret
-
-        # Load TESTING_MODE from Secret block (sync call within async context)
-        testing_mode = False
-        try:
-            secret = Secret.load("testing-mode")
-            value = secret.get()
-            logger.info(f"✅ Loaded TESTING_MODE from Secret block: {value}")
-            # Handle both boolean and string values
-            if isinstance(value, bool):
-                testing_mode = value
-            else:
-                testing_mode = str(value).lower() == "true"
-        except Exception as e:
-            logger.warning(f"⚠️ Failed to load testing-mode Secret: {e}")
-            testing_mode = os.getenv("TESTING_MODE", "false").lower() == "true"
-
-        # 5-Day Email Sequence Timing (hours from now)
-        # Email 1 is sent by website immediately, so we skip it
-        # Production: Email 2 at +24h, Email 3 at +72h, Email 4 at +96h, Email 5 at +120h
-        # Testing: Email 2 at +1min, Email 3 at +2min, Email 4 at +3min, Email 5 at +4min
+    # Nothing left to schedule - skip the Secret and Prefect API lookups
+    if start_from_email > 5:
+        logger.info(f"ℹ️ No emails to schedule (start_from_email={start_from_email})")
+        return scheduled_flows
+
+    try:
+        # Load TESTING_MODE from Secret block (cached across signups)
+        testing_mode = await get_testing_mode(logger)
+
         if testing_mode:
-            # Testing mode: 1 minute between emails
-            delays_hours = {
-                1: 0,       # Email 1: sent by website
-                2: 1/60,    # Email 2: 1 minute
-                3: 2/60,    # Email 3: 2 minutes
-                4: 3/60,    # Email 4: 3 minutes
-                5: 4/60     # Email 5: 4 minutes
-            }
+            delays_hours = _DELAYS_HOURS_TEST
             logger.info("⚡ TESTING MODE: Using fast delays (minutes)")
         else:
-            # Production mode: 5-day sequence
-            delays_hours = {
-                1: 0,       # Email 1: sent by website (Day 0)
-                2: 24,      # Email 2: Day 1 (24 hours)
-                3: 72,      # Email 3: Day 3 (72 hours)
-                4: 96,      # Email 4: Day 4 (96 hours)
-                5: 120      # Email 5: Day 5 (120 hours)
-            }
+            delays_hours = _DELAYS_HOURS_PROD
             logger.info("🚀 PRODUCTION MODE: Using 5-day delays")
 
+        # Inside a flow run this reuses the run's own open client (and its
+        # connection pool); it is only closed here if it was opened here
         async with get_client() as client:
-            # Find the deployment
+            # Find the deployment (cached across invocations)
             try:
-                deployment = await client.read_deployment_by_name(
-                    "christmas-send-email/christmas-send-email"
-                )
-                logger.info(f"✅ Found deployment: {deployment.id}")
+                deployment_id = await get_deployment_id(client)
+                logger.info(f"✅ Found deployment: {deployment_id}")
             except Exception as e:
                 logger.error(f"❌ Failed to find deployment: {e}")
                 logger.error(f"   Make sure to run: python campaigns/christmas_campaign/deployments/deploy_christmas.py")
@@ -176,56 +205,76 @@ def schedule_email_sequence(
 
             # Schedule emails from start_from_email to 5 (5-day sequence)
             # Default: start_from_email=2 (website sends Email 1)
-            for email_number in range(start_from_email, 6):  # 2, 3, 4, 5
+            email_numbers = list(range(start_from_email, 6))  # 2, 3, 4, 5
+
+            # One base time for the whole sequence keeps the offsets exact
+            now = datetime.now(timezone.utc)
+            schedule = []
+            for email_number in email_numbers:
                 delay_hours = delays_hours.get(email_number, 0)
-                scheduled_time = datetime.now() + timedelta(hours=delay_hours)
+                scheduled_time = now + timedelta(hours=delay_hours)
+                schedule.append((email_number, delay_hours, scheduled_time))
 
                 logger.info(
                     f"📧 Scheduling Email #{email_number} for {scheduled_time.strftime('%Y-%m-%d %H:%M:%S')} "
                     f"({delay_hours:.2f} hours from now)"
                 )
 
-                # Create flow run with scheduled time
-                from prefect.states import Scheduled
-
-                flow_run = await client.create_flow_run_from_deployment(
-                    deployment_id=deployment.id,
-                    parameters={
-                        "email_number": email_number,
-                        "email": email,
-                        "first_name": first_name,
-                        "business_name": business_name,
-                        "segment": segment,
-                        "assessment_score": assessment_score,
-                        "red_systems": red_systems,
-                        "orange_systems": orange_systems,
-                        "yellow_systems": yellow_systems,
-                        "green_systems": green_systems,
-                        "gps_score": gps_score,
-                        "money_score": money_score,
-                        "weakest_system_1": weakest_system_1,
-                        "weakest_system_2": weakest_system_2,
-                        "strongest_system": strongest_system,
-                        "revenue_leak_total": revenue_leak_total
-                    },
-                    state=Scheduled(scheduled_time=scheduled_time)
-                )
+            # Parameters shared by every email (only email_number varies)
+            base_params = {
+                "email": email,
+                "first_name": first_name,
+                "business_name": business_name,
+                "segment": segment,
+                "assessment_score": assessment_score,
+                "red_systems": red_systems,
+                "orange_systems": orange_systems,
+                "yellow_systems": yellow_systems,
+                "green_systems": green_systems,
+                "gps_score": gps_score,
+                "money_score": money_score,
+                "weakest_system_1": weakest_system_1,
+                "weakest_system_2": weakest_system_2,
+                "strongest_system": strongest_system,
+                "revenue_leak_total": revenue_leak_total
+            }
+
+            # Create all flow runs concurrently - each is an independent API call,
+            # bounded process-wide by PREFECT_MAX_CONCURRENT_SCHEDULES
+            flow_runs = await asyncio.gather(
+                *(
+                    _limited(client.create_flow_run_from_deployment(
+                        deployment_id=deployment_id,
+                        parameters={**base_params, "email_number": email_number},
+                        state=Scheduled(scheduled_time=scheduled_time)
+                    ))
+                    for email_number, _, scheduled_time in schedule
+                ),
+                return_exceptions=True
+            )
+
+        errors = []
+        for (email_number, delay_hours, scheduled_time), flow_run in zip(schedule, flow_runs):
+            if isinstance(flow_run, Exception):
+                logger.error(f"   ❌ Failed to schedule Email #{email_number}: {flow_run}")
+                errors.append(flow_run)
+                continue
 
-                scheduled_flows.append({
-                    "email_number": email_number,
-                    "flow_run_id": str(flow_run.id),
-                    "scheduled_time": scheduled_time.isoformat(),
-                    "delay_hours": delay_hours
-                })
+            scheduled_flows.append({
+                "email_number": email_number,
+                "flow_run_id": str(flow_run.id),
+                "scheduled_time": scheduled_time.isoformat(),
+                "delay_hours": delay_hours
+            })
 
-                logger.info(f"   ✅ Email #{email_number} scheduled: {flow_run.id}")
+            logger.info(f"   ✅ Email #{email_number} scheduled: {flow_run.id}")
+
+        # Keep the emails that were scheduled; fail only if none were
+        if errors and not scheduled_flows:
+            raise errors[0]
 
         return scheduled_flows
 
-    # Run the async function
-    try:
-        result = asyncio.run(schedule_all_emails())
-        return result
     except Exception as e:
         logger.error(f"❌ Error scheduling email sequence: {e}")
         raise
@@ -236,7 +285,7 @@ def schedule_email_sequence(
     description="Handle Christmas campaign signup and start 5-day email sequence (Emails 2-5)",
     log_prints=True
 )
-def signup_handler_flow(
+async def signup_handler_flow(
     email: str,
     first_name: str,
     business_name: str,
@@ -274,7 +323,7 @@ def signup_handler_flow(
         Flow result with status and sequence_id
 
     Example:
-        result = signup_handler_flow(
+        result = await signup_handler_flow(
             email="sarah@example.com",
             first_name="Sarah",
             business_name="Sarah's Salon",
@@ -295,7 +344,12 @@ def signup_handler_flow(
 
     logger.info(f"🔍 Checking if {email} is already in email sequence...")
 
-    existing_sequence = search_email_sequence_by_email(email)
+    # Both lookups are keyed only by email, so run them in parallel threads;
+    # the contact is used in Step 3
+    existing_sequence, contact = await asyncio.gather(
+        asyncio.to_thread(search_email_sequence_by_email, email),
+        asyncio.to_thread(search_contact_by_email, email)
+    )
 
     if existing_sequence:
         sequence_id = existing_sequence["id"]
@@ -306,10 +360,7 @@ def signup_handler_flow(
 
         # Check if any emails have been sent (5-day sequence)
         props = existing_sequence["properties"]
-        emails_sent = []
-        for i in range(1, 6):  # 5-day sequence: Emails 1-5
-            if props.get(f"Email {i} Sent", {}).get("date"):
-                emails_sent.append(i)
+        emails_sent = [i for i, key in _EMAIL_SENT_KEYS if props.get(key, {}).get("date")]
 
         if emails_sent:
             logger.warning(f"   Emails already sent: {emails_sent}")
@@ -344,17 +395,17 @@ def signup_handler_flow(
     # Step 3: Find or create contact in BusinessX Canada Database
     # ==============================================================================
 
-    logger.info(f"🔍 Searching for contact in BusinessX Canada Database...")
-
-    contact = search_contact_by_email(email)
-
+    # The contact update must finish before the sequence is created: a retry
+    # skips everything once the sequence exists, so creating it after a failed
+    # update would leave the contact without its assessment data
     if contact:
         contact_id = contact["id"]
         logger.info(f"✅ Found existing contact: {contact_id}")
 
         # Update assessment data
         logger.info(f"📝 Updating assessment data for contact {contact_id}...")
-        update_assessment_data(
+        await asyncio.to_thread(
+            update_assessment_data,
             page_id=contact_id,
             assessment_score=assessment_score,
             red_systems=red_systems,
@@ -378,7 +429,8 @@ def signup_handler_flow(
     if not existing_sequence:
         logger.info(f"📝 Creating email sequence record in Email Sequence Database...")
 
-        sequence = create_email_sequence(
+        sequence = await asyncio.to_thread(
+            create_email_sequence,
             email=email,
             first_name=first_name,
             business_name=business_name,
@@ -417,7 +469,7 @@ def signup_handler_flow(
     logger.info(f"   Starting from Email #{start_email}, Sequence ID: {sequence_id}, Segment: {segment}")
 
     try:
-        scheduled_flows = schedule_email_sequence(
+        scheduled_flows = await schedule_email_sequence(
             email=email,
             first_name=first_name,
             business_name=business_name,
@@ -449,6 +501,18 @@ def signup_handler_flow(
             "scheduled_flows": scheduled_flows
         }
 
+        # Some creates failed: report which emails are missing
+        scheduled_numbers = {flow_info["email_number"] for flow_info in scheduled_flows}
+        failed_emails = [n for n in range(start_email, 6) if n not in scheduled_numbers]
+        if failed_emails:
+            logger.warning(
+                f"⚠️ Only {len(scheduled_flows)} of {len(scheduled_flows) + len(failed_emails)} "
+                f"emails scheduled - emails {failed_emails} need to be scheduled manually"
+            )
+            orchestrator_result["status"] = "partial"
+            orchestrator_result["failed_count"] = len(failed_emails)
+            orchestrator_result["failed_emails"] = failed_emails
+
     except Exception as e:
         logger.error(f"❌ Failed to schedule email sequence: {e}")
         logger.error(f"   Continuing with signup - emails will need to be scheduled manually")
@@ -489,7 +553,7 @@ if __name__ == "__main__":
     """
     print("🧪 Testing Christmas Signup Handler Flow...")
 
-    test_result = signup_handler_flow(
+    test_result = run_async(signup_handler_flow(
         email="sarah.test@example.com",
         first_name="Sarah",
         business_name="Sarah's Test Salon",
@@ -503,7 +567,7 @@ if __name__ == "__main__":
         weakest_system_1="GPS",
         weakest_system_2="Money",
         revenue_leak_total=14700
-    )
+    ))
 
     print("\n✅ Test completed!")
     print(f"Status: {test_result['status']}")
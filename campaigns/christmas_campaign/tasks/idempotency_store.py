@@ -0,0 +1,233 @@
+"""
+Webhook-level idempotency store for Christmas Campaign flows.
+
+Webhook providers (Calendly, Cal.com) retry deliveries, and the same event can
+arrive several times. This module persists the result of each successfully
+handled event in a small SQLite database so retries can short-circuit before
+any Notion or Prefect API calls are made.
+
+Keys are SHA-1 hashes of the event identifier (e.g. the Calendly event URI),
+prefixed with a namespace so different flows never collide.
+
+Stored results expire after IDEMPOTENCY_TTL_SECONDS (webhook retries arrive
+within hours, not weeks): expired rows are treated as misses on read and
+deleted periodically on write, so the table stays small.
+
+Configuration (environment variables):
+- IDEMPOTENCY_DB_PATH: SQLite file location. Set this to a path on persistent
+  storage in production (e.g. a mounted volume); the default lives in the
+  user's home directory.
+- IDEMPOTENCY_TTL_SECONDS: How long a result is kept (default: 7 days)
+
+The store is best-effort: any SQLite error is logged and treated as a cache
+miss, so a broken or read-only database never blocks webhook processing.
+
+Author: Christmas Campaign Team
+Created: 2025-11-27
+"""
+
+from contextlib import closing
+from typing import Dict, Any, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+# orjson is already installed as a Prefect dependency; it encodes straight to
+# bytes and is several times faster than the stdlib json module
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Database location used when IDEMPOTENCY_DB_PATH is not set. It survives
+# reboots (unlike the temp dir), but production should set the path explicitly
+DEFAULT_IDEMPOTENCY_DB_PATH = os.path.join(
+    os.path.expanduser("~"), ".christmas_campaign", "idempotency.db"
+)
+
+# Results older than this are treated as misses and pruned
+DEFAULT_IDEMPOTENCY_TTL_SECONDS = 7 * 24 * 3600
+
+# Expired rows are deleted at most once per interval per process
+PRUNE_INTERVAL_SECONDS = 3600
+_last_prune_at: Optional[float] = None
+_prune_lock = threading.Lock()
+
+_warned_default_path = False
+
+_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS idempotency (
+    event_key TEXT PRIMARY KEY,
+    result_json TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idempotency_ts ON idempotency (ts);
+"""
+
+
+def _db_path() -> str:
+    """Return the configured idempotency database path."""
+    global _warned_default_path
+
+    path = os.getenv("IDEMPOTENCY_DB_PATH")
+    if path:
+        return path
+
+    if not _warned_default_path:
+        _warned_default_path = True
+        logger.warning(
+            f"⚠️  IDEMPOTENCY_DB_PATH not set, using {DEFAULT_IDEMPOTENCY_DB_PATH}"
+        )
+    return DEFAULT_IDEMPOTENCY_DB_PATH
+
+
+def _ttl_seconds() -> float:
+    """Return the configured result TTL in seconds."""
+    try:
+        return float(os.getenv("IDEMPOTENCY_TTL_SECONDS", DEFAULT_IDEMPOTENCY_TTL_SECONDS))
+    except ValueError:
+        return DEFAULT_IDEMPOTENCY_TTL_SECONDS
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the idempotency database, creating the table if needed."""
+    path = _db_path()
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=5)
+    conn.executescript(_CREATE_TABLE_SQL)
+    return conn
+
+
+def make_event_key(namespace: str, event_id: str) -> str:
+    """
+    Build the storage key for an event.
+
+    Args:
+        namespace: Flow namespace (e.g. "noshow")
+        event_id: Unique event identifier (e.g. Calendly event URI)
+
+    Returns:
+        Namespaced SHA-1 hex digest of the event identifier
+
+    Example:
+        key = make_event_key("noshow", "https://calendly.com/events/ABC123")
+        # Returns: "noshow:<40-char sha1>"
+    """
+    digest = hashlib.sha1(event_id.encode("utf-8")).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def get_processed_result(namespace: str, event_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored result for an already-processed event.
+
+    Args:
+        namespace: Flow namespace (e.g. "noshow")
+        event_id: Unique event identifier (e.g. Calendly event URI)
+
+    Returns:
+        Stored result dict, or None if the event was not processed yet
+        (or the store is unavailable)
+
+    Example:
+        prior = get_processed_result("noshow", calendly_event_uri)
+        if prior:
+            return prior
+    """
+    if not event_id:
+        return None
+
+    try:
+        with closing(_connect()) as conn:
+            row = conn.execute(
+                "SELECT result_json FROM idempotency WHERE event_key = ? AND ts >= ?",
+                (make_event_key(namespace, event_id), time.time() - _ttl_seconds())
+            ).fetchone()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"⚠️  Idempotency store unavailable, treating as miss: {e}")
+        return None
+
+    # Missing, or older than the TTL
+    if row is None:
+        return None
+
+    try:
+        return orjson.loads(row[0])
+    except orjson.JSONDecodeError:
+        return None
+
+
+def record_processed_result(namespace: str, event_id: str, result: Dict[str, Any]) -> bool:
+    """
+    Persist the result of a successfully processed event.
+
+    Args:
+        namespace: Flow namespace (e.g. "noshow")
+        event_id: Unique event identifier (e.g. Calendly event URI)
+        result: JSON-serializable flow result
+
+    Returns:
+        True if the result was stored, False otherwise
+
+    Example:
+        record_processed_result("noshow", calendly_event_uri, result)
+    """
+    if not event_id:
+        return False
+
+    try:
+        result_json = orjson.dumps(result, default=str).decode("utf-8")
+        with closing(_connect()) as conn:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO idempotency (event_key, result_json, ts) "
+                    "VALUES (?, ?, ?)",
+                    (make_event_key(namespace, event_id), result_json, time.time())
+                )
+    except (sqlite3.Error, OSError, TypeError, ValueError) as e:
+        logger.warning(f"⚠️  Failed to record idempotency key: {e}")
+        return False
+
+    _maybe_prune()
+    return True
+
+
+def prune_expired_results() -> int:
+    """
+    Delete stored results older than the TTL.
+
+    Returns:
+        Number of rows deleted (0 if the store is unavailable)
+
+    Example:
+        deleted = prune_expired_results()
+    """
+    try:
+        with closing(_connect()) as conn:
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM idempotency WHERE ts < ?",
+                    (time.time() - _ttl_seconds(),)
+                )
+                return cursor.rowcount
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"⚠️  Failed to prune idempotency store: {e}")
+        return 0
+
+
+def _maybe_prune() -> None:
+    """Prune expired results if PRUNE_INTERVAL_SECONDS have passed since the last prune."""
+    global _last_prune_at
+
+    now = time.monotonic()
+    with _prune_lock:
+        if _last_prune_at is not None and now - _last_prune_at < PRUNE_INTERVAL_SECONDS:
+            return
+        _last_prune_at = now
+
+    prune_expired_results()
@@ -17,9 +17,13 @@ Created: 2025-11-16
 from prefect import task
 from prefect.blocks.system import Secret
 from notion_client import Client
+from collections import OrderedDict
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Optional, Dict, Any, List, Literal
+from typing import Optional, Dict, Any, List, Literal, Tuple
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables (fallback for local development)
@@ -47,6 +51,48 @@ except Exception as e:
 # Initialize Notion client
 notion = Client(auth=NOTION_TOKEN)
 
+# Contact lookup cache (LRU + TTL), keyed by lowercased email:
+# {email: (contact_or_None, cached_at_monotonic)}
+# Webhook retries and back-to-back handlers for the same contact re-issue the
+# same query; misses use a shorter TTL so a contact that is just being created
+# is picked up quickly.
+CONTACT_CACHE_MAXSIZE = 1024
+CONTACT_CACHE_TTL_SECONDS = 300
+CONTACT_MISS_CACHE_TTL_SECONDS = 30
+_CONTACT_CACHE: "OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = OrderedDict()
+_CONTACT_CACHE_LOCK = threading.Lock()
+
+# In-flight contact lookups, keyed by lowercased email. Simultaneous webhooks
+# for the same contact wait on the first query instead of each hitting Notion.
+_CONTACT_INFLIGHT: Dict[str, "Future[Optional[Dict[str, Any]]]"] = {}
+
+
+def _get_cached_contact(email: str) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Return (hit, contact) from the contact cache, evicting stale entries."""
+    key = email.lower()
+    with _CONTACT_CACHE_LOCK:
+        entry = _CONTACT_CACHE.get(key)
+        if entry is None:
+            return False, None
+
+        contact, cached_at = entry
+        ttl = CONTACT_CACHE_TTL_SECONDS if contact else CONTACT_MISS_CACHE_TTL_SECONDS
+        if time.monotonic() - cached_at >= ttl:
+            del _CONTACT_CACHE[key]
+            return False, None
+
+        _CONTACT_CACHE.move_to_end(key)
+        return True, contact
+
+
+def _cache_contact(email: str, contact: Optional[Dict[str, Any]]) -> None:
+    """Store a contact lookup result, evicting the least recently used entry."""
+    with _CONTACT_CACHE_LOCK:
+        _CONTACT_CACHE[email.lower()] = (contact, time.monotonic())
+        _CONTACT_CACHE.move_to_end(email.lower())
+        while len(_CONTACT_CACHE) > CONTACT_CACHE_MAXSIZE:
+            _CONTACT_CACHE.popitem(last=False)
+
 
 # ==============================================================================
 # Contact Operations
@@ -57,6 +103,10 @@ def search_contact_by_email(email: str) -> Optional[Dict[str, Any]]:
     """
     Search for existing contact in BusinessX Canada database by email.
 
+    Results are cached in-process for CONTACT_CACHE_TTL_SECONDS
+    (CONTACT_MISS_CACHE_TTL_SECONDS when not found), and concurrent lookups
+    for the same email share a single Notion query.
+
     Args:
         email: Contact email address to search for
 
@@ -69,6 +119,23 @@ def search_contact_by_email(email: str) -> Optional[Dict[str, Any]]:
             page_id = contact["id"]
             segment = contact["properties"]["Segment"]["select"]["name"]
     """
+    hit, contact = _get_cached_contact(email)
+    if hit:
+        return contact
+
+    # Join an identical lookup that is already in flight
+    key = email.lower()
+    with _CONTACT_CACHE_LOCK:
+        pending = _CONTACT_INFLIGHT.get(key)
+        if pending is None:
+            pending = _CONTACT_INFLIGHT[key] = Future()
+            is_leader = True
+        else:
+            is_leader = False
+
+    if not is_leader:
+        return pending.result()
+
     try:
         response = notion.databases.query(
             database_id=NOTION_BUSINESSX_DB_ID,
@@ -80,14 +147,20 @@ def search_contact_by_email(email: str) -> Optional[Dict[str, Any]]:
             }
         )
 
-        if response["results"]:
-            return response["results"][0]
-        return None
+        contact = response["results"][0] if response["results"] else None
+        _cache_contact(email, contact)
+        pending.set_result(contact)
+        return contact
 
     except Exception as e:
         print(f"❌ Error searching for contact {email}: {e}")
+        pending.set_exception(e)
         raise
 
+    finally:
+        with _CONTACT_CACHE_LOCK:
+            _CONTACT_INFLIGHT.pop(key, None)
+
 
 @task(retries=3, retry_delay_seconds=60, name="christmas-update-assessment")
 def update_assessment_data(
@@ -549,6 +622,69 @@ def fetch_email_template(template_id: str) -> Optional[Dict[str, Any]]:
         raise
 
 
+# Email template cache (LRU + TTL), keyed by template ID:
+# {template_id: (template_data, cached_at_monotonic)}
+# There are only ~21 templates (7 emails x 3 segments) and they change rarely,
+# so each is fetched from Notion at most once per TTL per worker. Missing
+# templates are not cached, so a newly published template is picked up at once.
+TEMPLATE_CACHE_MAXSIZE = 64
+TEMPLATE_CACHE_TTL_SECONDS = 600
+_TEMPLATE_CACHE: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_TEMPLATE_CACHE_LOCK = threading.Lock()
+
+
+def fetch_email_template_cached(template_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch an email template from Notion, reusing a cached copy while fresh.
+
+    Args:
+        template_id: Template identifier (e.g., "christmas_email_1")
+
+    Returns:
+        Template data dict, or None if not found in Notion
+
+    Example:
+        template = fetch_email_template_cached("christmas_email_1")
+    """
+    with _TEMPLATE_CACHE_LOCK:
+        entry = _TEMPLATE_CACHE.get(template_id)
+        if entry is not None:
+            template_data, cached_at = entry
+            if time.monotonic() - cached_at < TEMPLATE_CACHE_TTL_SECONDS:
+                _TEMPLATE_CACHE.move_to_end(template_id)
+                return template_data
+            del _TEMPLATE_CACHE[template_id]
+
+    template_data = fetch_email_template(template_id)
+    if not template_data:
+        return template_data
+
+    with _TEMPLATE_CACHE_LOCK:
+        _TEMPLATE_CACHE[template_id] = (template_data, time.monotonic())
+        _TEMPLATE_CACHE.move_to_end(template_id)
+        while len(_TEMPLATE_CACHE) > TEMPLATE_CACHE_MAXSIZE:
+            _TEMPLATE_CACHE.popitem(last=False)
+
+    return template_data
+
+
+def invalidate_template(template_id: Optional[str] = None) -> None:
+    """
+    Drop a template from the template cache so the next send refetches it.
+
+    Args:
+        template_id: Template to invalidate, or None to clear the whole cache
+
+    Example:
+        invalidate_template("christmas_email_1")  # After editing it in Notion
+    """
+    with _TEMPLATE_CACHE_LOCK:
+        if template_id is None:
+            _TEMPLATE_CACHE.clear()
+        else:
+            _TEMPLATE_CACHE.pop(template_id, None)
+
+
 # ==============================================================================
 # Customer Portal Operations
 # ==============================================================================
@@ -629,7 +765,8 @@ def log_email_analytics(
     email_number: int,
     status: Literal["sent", "failed"],
     resend_email_id: Optional[str] = None,
-    error_message: Optional[str] = None
+    error_message: Optional[str] = None,
+    sent_at: Optional[str] = None
 ) -> str:
     """
     Log email send event to Email Analytics database.
@@ -641,6 +778,7 @@ def log_email_analytics(
         status: Send status (sent/failed)
         resend_email_id: Resend API email ID (optional)
         error_message: Error message if failed (optional)
+        sent_at: ISO timestamp to record as the Sent Date (optional, defaults to now)
 
     Returns:
         Analytics page ID
@@ -660,7 +798,7 @@ def log_email_analytics(
             "Template ID": {"rich_text": [{"text": {"content": template_id}}]},
             "Email Number": {"number": email_number},
             "Status": {"select": {"name": status}},
-            "Sent Date": {"date": {"start": datetime.now().isoformat()}},
+            "Sent Date": {"date": {"start": sent_at or datetime.now().isoformat()}},
             "Campaign": {"select": {"name": "Christmas Campaign"}}
         }
 
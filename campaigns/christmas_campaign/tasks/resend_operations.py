@@ -14,10 +14,16 @@ Created: 2025-11-16
 
 from prefect import task
 from prefect.blocks.system import Secret
+from requests.adapters import HTTPAdapter
+from resend.http_client_requests import RequestsClient
 import resend
+import requests
+import atexit
 import os
 import re
-from typing import Dict, Any, Optional
+import threading
+import time
+from typing import Dict, Any, List, Mapping, Optional, Tuple, Union
 from dotenv import load_dotenv
 
 # Load environment variables (fallback for local development)
@@ -34,6 +40,70 @@ except Exception as e:
 
 resend.api_key = RESEND_API_KEY
 
+# Resend's default HTTP client calls requests.request(), which opens a fresh
+# connection (TCP + TLS handshake) for every email. Route the SDK through one
+# pooled session instead so consecutive sends reuse keep-alive connections.
+RESEND_POOL_MAXSIZE = 32
+
+# Resend rate-limits each API key (2 requests/second by default) and answers
+# bursts with 429s, which the send tasks would then retry. Requests from this
+# process are spaced evenly under the limit instead.
+RESEND_MAX_REQUESTS_PER_SECOND = 2
+
+
+class _PooledRequestsClient(RequestsClient):
+    """Resend HTTP client that sends every request through one shared requests.Session."""
+
+    def __init__(self, timeout: int = 30):
+        super().__init__(timeout=timeout)
+        self._session = requests.Session()
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._session.mount(
+            "https://",
+            HTTPAdapter(pool_connections=1, pool_maxsize=RESEND_POOL_MAXSIZE)
+        )
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Mapping[str, str],
+        json: Optional[Union[Dict[str, object], List[object]]] = None,
+    ) -> Tuple[bytes, int, Mapping[str, str]]:
+        self._wait_for_rate_limit()
+        try:
+            resp = self._session.request(
+                method=method,
+                url=url,
+                headers=headers,
+                json=json,
+                timeout=self._timeout,
+            )
+            return resp.content, resp.status_code, resp.headers
+        except requests.RequestException as e:
+            # Same contract as RequestsClient: the SDK wraps this in a ResendError
+            raise RuntimeError(f"Request failed: {e}") from e
+
+    def _wait_for_rate_limit(self) -> None:
+        """Block until this request's turn under RESEND_MAX_REQUESTS_PER_SECOND."""
+        with self._rate_lock:
+            now = time.monotonic()
+            request_at = max(now, self._next_request_at)
+            self._next_request_at = request_at + 1 / RESEND_MAX_REQUESTS_PER_SECOND
+
+        # Sleep outside the lock so other threads can reserve their own slots
+        if request_at > now:
+            time.sleep(request_at - now)
+
+    def close(self) -> None:
+        """Close the pooled connections."""
+        self._session.close()
+
+
+resend.default_http_client = _PooledRequestsClient()
+atexit.register(resend.default_http_client.close)
+
 # Sender configuration - using verified galatek.dev domain with alias
 FROM_EMAIL = "value@galatek.dev"
 FROM_NAME = "Sang Le - BusOS"
@@ -84,6 +154,11 @@ def send_email(
         raise
 
 
+# Matches a {{variable}} placeholder. Compiled once so substitution is a single
+# pass over the template, however many variables are supplied.
+_PLACEHOLDER_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+
+
 @task(name="christmas-substitute-variables")
 def substitute_variables(
     template: str,
@@ -106,14 +181,12 @@ def substitute_variables(
         )
         # Result: "Hi John, your score is 45!"
     """
-    result = template
-
-    for key, value in variables.items():
-        # Replace {{key}} with value
-        pattern = r'\{\{' + re.escape(key) + r'\}\}'
-        result = re.sub(pattern, str(value), result)
+    def replace(match: "re.Match[str]") -> str:
+        key = match.group(1)
+        # Unknown placeholders are left as-is
+        return str(variables[key]) if key in variables else match.group(0)
 
-    return result
+    return _PLACEHOLDER_PATTERN.sub(replace, template)
 
 
 @task(retries=3, retry_delay_seconds=30, name="christmas-send-template-email")
@@ -58,6 +58,17 @@ def classify_segment(
     return "OPTIMIZE"
 
 
+# Christmas 2025: 5-Day Sequence templates (exact Notion names - SHORT format),
+# keyed by email number
+_TEMPLATE_IDS: Dict[int, str] = {
+    1: "5-Day E1",
+    2: "5-Day E2",
+    3: "5-Day E3",
+    4: "5-Day E4",
+    5: "5-Day E5"
+}
+
+
 def get_email_template_id(
     email_number: int,
     segment: Literal["CRITICAL", "URGENT", "OPTIMIZE"]
@@ -90,20 +101,8 @@ def get_email_template_id(
         template_id = get_email_template_id(email_number=2, segment="CRITICAL")
         # Returns: "5-Day E2"
     """
-    # Christmas 2025: 5-Day Sequence templates (exact Notion names - SHORT format)
-    templates = {
-        1: "5-Day E1",
-        2: "5-Day E2",
-        3: "5-Day E3",
-        4: "5-Day E4",
-        5: "5-Day E5"
-    }
-
-    if email_number in templates:
-        return templates[email_number]
-    else:
-        # Fallback to Email 1
-        return templates[1]
+    # Fallback to Email 1
+    return _TEMPLATE_IDS.get(email_number, _TEMPLATE_IDS[1])
 
 
 def should_send_discord_alert(segment: Literal["CRITICAL", "URGENT", "OPTIMIZE"]) -> bool:
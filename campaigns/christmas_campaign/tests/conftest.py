@@ -562,3 +562,15 @@ def sample_onboarding_payload() -> Dict[str, Any]:
         "start_date": "2025-12-10",
         "package_type": "Phase 1 - Traditional Service Diagnostic"
     }
+
+
+# ==============================================================================
+# Idempotency Store Fixtures
+# ==============================================================================
+
+@pytest.fixture(autouse=True)
+def isolated_idempotency_store(tmp_path, monkeypatch):
+    """Point the webhook idempotency store at a per-test database."""
+    db_path = tmp_path / "idempotency.db"
+    monkeypatch.setenv("IDEMPOTENCY_DB_PATH", str(db_path))
+    return db_path
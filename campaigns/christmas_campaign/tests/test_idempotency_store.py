@@ -0,0 +1,123 @@
+"""
+Unit tests for the webhook idempotency store.
+
+Tests cover:
+- Key hashing and namespacing
+- Recording and reading processed results
+- Graceful fallback when the database is unavailable
+- TTL expiry and pruning
+
+Author: Christmas Campaign Team
+Created: 2025-11-27
+"""
+
+import os
+import sqlite3
+import time
+
+from campaigns.christmas_campaign.tasks import idempotency_store
+from campaigns.christmas_campaign.tasks.idempotency_store import (
+    make_event_key,
+    get_processed_result,
+    record_processed_result,
+    prune_expired_results
+)
+
+
+class TestMakeEventKey:
+    """Test idempotency key construction."""
+
+    def test_key_is_namespaced_sha1(self):
+        """Test keys are a namespace prefix plus a SHA-1 hex digest."""
+        key = make_event_key("noshow", "https://calendly.com/events/ABC123")
+
+        namespace, digest = key.split(":")
+        assert namespace == "noshow"
+        assert len(digest) == 40
+
+    def test_namespaces_do_not_collide(self):
+        """Test the same event ID maps to different keys per namespace."""
+        assert make_event_key("noshow", "evt") != make_event_key("precall", "evt")
+
+
+class TestProcessedResults:
+    """Test recording and reading processed event results."""
+
+    def test_unknown_event_returns_none(self):
+        """Test an unseen event is a miss."""
+        assert get_processed_result("noshow", "https://calendly.com/events/NEW") is None
+
+    def test_round_trip(self, isolated_idempotency_store):
+        """Test a recorded result is returned for the same event."""
+        result = {"status": "success", "sequence_id": "sequence-456"}
+
+        assert record_processed_result("noshow", "evt-1", result) is True
+        assert get_processed_result("noshow", "evt-1") == result
+        assert get_processed_result("precall", "evt-1") is None
+        assert os.path.exists(isolated_idempotency_store)
+
+    def test_replace_existing_result(self):
+        """Test recording the same event again replaces the stored result."""
+        record_processed_result("noshow", "evt-1", {"status": "success", "run": 1})
+        record_processed_result("noshow", "evt-1", {"status": "success", "run": 2})
+
+        assert get_processed_result("noshow", "evt-1")["run"] == 2
+
+    def test_empty_event_id_is_ignored(self):
+        """Test events without an identifier are never stored."""
+        assert record_processed_result("noshow", "", {"status": "success"}) is False
+        assert get_processed_result("noshow", "") is None
+
+    def test_unavailable_store_is_a_miss(self, tmp_path, monkeypatch):
+        """Test an unusable database path falls back to a cache miss."""
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("")
+        monkeypatch.setenv("IDEMPOTENCY_DB_PATH", str(blocker / "idempotency.db"))
+
+        assert record_processed_result("noshow", "evt-1", {"status": "success"}) is False
+        assert get_processed_result("noshow", "evt-1") is None
+
+
+class TestExpiry:
+    """Test results expire after the TTL and are pruned."""
+
+    def _row_count(self, db_path):
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+
+    def test_expired_result_is_a_miss(self, monkeypatch):
+        """Test a result older than the TTL is no longer returned."""
+        monkeypatch.setenv("IDEMPOTENCY_TTL_SECONDS", "60")
+        record_processed_result("noshow", "evt-1", {"status": "success"})
+
+        later = time.time() + 120
+        monkeypatch.setattr(idempotency_store.time, "time", lambda: later)
+
+        assert get_processed_result("noshow", "evt-1") is None
+
+    def test_prune_deletes_only_expired_rows(self, isolated_idempotency_store, monkeypatch):
+        """Test pruning removes expired rows and keeps fresh ones."""
+        monkeypatch.setenv("IDEMPOTENCY_TTL_SECONDS", "60")
+        monkeypatch.setattr(idempotency_store, "_last_prune_at", time.monotonic())
+        record_processed_result("noshow", "old", {"status": "success"})
+
+        later = time.time() + 120
+        monkeypatch.setattr(idempotency_store.time, "time", lambda: later)
+        record_processed_result("noshow", "new", {"status": "success"})
+
+        assert prune_expired_results() == 1
+        assert self._row_count(isolated_idempotency_store) == 1
+        assert get_processed_result("noshow", "new") == {"status": "success"}
+
+    def test_record_prunes_at_most_once_per_interval(self, monkeypatch):
+        """Test writes trigger pruning only when the interval has passed."""
+        calls = []
+        monkeypatch.setattr(idempotency_store, "_last_prune_at", None)
+        monkeypatch.setattr(
+            idempotency_store, "prune_expired_results", lambda: calls.append(1) or 0
+        )
+
+        record_processed_result("noshow", "evt-1", {"status": "success"})
+        record_processed_result("noshow", "evt-2", {"status": "success"})
+
+        assert len(calls) == 1
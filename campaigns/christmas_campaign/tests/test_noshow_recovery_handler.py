@@ -13,6 +13,7 @@ Created: 2025-11-27
 """
 
 import pytest
+import asyncio
 import os
 from unittest.mock import Mock, patch, MagicMock
 from datetime import datetime, timedelta
@@ -37,6 +38,11 @@ class TestNoShowRecoveryHandlerFlowStructure:
         assert callable(noshow_recovery_handler_flow)
         assert noshow_recovery_handler_flow.__name__ == "noshow_recovery_handler_flow"
 
+    def test_flow_is_async(self):
+        """Test the flow runs natively on the caller's event loop."""
+        import inspect
+        assert inspect.iscoroutinefunction(noshow_recovery_handler_flow.fn)
+
     def test_flow_has_correct_parameters(self):
         """Test flow accepts required parameters."""
         import inspect
@@ -59,13 +65,13 @@ class TestNoShowRecoveryHandlerFlowStructure:
         # Note: This will fail if contact doesn't exist, which is expected
         # Full integration tests will be in Wave 2
         try:
-            result = noshow_recovery_handler_flow(
+            result = asyncio.run(noshow_recovery_handler_flow(
                 email="nonexistent@example.com",
                 first_name="Test",
                 business_name="Test Business",
                 calendly_event_uri="https://calendly.com/events/TEST123",
                 scheduled_time="2025-12-01T14:00:00Z"
-            )
+            ))
             assert isinstance(result, dict)
             assert "status" in result
             assert "email" in result
@@ -118,13 +124,13 @@ class TestNoShowRecoveryHandlerSuccess:
             {"email_number": 3, "flow_run_id": "run-3", "delay_hours": 48}
         ]
 
-        result = noshow_recovery_handler_flow(
+        result = asyncio.run(noshow_recovery_handler_flow(
             email="test@example.com",
             first_name="Test",
             business_name="Test Business",
             calendly_event_uri="https://calendly.com/events/ABC123",
             scheduled_time="2025-12-01T14:00:00Z"
-        )
+        ))
 
         # Verify mocks were called
         assert mock_search_contact.called
@@ -142,23 +148,96 @@ class TestNoShowRecoveryHandlerSuccess:
 class TestNoShowRecoveryHandlerErrors:
     """Test error handling in no-show recovery handler (Wave 2, Feature 2.1)."""
 
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
     @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
-    def test_noshow_handler_contact_not_found(self, mock_search):
+    def test_noshow_handler_contact_not_found(self, mock_search, mock_search_sequence):
         """Test flow handles contact not found error."""
         mock_search.return_value = None
+        mock_search_sequence.return_value = None
 
-        result = noshow_recovery_handler_flow(
+        result = asyncio.run(noshow_recovery_handler_flow(
             email="nonexistent@example.com",
             first_name="Test",
             business_name="Test Business",
             calendly_event_uri="https://calendly.com/events/ABC123",
             scheduled_time="2025-12-01T14:00:00Z"
-        )
+        ))
 
         assert result["status"] == "error"
         assert "not found" in result["message"].lower()
         assert result["email"] == "nonexistent@example.com"
 
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    def test_noshow_handler_ignores_sequence_error_when_contact_missing(
+        self, mock_search, mock_search_sequence
+    ):
+        """Test sequence lookup errors don't mask a missing contact."""
+        mock_search.return_value = None
+        mock_search_sequence.side_effect = Exception("Notion API error")
+
+        result = asyncio.run(noshow_recovery_handler_flow(
+            email="nonexistent@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/ABC123",
+            scheduled_time="2025-12-01T14:00:00Z"
+        ))
+
+        assert result["status"] == "error"
+        assert "not found" in result["message"].lower()
+
+
+class TestNoShowInputValidation:
+    """Test input validation before any Notion call."""
+
+    @pytest.mark.parametrize("email,event_uri,message", [
+        ("not-an-email", "https://calendly.com/events/ABC123", "invalid email format"),
+        ("test @example.com", "https://calendly.com/events/ABC123", "invalid email format"),
+        ("test@example.com", "", "invalid calendly event uri"),
+        ("test@example.com", "https://calendly.com/events/ABC 123", "invalid calendly event uri"),
+    ])
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    def test_invalid_input_skips_notion(
+        self, mock_search_contact, mock_search_sequence, email, event_uri, message
+    ):
+        """Test malformed input is rejected without hitting Notion."""
+        result = asyncio.run(noshow_recovery_handler_flow(
+            email=email,
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri=event_uri,
+            scheduled_time="2025-12-01T14:00:00Z"
+        ))
+
+        assert result["status"] == "error"
+        assert result["message"].lower() == message
+        assert not mock_search_contact.called
+        assert not mock_search_sequence.called
+
+    @pytest.mark.parametrize("event_uri", [
+        "ABC123",
+        "urn:calendly:event:ABC123",
+    ])
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    def test_non_url_event_id_accepted(self, mock_search_contact, mock_search_sequence, event_uri):
+        """Test bare event IDs and URNs pass validation and reach the lookups."""
+        mock_search_contact.return_value = None
+        mock_search_sequence.return_value = None
+
+        result = asyncio.run(noshow_recovery_handler_flow(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri=event_uri,
+            scheduled_time="2025-12-01T14:00:00Z"
+        ))
+
+        assert "not found" in result["message"].lower()
+        mock_search_contact.assert_called_once_with("test@example.com")
+
 
 class TestNoShowIdempotency:
     """Test idempotency for no-show recovery sequence (Wave 2, Feature 2.4)."""
@@ -203,6 +282,36 @@ class TestNoShowIdempotency:
         # Expected behavior: should create new no-show sequence
         pass
 
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.create_noshow_sequence")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_run_logger")
+    def test_duplicate_sequence_short_circuits_with_one_record(
+        self, mock_logger, mock_search_contact, mock_search_sequence, mock_create_sequence
+    ):
+        """Test duplicates return skipped after a single warning record."""
+        logger = mock_logger.return_value
+        logger.isEnabledFor.return_value = False
+        mock_search_contact.return_value = {"id": "contact-123"}
+        mock_search_sequence.return_value = {
+            "id": "sequence-123",
+            "properties": {"Template Type": {"select": {"name": "No-Show Recovery"}}}
+        }
+
+        result = asyncio.run(noshow_recovery_handler_flow.fn(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/DUP123",
+            scheduled_time="2025-12-01T14:00:00Z"
+        ))
+
+        assert result["status"] == "skipped"
+        assert result["existing_sequence_id"] == "sequence-123"
+        assert logger.warning.call_count == 1
+        assert not logger.info.called
+        assert not mock_create_sequence.called
+
 
 class TestNoShowEmailScheduling:
     """Test no-show email scheduling logic (Wave 2, Feature 2.3)."""
@@ -228,6 +337,103 @@ class TestNoShowEmailScheduling:
         # - Email 3: noshow_recovery_email_3
         pass
 
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_deployment_id")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_client")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_testing_mode")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_run_logger")
+    def test_noshow_schedule_emails_parameters(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test each scheduled run gets the shared params plus its own template."""
+        from unittest.mock import AsyncMock
+        from campaigns.christmas_campaign.flows.noshow_recovery_handler import (
+            schedule_noshow_emails
+        )
+
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=[Mock(id=f"run-{n}") for n in range(1, 4)]
+        )
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        scheduled = asyncio.run(schedule_noshow_emails(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/ABC123",
+            scheduled_time="2025-12-01T14:00:00Z",
+            sequence_id="sequence-456"
+        ))
+
+        assert [s["flow_run_id"] for s in scheduled] == ["run-1", "run-2", "run-3"]
+
+        # All emails are offset from the same anchor instant
+        anchors = {
+            datetime.fromisoformat(s["scheduled_time"]) - timedelta(hours=s["delay_hours"])
+            for s in scheduled
+        }
+        assert len(anchors) == 1
+        # Anchored in UTC, so Prefect schedules the same instant on any host
+        assert all(anchor.utcoffset() == timedelta(0) for anchor in anchors)
+
+        calls = client.create_flow_run_from_deployment.await_args_list
+        assert len(calls) == 3
+        for email_number, call in enumerate(calls, start=1):
+            params = call.kwargs["parameters"]
+            assert params["email"] == "test@example.com"
+            assert params["sequence_id"] == "sequence-456"
+            assert params["campaign"] == "Christmas 2025"
+            assert params["template_type"] == "No-Show Recovery"
+            assert params["email_number"] == email_number
+            assert params["template_id"] == f"noshow_recovery_email_{email_number}"
+
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_deployment_id")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_client")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_testing_mode")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_run_logger")
+    def test_noshow_schedule_emails_submits_concurrently(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test all 3 flow-run creates are in flight at the same time."""
+        from unittest.mock import AsyncMock
+        from campaigns.christmas_campaign.flows.noshow_recovery_handler import (
+            schedule_noshow_emails
+        )
+
+        mock_testing_mode.return_value = True
+        mock_deployment_id.return_value = "deployment-123"
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def create_flow_run(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(id=f"run-{kwargs['parameters']['email_number']}")
+
+        client = MagicMock()
+        client.create_flow_run_from_deployment = create_flow_run
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        scheduled = asyncio.run(schedule_noshow_emails(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/ABC123",
+            scheduled_time="2025-12-01T14:00:00Z"
+        ))
+
+        assert max_in_flight == 3
+        assert [s["email_number"] for s in scheduled] == [1, 2, 3]
+        assert [s["flow_run_id"] for s in scheduled] == ["run-1", "run-2", "run-3"]
+
 
 class TestNoShowSequenceCreation:
     """Test no-show sequence creation (Wave 2, Feature 2.2)."""
@@ -256,3 +462,98 @@ class TestNoShowSequenceCreation:
         # - Email 2 Sent (date field)
         # - Email 3 Sent (date field)
         pass
+
+
+class TestNoShowPrefectClient:
+    """Test the Prefect client used for no-show email scheduling."""
+
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_deployment_id")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_client")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_testing_mode")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.get_run_logger")
+    def test_client_is_closed_after_scheduling(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test each scheduling call enters and exits the client context."""
+        from unittest.mock import AsyncMock
+        from campaigns.christmas_campaign.flows.noshow_recovery_handler import (
+            schedule_noshow_emails
+        )
+
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(return_value=Mock(id="run-1"))
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        async def schedule_twice():
+            for _ in range(2):
+                await schedule_noshow_emails(
+                    email="test@example.com",
+                    first_name="Test",
+                    business_name="Test Business",
+                    calendly_event_uri="https://calendly.com/events/ABC123",
+                    scheduled_time="2025-12-01T14:00:00Z"
+                )
+
+        asyncio.run(schedule_twice())
+
+        assert mock_get_client.return_value.__aenter__.await_count == 2
+        assert mock_get_client.return_value.__aexit__.await_count == 2
+
+
+class TestNoShowWebhookIdempotency:
+    """Test webhook-level idempotency keyed on calendly_event_uri."""
+
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.schedule_noshow_emails")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.create_noshow_sequence")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    def test_repeated_event_skips_notion(
+        self, mock_search_contact, mock_search_sequence, mock_create_sequence, mock_schedule
+    ):
+        """Test a retried webhook returns the stored result without Notion calls."""
+        mock_search_contact.return_value = {"id": "contact-123"}
+        mock_search_sequence.return_value = None
+        mock_create_sequence.return_value = {"id": "sequence-456"}
+        mock_schedule.return_value = [
+            {"email_number": 1, "flow_run_id": "run-1", "delay_hours": 0.0833}
+        ]
+
+        kwargs = dict(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/RETRY123",
+            scheduled_time="2025-12-01T14:00:00Z"
+        )
+
+        first = asyncio.run(noshow_recovery_handler_flow(**kwargs))
+        second = asyncio.run(noshow_recovery_handler_flow(**kwargs))
+
+        assert first["status"] == "success"
+        assert second == first
+        assert mock_search_contact.call_count == 1
+        assert mock_create_sequence.call_count == 1
+        assert mock_schedule.call_count == 1
+
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_email_sequence_by_email")
+    @patch("campaigns.christmas_campaign.flows.noshow_recovery_handler.search_contact_by_email")
+    def test_error_result_is_not_recorded(self, mock_search_contact, mock_search_sequence):
+        """Test failed events are retried instead of short-circuited."""
+        mock_search_contact.return_value = None
+        mock_search_sequence.return_value = None
+
+        kwargs = dict(
+            email="missing@example.com",
+            first_name="Test",
+            business_name="Test Business",
+            calendly_event_uri="https://calendly.com/events/MISSING123",
+            scheduled_time="2025-12-01T14:00:00Z"
+        )
+
+        asyncio.run(noshow_recovery_handler_flow(**kwargs))
+        asyncio.run(noshow_recovery_handler_flow(**kwargs))
+
+        assert mock_search_contact.call_count == 2
@@ -711,3 +711,137 @@ class TestFetchTemplateNewFormat:
 
         assert result is not None
         assert result["template_id"] == "5-Day E5"
+
+
+# ==============================================================================
+# Contact Lookup Cache
+# ==============================================================================
+
+class TestSearchContactCache:
+    """Test in-process TTL/LRU cache for search_contact_by_email()."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        from campaigns.christmas_campaign.tasks import notion_operations
+        notion_operations._CONTACT_CACHE.clear()
+        notion_operations._CONTACT_INFLIGHT.clear()
+        yield
+        notion_operations._CONTACT_CACHE.clear()
+        notion_operations._CONTACT_INFLIGHT.clear()
+
+    def test_found_contact_is_cached(self, monkeypatch):
+        """Repeated lookups (any case) hit Notion only once."""
+        from campaigns.christmas_campaign.tasks import notion_operations
+
+        mock_notion = MagicMock()
+        mock_notion.databases.query.return_value = {"results": [{"id": "contact-123"}]}
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.notion",
+            mock_notion
+        )
+
+        first = notion_operations.search_contact_by_email.fn("sarah@example.com")
+        second = notion_operations.search_contact_by_email.fn("Sarah@Example.com")
+
+        assert first == second == {"id": "contact-123"}
+        assert mock_notion.databases.query.call_count == 1
+
+    def test_miss_uses_shorter_ttl(self, monkeypatch):
+        """Not-found results expire after the miss TTL."""
+        from campaigns.christmas_campaign.tasks import notion_operations
+
+        mock_notion = MagicMock()
+        mock_notion.databases.query.side_effect = [
+            {"results": []},
+            {"results": [{"id": "contact-new"}]}
+        ]
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.notion",
+            mock_notion
+        )
+
+        assert notion_operations.search_contact_by_email.fn("new@example.com") is None
+
+        # Age the cached miss past the miss TTL (but within the hit TTL)
+        contact, cached_at = notion_operations._CONTACT_CACHE["new@example.com"]
+        notion_operations._CONTACT_CACHE["new@example.com"] = (
+            contact,
+            cached_at - notion_operations.CONTACT_MISS_CACHE_TTL_SECONDS
+        )
+
+        result = notion_operations.search_contact_by_email.fn("new@example.com")
+
+        assert result == {"id": "contact-new"}
+        assert mock_notion.databases.query.call_count == 2
+
+    def test_cache_evicts_least_recently_used(self, monkeypatch):
+        """Cache size stays bounded by CONTACT_CACHE_MAXSIZE."""
+        from campaigns.christmas_campaign.tasks import notion_operations
+
+        mock_notion = MagicMock()
+        mock_notion.databases.query.return_value = {"results": [{"id": "contact"}]}
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.notion",
+            mock_notion
+        )
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.CONTACT_CACHE_MAXSIZE",
+            2
+        )
+
+        for email in ("a@example.com", "b@example.com", "c@example.com"):
+            notion_operations.search_contact_by_email.fn(email)
+
+        assert list(notion_operations._CONTACT_CACHE) == ["b@example.com", "c@example.com"]
+
+    def test_concurrent_lookups_share_one_query(self, monkeypatch):
+        """Simultaneous lookups for one email issue a single Notion query."""
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from campaigns.christmas_campaign.tasks import notion_operations
+
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_query(**kwargs):
+            started.set()
+            release.wait(timeout=5)
+            return {"results": [{"id": "contact-123"}]}
+
+        mock_notion = MagicMock()
+        mock_notion.databases.query.side_effect = slow_query
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.notion",
+            mock_notion
+        )
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(notion_operations.search_contact_by_email.fn, "sarah@example.com")
+            started.wait(timeout=5)
+            follower = pool.submit(notion_operations.search_contact_by_email.fn, "Sarah@example.com")
+            release.set()
+
+            assert leader.result() == follower.result() == {"id": "contact-123"}
+
+        assert mock_notion.databases.query.call_count == 1
+        assert notion_operations._CONTACT_INFLIGHT == {}
+
+    def test_inflight_error_propagates_and_is_not_cached(self, monkeypatch):
+        """A failed lookup raises and leaves nothing cached or in flight."""
+        from campaigns.christmas_campaign.tasks import notion_operations
+
+        mock_notion = MagicMock()
+        mock_notion.databases.query.side_effect = [
+            Exception("Notion API error"),
+            {"results": [{"id": "contact-123"}]}
+        ]
+        monkeypatch.setattr(
+            "campaigns.christmas_campaign.tasks.notion_operations.notion",
+            mock_notion
+        )
+
+        with pytest.raises(Exception, match="Notion API error"):
+            notion_operations.search_contact_by_email.fn("sarah@example.com")
+
+        assert notion_operations._CONTACT_INFLIGHT == {}
+        assert notion_operations.search_contact_by_email.fn("sarah@example.com") == {"id": "contact-123"}
@@ -12,13 +12,15 @@ Author: Christmas Campaign Team
 Created: 2025-11-27
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, AsyncMock
-from datetime import datetime
+from unittest.mock import Mock, MagicMock, patch, AsyncMock
+from datetime import datetime, timedelta
 
 from campaigns.christmas_campaign.flows.onboarding_handler import (
     onboarding_handler_flow,
-    schedule_onboarding_emails
+    schedule_onboarding_emails,
+    should_handle_onboarding
 )
 
 
@@ -85,33 +87,60 @@ class TestOnboardingHandlerFlowStructure:
 class TestOnboardingHandlerFlow:
     """Test onboarding handler flow functionality (Wave 4)."""
 
+    @pytest.mark.parametrize("payment_confirmed,email,expected", [
+        (True, "test@example.com", True),
+        (False, "test@example.com", False),
+        (True, "not an email", False),
+        (True, "", False),
+    ])
+    def test_should_handle_onboarding(self, payment_confirmed, email, expected):
+        """Test the webhook pre-flight gate mirrors the flow's own validation."""
+        assert should_handle_onboarding(payment_confirmed, email) is expected
+
     def test_flow_rejects_unconfirmed_payment(self):
         """Test flow rejects requests without payment confirmation."""
-        result = onboarding_handler_flow(
+        result = asyncio.run(onboarding_handler_flow(
             email="test@example.com",
             first_name="Test",
             business_name="Test Salon",
             payment_confirmed=False,
             payment_amount=2997.00,
             payment_date="2025-12-01T15:00:00Z"
-        )
+        ))
 
         assert result["status"] == "error"
         assert "payment not confirmed" in result["message"].lower()
 
     @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_contact_by_email')
-    def test_flow_handles_contact_not_found(self, mock_search):
+    def test_flow_rejects_invalid_email(self, mock_search):
+        """Test malformed emails are rejected before any Notion call."""
+        result = asyncio.run(onboarding_handler_flow(
+            email="not an email",
+            first_name="Test",
+            business_name="Test Salon",
+            payment_confirmed=True,
+            payment_amount=2997.00,
+            payment_date="2025-12-01T15:00:00Z"
+        ))
+
+        assert result["status"] == "error"
+        assert "invalid email" in result["message"].lower()
+        assert not mock_search.called
+
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_contact_by_email')
+    def test_flow_handles_contact_not_found(self, mock_search, mock_search_sequence):
         """Test flow handles contact not found gracefully."""
         mock_search.return_value = None
 
-        result = onboarding_handler_flow(
+        result = asyncio.run(onboarding_handler_flow(
             email="nonexistent@example.com",
             first_name="Test",
             business_name="Test Salon",
             payment_confirmed=True,
             payment_amount=2997.00,
             payment_date="2025-12-01T15:00:00Z"
-        )
+        ))
 
         assert result["status"] == "error"
         assert "contact not found" in result["message"].lower()
@@ -135,7 +164,7 @@ class TestOnboardingHandlerFlow:
             {"email_number": 3, "flow_run_id": "run-3"}
         ]
 
-        result = onboarding_handler_flow(
+        result = asyncio.run(onboarding_handler_flow(
             email="test@example.com",
             first_name="Test",
             business_name="Test Salon",
@@ -145,7 +174,7 @@ class TestOnboardingHandlerFlow:
             salon_address="123 Main St",
             observation_dates=["2025-12-10", "2025-12-17"],
             start_date="2025-12-10"
-        )
+        ))
 
         assert result["status"] == "success"
         assert result["sequence_id"] == "test-sequence-456"
@@ -163,19 +192,93 @@ class TestOnboardingHandlerFlow:
         mock_search_contact.return_value = mock_contact
         mock_search_sequence.return_value = mock_onboarding_sequence
 
-        result = onboarding_handler_flow(
+        result = asyncio.run(onboarding_handler_flow(
             email="test@example.com",
             first_name="Test",
             business_name="Test Salon",
             payment_confirmed=True,
             payment_amount=2997.00,
             payment_date="2025-12-01T15:00:00Z"
-        )
+        ))
 
         assert result["status"] == "skipped"
         assert result["reason"] == "duplicate_onboarding_sequence"
         assert "existing_sequence_id" in result
 
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.create_onboarding_sequence')
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_contact_by_email')
+    def test_flow_result_has_exactly_three_scheduled_emails(
+        self, mock_search_contact, mock_search_sequence, mock_create,
+        mock_testing_mode, mock_get_client, mock_deployment_id,
+        mock_contact, mock_onboarding_sequence
+    ):
+        """Test the real scheduler returns 3 entries (no duplicated results)."""
+        mock_search_contact.return_value = mock_contact
+        mock_search_sequence.return_value = None
+        mock_create.return_value = mock_onboarding_sequence
+        mock_testing_mode.return_value = True
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=lambda **kwargs: Mock(id=f"run-{kwargs['parameters']['email_number']}")
+        )
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        result = asyncio.run(onboarding_handler_flow(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Salon",
+            payment_confirmed=True,
+            payment_amount=2997.00,
+            payment_date="2025-12-01T15:00:00Z"
+        ))
+
+        assert result["status"] == "success"
+        assert len(result["scheduled_emails"]) == 3
+        assert [e["email_number"] for e in result["scheduled_emails"]] == [1, 2, 3]
+        assert client.create_flow_run_from_deployment.await_count == 3
+
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.flows.onboarding_handler.search_contact_by_email')
+    def test_flow_searches_contact_and_sequence_concurrently(
+        self, mock_search_contact, mock_search_sequence,
+        mock_contact, mock_onboarding_sequence
+    ):
+        """Test both Notion lookups are in flight at the same time."""
+        import threading
+
+        # Each lookup blocks until the other has started; serial calls time out
+        barrier = threading.Barrier(2, timeout=5)
+
+        def contact_lookup(email):
+            barrier.wait()
+            return mock_contact
+
+        def sequence_lookup(email):
+            barrier.wait()
+            return mock_onboarding_sequence
+
+        mock_search_contact.side_effect = contact_lookup
+        mock_search_sequence.side_effect = sequence_lookup
+
+        result = asyncio.run(onboarding_handler_flow(
+            email="test@example.com",
+            first_name="Test",
+            business_name="Test Salon",
+            payment_confirmed=True,
+            payment_amount=2997.00,
+            payment_date="2025-12-01T15:00:00Z"
+        ))
+
+        assert result["status"] == "skipped"
+        mock_search_contact.assert_called_once_with("test@example.com")
+        mock_search_sequence.assert_called_once_with("test@example.com")
+
 
 class TestOnboardingEmailScheduling:
     """Test onboarding email scheduling function (Wave 4, Feature 4.3)."""
@@ -194,47 +297,83 @@ class TestOnboardingEmailScheduling:
         assert "business_name" in params
         assert "payment_date" in params
 
-    @patch('campaigns.christmas_campaign.flows.onboarding_handler.asyncio.run')
+    def test_schedule_onboarding_emails_is_async(self):
+        """Test the scheduler is a coroutine function awaited by the async flow."""
+        import inspect
+        assert inspect.iscoroutinefunction(schedule_onboarding_emails)
+        assert inspect.iscoroutinefunction(onboarding_handler_flow.fn)
+
+    @pytest.mark.parametrize("testing_mode,expected_delays", [
+        (False, [1, 24, 72]),
+        (True, [1/60, 2/60, 3/60]),
+    ])
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
     @patch('campaigns.christmas_campaign.flows.onboarding_handler.get_run_logger')
-    def test_schedule_onboarding_emails_production_timing(self, mock_logger, mock_asyncio_run):
-        """Test production timing: 1h, 24h, 72h."""
-        mock_asyncio_run.return_value = [
-            {"email_number": 1, "delay_hours": 1},
-            {"email_number": 2, "delay_hours": 24},
-            {"email_number": 3, "delay_hours": 72}
-        ]
+    def test_schedule_onboarding_emails_timing(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id,
+        testing_mode, expected_delays
+    ):
+        """Test production timing (1h, 24h, 72h) and TESTING_MODE timing (1min, 2min, 3min)."""
+
+        mock_testing_mode.return_value = testing_mode
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(return_value=Mock(id="run-1"))
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
 
-        result = schedule_onboarding_emails(
+        result = asyncio.run(schedule_onboarding_emails(
             email="test@example.com",
             first_name="Test",
             business_name="Test Salon",
             payment_date="2025-12-01T15:00:00Z"
-        )
+        ))
 
         assert len(result) == 3
-        assert result[0]["delay_hours"] == 1
-        assert result[1]["delay_hours"] == 24
-        assert result[2]["delay_hours"] == 72
+        assert [r["delay_hours"] for r in result] == expected_delays
+
+        # All emails share one base time, so offsets match the delays exactly
+        times = [datetime.fromisoformat(r["scheduled_time"]) for r in result]
+        assert times[2] - times[0] == timedelta(hours=expected_delays[2] - expected_delays[0])
+        assert all(t.utcoffset() == timedelta(0) for t in times)
 
-    @patch('campaigns.christmas_campaign.flows.onboarding_handler.asyncio.run')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
     @patch('campaigns.christmas_campaign.flows.onboarding_handler.get_run_logger')
-    def test_schedule_onboarding_emails_testing_timing(self, mock_logger, mock_asyncio_run):
-        """Test TESTING_MODE timing: 1min, 2min, 3min."""
-        mock_asyncio_run.return_value = [
-            {"email_number": 1, "delay_hours": 1/60},
-            {"email_number": 2, "delay_hours": 2/60},
-            {"email_number": 3, "delay_hours": 3/60}
-        ]
+    def test_onboarding_flow_runs_created_concurrently(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test the 3 flow-run creates are in flight at the same time."""
+
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+
+        in_flight = 0
+        max_in_flight = 0
 
-        result = schedule_onboarding_emails(
+        async def create_flow_run(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(id=f"run-{kwargs['parameters']['email_number']}")
+
+        client = MagicMock()
+        client.create_flow_run_from_deployment = create_flow_run
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        result = asyncio.run(schedule_onboarding_emails(
             email="test@example.com",
             first_name="Test",
             business_name="Test Salon",
             payment_date="2025-12-01T15:00:00Z"
-        )
+        ))
 
-        assert len(result) == 3
-        # In testing mode, delays should be in minutes
-        assert result[0]["delay_hours"] < 0.02  # ~1 minute
-        assert result[1]["delay_hours"] < 0.04  # ~2 minutes
-        assert result[2]["delay_hours"] < 0.06  # ~3 minutes
+        assert max_in_flight == 3
+        assert [r["flow_run_id"] for r in result] == ["run-1", "run-2", "run-3"]
+        assert [r["email_number"] for r in result] == [1, 2, 3]
@@ -14,8 +14,9 @@ Created: 2025-11-27
 Updated: 2025-11-28 (Wave 6: Comprehensive test coverage)
 """
 
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from datetime import datetime
 
 from campaigns.christmas_campaign.flows.postcall_maybe_handler import (
@@ -79,6 +80,12 @@ class TestPostCallMaybeHandlerFlowStructure:
         assert callable(postcall_maybe_handler_flow)
         assert postcall_maybe_handler_flow.__name__ == "postcall_maybe_handler_flow"
 
+    def test_flow_is_async(self):
+        """Test the flow and scheduler are coroutine functions."""
+        import inspect
+        assert inspect.iscoroutinefunction(postcall_maybe_handler_flow.fn)
+        assert inspect.iscoroutinefunction(schedule_postcall_emails)
+
     def test_flow_has_correct_parameters(self):
         """Test flow accepts required parameters."""
         import inspect
@@ -105,17 +112,18 @@ class TestPostCallMaybeHandlerFlowStructure:
 class TestContactSearch:
     """Test contact search behavior."""
 
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
-    def test_flow_fails_when_contact_not_found(self, mock_search):
+    def test_flow_fails_when_contact_not_found(self, mock_search, mock_search_sequence):
         """Test flow returns error when contact not found."""
         mock_search.return_value = None
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="unknown@example.com",
             first_name="Unknown",
             business_name="Unknown Corp",
             call_date="2025-12-01T14:30:00Z"
-        )
+        ))
 
         assert result["status"] == "error"
         assert "not found" in result["message"].lower()
@@ -135,17 +143,72 @@ class TestContactSearch:
         mock_create.return_value = mock_postcall_sequence
         mock_schedule.return_value = []
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z"
-        )
+        ))
 
         assert result["status"] == "success"
         assert result["contact_id"] == "contact-123"
         mock_search_contact.assert_called_once_with("test@example.com")
 
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.create_postcall_sequence')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
+    def test_flow_result_has_exactly_three_scheduled_emails(
+        self, mock_search_contact, mock_search_sequence, mock_create,
+        mock_testing_mode, mock_get_client, mock_deployment_id,
+        mock_contact, mock_postcall_sequence
+    ):
+        """Test the real scheduler returns 3 entries (no duplicated results)."""
+        mock_search_contact.return_value = mock_contact
+        mock_search_sequence.return_value = None
+        mock_create.return_value = mock_postcall_sequence
+        mock_testing_mode.return_value = True
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=lambda **kwargs: Mock(id=f"run-{kwargs['parameters']['email_number']}")
+        )
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        result = asyncio.run(postcall_maybe_handler_flow(
+            email="test@example.com",
+            first_name="John",
+            business_name="Test Corp",
+            call_date="2025-12-01T14:30:00Z"
+        ))
+
+        assert result["status"] == "success"
+        assert len(result["scheduled_emails"]) == 3
+        assert [e["email_number"] for e in result["scheduled_emails"]] == [1, 2, 3]
+        assert client.create_flow_run_from_deployment.await_count == 3
+
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
+    def test_duplicate_skips_without_waiting_for_contact(
+        self, mock_search_sequence, mock_search_contact, mock_postcall_sequence
+    ):
+        """Test the duplicate path returns without using the contact lookup result."""
+        mock_search_sequence.return_value = mock_postcall_sequence
+        mock_search_contact.side_effect = Exception("Notion API error")
+
+        result = asyncio.run(postcall_maybe_handler_flow(
+            email="test@example.com",
+            first_name="John",
+            business_name="Test Corp",
+            call_date="2025-12-01T14:30:00Z"
+        ))
+
+        assert result["status"] == "skipped"
+        assert result["reason"] == "duplicate_postcall_sequence"
+
 
 # ==============================================================================
 # Idempotency Tests
@@ -164,12 +227,12 @@ class TestIdempotency:
         mock_search_contact.return_value = mock_contact
         mock_search_sequence.return_value = mock_postcall_sequence
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z"
-        )
+        ))
 
         assert result["status"] == "skipped"
         assert result["reason"] == "duplicate_postcall_sequence"
@@ -189,12 +252,12 @@ class TestIdempotency:
         mock_create.return_value = mock_postcall_sequence
         mock_schedule.return_value = []
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z"
-        )
+        ))
 
         # Should create new post-call sequence despite existing lead nurture sequence
         assert result["status"] == "success"
@@ -222,7 +285,7 @@ class TestSequenceCreation:
         mock_create.return_value = mock_postcall_sequence
         mock_schedule.return_value = []
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
@@ -231,7 +294,7 @@ class TestSequenceCreation:
             call_notes="Interested but needs budget approval",
             objections=["Price", "Timing"],
             follow_up_priority="High"
-        )
+        ))
 
         # Verify create_postcall_sequence called with correct params
         mock_create.assert_called_once_with(
@@ -262,12 +325,12 @@ class TestSequenceCreation:
         mock_create.return_value = mock_postcall_sequence
         mock_schedule.return_value = []
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z"
-        )
+        ))
 
         # Verify defaults are used
         call_args = mock_create.call_args
@@ -304,14 +367,14 @@ class TestEmailScheduling:
             {"email_number": 3, "flow_run_id": "run-3"}
         ]
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z",
             call_notes="Test notes",
             objections=["Price"]
-        )
+        ))
 
         # Verify scheduling was called
         mock_schedule.assert_called_once()
@@ -328,6 +391,87 @@ class TestEmailScheduling:
         # Verify result includes scheduled emails
         assert len(result["scheduled_emails"]) == 3
 
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.get_run_logger')
+    def test_postcall_flow_runs_created_concurrently(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test the 3 flow-run creates are in flight at the same time."""
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+
+        in_flight = 0
+        max_in_flight = 0
+
+        async def create_flow_run(**kwargs):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(id=f"run-{kwargs['parameters']['email_number']}")
+
+        client = MagicMock()
+        client.create_flow_run_from_deployment = create_flow_run
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        result = asyncio.run(schedule_postcall_emails(
+            email="test@example.com",
+            first_name="John",
+            business_name="Test Corp",
+            call_date="2025-12-01T14:30:00Z"
+        ))
+
+        assert max_in_flight == 3
+        assert [r["flow_run_id"] for r in result] == ["run-1", "run-2", "run-3"]
+        assert [r["email_number"] for r in result] == [1, 2, 3]
+
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_deployment_id')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_client')
+    @patch('campaigns.christmas_campaign.flows._scheduling.get_testing_mode')
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.get_run_logger')
+    def test_postcall_flow_run_parameters(
+        self, mock_logger, mock_testing_mode, mock_get_client, mock_deployment_id
+    ):
+        """Test each flow run gets the shared parameters plus its own template."""
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        client.create_flow_run_from_deployment = AsyncMock(return_value=Mock(id="run-1"))
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        asyncio.run(schedule_postcall_emails(
+            email="test@example.com",
+            first_name="John",
+            business_name="Test Corp",
+            call_date="2025-12-01T14:30:00Z",
+            call_notes="Needs budget approval",
+            objections=["Price"],
+            sequence_id="sequence-456"
+        ))
+
+        calls = client.create_flow_run_from_deployment.call_args_list
+        assert len(calls) == 3
+        for email_number, call in enumerate(calls, start=1):
+            assert call.kwargs["parameters"] == {
+                "email": "test@example.com",
+                "first_name": "John",
+                "business_name": "Test Corp",
+                "sequence_id": "sequence-456",
+                "call_date": "2025-12-01T14:30:00Z",
+                "call_notes": "Needs budget approval",
+                "objections": ["Price"],
+                "campaign": "Christmas 2025",
+                "template_type": "Post-Call Follow-Up",
+                "template_id": f"postcall_maybe_email_{email_number}",
+                "email_number": email_number
+            }
+
+
 
 # ==============================================================================
 # Result Structure Tests
@@ -350,13 +494,13 @@ class TestResultStructure:
         mock_create.return_value = mock_postcall_sequence
         mock_schedule.return_value = []
 
-        result = postcall_maybe_handler_flow(
+        result = asyncio.run(postcall_maybe_handler_flow(
             email="test@example.com",
             first_name="John",
             business_name="Test Corp",
             call_date="2025-12-01T14:30:00Z",
             call_outcome="Maybe"
-        )
+        ))
 
         # Verify all required fields present
         assert "status" in result
@@ -385,18 +529,19 @@ class TestResultStructure:
 class TestErrorHandling:
     """Test error handling scenarios."""
 
+    @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
-    def test_handles_contact_search_exception(self, mock_search):
+    def test_handles_contact_search_exception(self, mock_search, mock_search_sequence):
         """Test flow handles Notion API exception during contact search."""
         mock_search.side_effect = Exception("Notion API error")
 
         with pytest.raises(Exception, match="Notion API error"):
-            postcall_maybe_handler_flow(
+            asyncio.run(postcall_maybe_handler_flow(
                 email="test@example.com",
                 first_name="John",
                 business_name="Test Corp",
                 call_date="2025-12-01T14:30:00Z"
-            )
+            ))
 
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
@@ -410,12 +555,12 @@ class TestErrorHandling:
         mock_create.side_effect = Exception("Failed to create sequence")
 
         with pytest.raises(Exception, match="Failed to create sequence"):
-            postcall_maybe_handler_flow(
+            asyncio.run(postcall_maybe_handler_flow(
                 email="test@example.com",
                 first_name="John",
                 business_name="Test Corp",
                 call_date="2025-12-01T14:30:00Z"
-            )
+            ))
 
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_contact_by_email')
     @patch('campaigns.christmas_campaign.flows.postcall_maybe_handler.search_email_sequence_by_email')
@@ -432,9 +577,9 @@ class TestErrorHandling:
         mock_schedule.side_effect = Exception("Deployment not found")
 
         with pytest.raises(Exception, match="Deployment not found"):
-            postcall_maybe_handler_flow(
+            asyncio.run(postcall_maybe_handler_flow(
                 email="test@example.com",
                 first_name="John",
                 business_name="Test Corp",
                 call_date="2025-12-01T14:30:00Z"
-            )
+            ))
@@ -0,0 +1,510 @@
+"""
+Unit tests for Pre-Call Prep Flow reminder scheduling.
+
+Tests cover:
+- Flow structure (async)
+- Concurrent creation of the reminder flow runs
+- Partial and total scheduling failures
+- Deployment lookup caching
+- Concurrent Notion lookups and per-step failure handling in the flow
+- Booking idempotency on webhook retries
+- Email Sequence miss caching
+- Meeting timestamp parsing
+- Shared Prefect client reuse
+
+Author: Christmas Campaign Team
+Created: 2025-11-28
+"""
+
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from campaigns.christmas_campaign.flows import _scheduling, precall_prep_flow
+from campaigns.christmas_campaign.flows.precall_prep_flow import (
+    precall_prep_flow as precall_flow,
+    schedule_precall_reminders
+)
+
+
+# ==============================================================================
+# Test Fixtures
+# ==============================================================================
+
+@pytest.fixture
+def meeting_time():
+    """Meeting far enough ahead for all three production reminders."""
+    return (datetime.now(timezone.utc) + timedelta(days=5)).isoformat()
+
+
+@pytest.fixture
+def scheduled_reminders(meeting_time):
+    """A full set of three scheduled production reminders."""
+    return [
+        {
+            "reminder_number": n,
+            "flow_run_id": f"run-{n}",
+            "scheduled_time": meeting_time,
+            "hours_before_meeting": hours
+        }
+        for n, hours in enumerate((72, 24, 2), start=1)
+    ]
+
+
+@pytest.fixture
+def mock_client():
+    """Prefect client usable as an async context manager."""
+    client = MagicMock()
+    client.__aenter__ = AsyncMock(return_value=client)
+    client.__aexit__ = AsyncMock(return_value=None)
+    client.read_deployment_by_name = AsyncMock(return_value=MagicMock(id=uuid4()))
+    return client
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """Start every test without a cached deployment ID or sequence miss."""
+    precall_prep_flow._SEQUENCE_MISS_CACHE.clear()
+    _scheduling._DEPLOYMENT_ID_CACHE.clear()
+    yield
+    precall_prep_flow._SEQUENCE_MISS_CACHE.clear()
+    _scheduling._DEPLOYMENT_ID_CACHE.clear()
+
+
+# ==============================================================================
+# Flow Structure Tests
+# ==============================================================================
+
+class TestFlowStructure:
+    """Test pre-call prep flow structure."""
+
+    def test_flow_is_async(self):
+        """Test the flow and scheduler are coroutine functions."""
+        import inspect
+        assert inspect.iscoroutinefunction(precall_flow.fn)
+        assert inspect.iscoroutinefunction(schedule_precall_reminders)
+
+
+# ==============================================================================
+# Reminder Scheduling Tests
+# ==============================================================================
+
+class TestSchedulePrecallReminders:
+    """Test schedule_precall_reminders."""
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_reminders_created_concurrently(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """All three creates are in flight at the same time."""
+        mock_get_client.return_value = mock_client
+        barrier = asyncio.Barrier(3)
+
+        async def create(**kwargs):
+            # Deadlocks (and times out) if the creates run one after another
+            await asyncio.wait_for(barrier.wait(), timeout=2)
+            return MagicMock(id=uuid4())
+
+        mock_client.create_flow_run_from_deployment = AsyncMock(side_effect=create)
+
+        result = asyncio.run(schedule_precall_reminders("test@example.com", "Test", meeting_time))
+
+        assert [r["reminder_number"] for r in result] == [1, 2, 3]
+        assert [r["hours_before_meeting"] for r in result] == [72, 24, 2]
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_reminders_reported_as_they_complete(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """Each reminder is logged when its create finishes; results stay in order."""
+        mock_get_client.return_value = mock_client
+
+        async def create(**kwargs):
+            # Reminder 1 finishes last, reminder 3 first
+            await asyncio.sleep(0.01 * (4 - kwargs["parameters"]["reminder_number"]))
+            return MagicMock(id=uuid4())
+
+        mock_client.create_flow_run_from_deployment = AsyncMock(side_effect=create)
+
+        result = asyncio.run(schedule_precall_reminders("test@example.com", "Test", meeting_time))
+
+        scheduled_logs = [
+            call.args[0] for call in mock_logger.return_value.info.call_args_list
+            if "scheduled:" in call.args[0]
+        ]
+        assert [line.split("#")[1][0] for line in scheduled_logs] == ["3", "2", "1"]
+        assert [r["reminder_number"] for r in result] == [1, 2, 3]
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_one_failed_reminder_keeps_the_others(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """A failed create is logged and skipped without dropping its siblings."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(side_effect=[
+            MagicMock(id=uuid4()),
+            Exception("Prefect API error"),
+            MagicMock(id=uuid4())
+        ])
+
+        result = asyncio.run(schedule_precall_reminders("test@example.com", "Test", meeting_time))
+
+        assert [r["reminder_number"] for r in result] == [1, 3]
+        mock_logger.return_value.error.assert_called()
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_only_requested_reminders_scheduled(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """reminder_numbers limits scheduling to those reminders."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(return_value=MagicMock(id=uuid4()))
+
+        result = asyncio.run(schedule_precall_reminders(
+            "test@example.com", "Test", meeting_time, reminder_numbers=[2]
+        ))
+
+        assert [r["reminder_number"] for r in result] == [2]
+        assert [r["hours_before_meeting"] for r in result] == [24]
+        assert mock_client.create_flow_run_from_deployment.await_count == 1
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_all_reminders_failed_raises(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """The error is raised when no reminder could be scheduled."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=Exception("Prefect API error")
+        )
+
+        with pytest.raises(Exception, match="Prefect API error"):
+            asyncio.run(schedule_precall_reminders("test@example.com", "Test", meeting_time))
+
+    @pytest.mark.parametrize("hours_until_meeting, expected_delays", [
+        (100, [72, 24, 2]),
+        (48, [24, 2]),
+        (10, [2]),
+    ])
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_only_reminders_that_fit_are_scheduled(
+        self, mock_get_client, mock_logger, mock_client, hours_until_meeting, expected_delays
+    ):
+        """Reminders that would fall before now are dropped."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=lambda **kwargs: MagicMock(id=uuid4())
+        )
+        meeting_time = (datetime.now(timezone.utc) + timedelta(hours=hours_until_meeting)).isoformat()
+
+        result = asyncio.run(schedule_precall_reminders("test@example.com", "Test", meeting_time))
+
+        assert [r["hours_before_meeting"] for r in result] == expected_delays
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_deployment_lookup_cached_across_bookings(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """The deployment is read once and reused for later bookings."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=lambda **kwargs: MagicMock(id=uuid4())
+        )
+
+        async def book_twice():
+            await schedule_precall_reminders("first@example.com", "First", meeting_time)
+            await schedule_precall_reminders("second@example.com", "Second", meeting_time)
+
+        asyncio.run(book_twice())
+
+        mock_client.read_deployment_by_name.assert_awaited_once_with(
+            precall_prep_flow.PRECALL_REMINDER_DEPLOYMENT_NAME
+        )
+        assert mock_client.create_flow_run_from_deployment.await_count == 6
+
+
+# ==============================================================================
+# Flow Execution Tests
+# ==============================================================================
+
+class TestPrecallPrepFlowExecution:
+    """Test precall_prep_flow step orchestration."""
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_notion_lookups_run_concurrently(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update, meeting_time
+    ):
+        """Both Notion lookups are in flight at the same time."""
+        barrier = threading.Barrier(2, timeout=2)
+
+        def search_sequence(email):
+            # Raises BrokenBarrierError if the lookups run one after another
+            barrier.wait()
+            return None
+
+        def search_contact(email):
+            barrier.wait()
+            return {"id": "contact-123"}
+
+        mock_search_sequence.side_effect = search_sequence
+        mock_search_contact.side_effect = search_contact
+        mock_schedule.return_value = [{
+            "reminder_number": 1,
+            "flow_run_id": "run-1",
+            "scheduled_time": meeting_time,
+            "hours_before_meeting": 72
+        }]
+
+        result = asyncio.run(precall_flow(
+            email="test@example.com", name="Test", meeting_time=meeting_time
+        ))
+
+        assert result["scheduler_result"]["scheduled_count"] == 1
+        assert result["notion_update_result"]["contact_updated"] is True
+        mock_update.assert_called_once()
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_failed_lookups_do_not_block_scheduling(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update,
+        meeting_time, scheduled_reminders
+    ):
+        """Notion errors are recorded while reminders are still scheduled."""
+        mock_search_sequence.side_effect = Exception("Notion API error")
+        mock_search_contact.side_effect = Exception("Notion API error")
+        mock_schedule.return_value = scheduled_reminders
+
+        result = asyncio.run(precall_flow(
+            email="test@example.com", name="Test", meeting_time=meeting_time
+        ))
+
+        assert result["status"] == "success"
+        assert result["sequence_id"] is None
+        assert result["scheduler_result"]["status"] == "success"
+        assert result["notion_update_result"]["error"] == "Notion API error"
+        mock_schedule.assert_awaited_once()
+        mock_update.assert_not_called()
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_failed_scheduling_still_updates_notion(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update, meeting_time
+    ):
+        """A scheduling failure is recorded while Notion is still updated."""
+        mock_search_sequence.return_value = None
+        mock_search_contact.return_value = {"id": "contact-123"}
+        mock_schedule.side_effect = Exception("Deployment not found")
+
+        result = asyncio.run(precall_flow(
+            email="test@example.com", name="Test", meeting_time=meeting_time
+        ))
+
+        assert result["scheduler_result"]["status"] == "failed"
+        assert result["scheduler_result"]["error"] == "Deployment not found"
+        assert result["notion_update_result"]["contact_updated"] is True
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_meeting_time_parsed_once(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update, meeting_time
+    ):
+        """The parsed meeting datetime is reused by scheduling and the Notion update."""
+        mock_search_sequence.return_value = None
+        mock_search_contact.return_value = {"id": "contact-123"}
+        mock_schedule.return_value = []
+        precall_prep_flow._parse_meeting.cache_clear()
+
+        result = asyncio.run(precall_flow(
+            email="test@example.com", name="Test", meeting_time=meeting_time
+        ))
+
+        cache_info = precall_prep_flow._parse_meeting.cache_info()
+        assert (cache_info.hits, cache_info.misses) == (0, 1)
+        meeting_dt = mock_schedule.call_args.kwargs["meeting_dt"]
+        assert meeting_dt == datetime.fromisoformat(meeting_time)
+        assert result["notion_update_result"]["call_date"] == meeting_dt.strftime("%Y-%m-%d")
+
+
+class TestPrecallIdempotency:
+    """Test booking-level idempotency for Cal.com webhook retries."""
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_retried_booking_not_rescheduled(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update,
+        meeting_time, scheduled_reminders
+    ):
+        """A redelivered booking returns the prior result without scheduling again."""
+        mock_search_sequence.return_value = None
+        mock_search_contact.return_value = None
+        mock_schedule.return_value = scheduled_reminders
+
+        async def book_twice():
+            first = await precall_flow(email="test@example.com", name="Test", meeting_time=meeting_time)
+            second = await precall_flow(email="TEST@example.com", name="Test", meeting_time=meeting_time)
+            return first, second
+
+        first, second = asyncio.run(book_twice())
+
+        assert second == first
+        mock_schedule.assert_awaited_once()
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_failed_scheduling_retried(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update,
+        meeting_time, scheduled_reminders
+    ):
+        """A booking whose reminders failed to schedule is processed again."""
+        mock_search_sequence.return_value = None
+        mock_search_contact.return_value = None
+        mock_schedule.side_effect = [Exception("Deployment not found"), scheduled_reminders]
+
+        async def book_twice():
+            await precall_flow(email="test@example.com", name="Test", meeting_time=meeting_time)
+            return await precall_flow(email="test@example.com", name="Test", meeting_time=meeting_time)
+
+        second = asyncio.run(book_twice())
+
+        assert second["scheduler_result"]["status"] == "success"
+        assert mock_schedule.await_count == 2
+
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.update_booking_status')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.schedule_precall_reminders')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_contact_by_email')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_partially_scheduled_booking_retries_missing_reminders(
+        self, mock_search_sequence, mock_search_contact, mock_schedule, mock_update,
+        meeting_time, scheduled_reminders
+    ):
+        """A redelivered partial booking schedules only the missing reminders."""
+        mock_search_sequence.return_value = None
+        mock_search_contact.return_value = None
+        mock_schedule.side_effect = [scheduled_reminders[:1], scheduled_reminders[1:]]
+
+        async def book_twice():
+            first = await precall_flow(email="test@example.com", name="Test", meeting_time=meeting_time)
+            second = await precall_flow(email="test@example.com", name="Test", meeting_time=meeting_time)
+            return first, second
+
+        first, second = asyncio.run(book_twice())
+
+        assert first["scheduler_result"]["status"] == "partial"
+        assert first["scheduler_result"]["failed_count"] == 2
+        assert first["scheduler_result"]["failed_reminders"] == [2, 3]
+
+        assert mock_schedule.await_count == 2
+        assert mock_schedule.await_args.kwargs["reminder_numbers"] == [2, 3]
+        assert second["scheduler_result"]["status"] == "success"
+        assert [
+            r["reminder_number"] for r in second["scheduler_result"]["scheduled_flows"]
+        ] == [1, 2, 3]
+
+
+class TestSequenceMissCache:
+    """Test the negative cache for Email Sequence lookups."""
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_recent_miss_skips_notion(self, mock_search):
+        """A redelivered booking doesn't query Notion again for a missing sequence."""
+        mock_search.return_value = None
+
+        assert precall_prep_flow._search_sequence_unless_missing("test@example.com") is None
+        assert precall_prep_flow._search_sequence_unless_missing("TEST@example.com") is None
+
+        mock_search.assert_called_once_with("test@example.com")
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_found_sequence_not_cached(self, mock_search):
+        """Found sequences are always looked up fresh."""
+        mock_search.return_value = {"id": "sequence-123"}
+
+        precall_prep_flow._search_sequence_unless_missing("test@example.com")
+        precall_prep_flow._search_sequence_unless_missing("test@example.com")
+
+        assert mock_search.call_count == 2
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.SEQUENCE_MISS_CACHE_TTL_SECONDS', 0)
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.search_email_sequence_by_email')
+    def test_expired_miss_queries_again(self, mock_search):
+        """An expired miss is looked up again."""
+        mock_search.side_effect = [None, {"id": "sequence-123"}]
+
+        assert precall_prep_flow._search_sequence_unless_missing("test@example.com") is None
+        assert precall_prep_flow._search_sequence_unless_missing("test@example.com") == {"id": "sequence-123"}
+
+
+class TestParseMeeting:
+    """Test meeting timestamp parsing."""
+
+    def setup_method(self):
+        precall_prep_flow._parse_meeting.cache_clear()
+
+    @pytest.mark.parametrize("meeting_time, expected", [
+        ("2025-11-25T14:00:00Z", datetime(2025, 11, 25, 14, 0, tzinfo=timezone.utc)),
+        ("2025-11-25T14:00:00.000Z", datetime(2025, 11, 25, 14, 0, tzinfo=timezone.utc)),
+        ("2025-11-25T09:00:00-05:00", datetime(2025, 11, 25, 14, 0, tzinfo=timezone.utc)),
+    ])
+    def test_iso_8601(self, meeting_time, expected):
+        """Cal.com ISO 8601 timestamps parse without dateutil."""
+        with patch('campaigns.christmas_campaign.flows.precall_prep_flow.parse_datetime') as mock_parse:
+            assert precall_prep_flow._parse_meeting(meeting_time) == expected
+
+        mock_parse.assert_not_called()
+
+    def test_falls_back_to_dateutil(self):
+        """Non-ISO input is still accepted via dateutil."""
+        parsed = precall_prep_flow._parse_meeting("November 25, 2025 2:00 PM UTC")
+
+        assert parsed == datetime(2025, 11, 25, 14, 0, tzinfo=timezone.utc)
+
+    def test_invalid_input_raises(self):
+        """Unparseable input still raises."""
+        with pytest.raises(ValueError):
+            precall_prep_flow._parse_meeting("not-a-date")
+
+
+class TestPrecallPrefectClient:
+    """Test the Prefect client used for reminder scheduling."""
+
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow._REMINDER_DELAYS_HOURS', (72, 24, 2))
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_run_logger')
+    @patch('campaigns.christmas_campaign.flows.precall_prep_flow.get_client')
+    def test_client_is_closed_after_scheduling(self, mock_get_client, mock_logger, mock_client, meeting_time):
+        """Each booking enters and exits the client context."""
+        mock_get_client.return_value = mock_client
+        mock_client.create_flow_run_from_deployment = AsyncMock(
+            side_effect=lambda **kwargs: MagicMock(id=uuid4())
+        )
+
+        async def book_twice():
+            await schedule_precall_reminders("first@example.com", "First", meeting_time)
+            await schedule_precall_reminders("second@example.com", "Second", meeting_time)
+
+        asyncio.run(book_twice())
+
+        assert mock_client.__aenter__.await_count == 2
+        assert mock_client.__aexit__.await_count == 2
@@ -263,6 +263,61 @@ class TestSendLeadNurtureEmails:
         assert "API Error" in str(exc_info.value)
 
 
+class TestResendHttpClient:
+    """Test Resend API calls share one pooled HTTP session."""
+
+    def test_sends_reuse_one_session(self):
+        """Verify consecutive sends go through the same requests.Session."""
+        import resend
+        from campaigns.christmas_campaign.tasks import resend_operations
+
+        client = resend.default_http_client
+        assert isinstance(client, resend_operations._PooledRequestsClient)
+
+        mock_response = MagicMock(status_code=200, headers={"content-type": "application/json"})
+        mock_response.content = b'{"id": "email-id-123"}'
+
+        with patch.object(client._session, "request", return_value=mock_response) as mock_request:
+            for _ in range(2):
+                result = resend_operations.send_email.fn(
+                    to_email="test@example.com",
+                    subject="Test Subject",
+                    html_body="<html><body>Test</body></html>"
+                )
+                assert result == "email-id-123"
+
+        assert mock_request.call_count == 2
+        assert mock_request.call_args.kwargs["url"] == "https://api.resend.com/emails"
+
+    def test_requests_spaced_under_rate_limit(self):
+        """Verify back-to-back requests are paced to RESEND_MAX_REQUESTS_PER_SECOND."""
+        from campaigns.christmas_campaign.tasks import resend_operations
+
+        client = resend_operations._PooledRequestsClient()
+        mock_response = MagicMock(status_code=200, headers={}, content=b"{}")
+
+        with patch.object(client._session, "request", return_value=mock_response), \
+             patch.object(resend_operations.time, "monotonic", return_value=100.0), \
+             patch.object(resend_operations.time, "sleep") as mock_sleep:
+            for _ in range(3):
+                client.request("post", "https://api.resend.com/emails", headers={})
+
+        interval = 1 / resend_operations.RESEND_MAX_REQUESTS_PER_SECOND
+        assert [c.args[0] for c in mock_sleep.call_args_list] == pytest.approx([interval, 2 * interval])
+        client.close()
+
+    def test_session_errors_raised_as_runtime_error(self):
+        """Verify transport errors keep the SDK's RequestsClient contract."""
+        import requests
+        from campaigns.christmas_campaign.tasks import resend_operations
+
+        client = resend_operations._PooledRequestsClient()
+        with patch.object(client._session, "request", side_effect=requests.ConnectionError("reset")):
+            with pytest.raises(RuntimeError, match="Request failed"):
+                client.request("post", "https://api.resend.com/emails", headers={})
+        client.close()
+
+
 # ==============================================================================
 # Feature 0.4: Variable substitution tests will go in test_template_rendering.py
 # ==============================================================================
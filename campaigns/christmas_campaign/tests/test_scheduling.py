@@ -0,0 +1,237 @@
+"""
+Unit tests for shared handler scheduling helpers.
+
+Tests cover:
+- Deployment ID caching
+- TESTING_MODE Secret caching
+- Script entry-point event loop selection
+- Eager concurrent task start
+- Shared email batch scheduling
+- Template Type extraction
+
+Author: Christmas Campaign Team
+Created: 2025-11-27
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+from uuid import uuid4
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from campaigns.christmas_campaign.flows import _scheduling
+from campaigns.christmas_campaign.flows._scheduling import (
+    gather_eager,
+    get_deployment_id,
+    get_template_type,
+    get_testing_mode,
+    run_async,
+    schedule_email_batch
+)
+
+
+class TestDeploymentIdCache:
+    """Test deployment ID caching shared by the handler schedulers."""
+
+    def setup_method(self):
+        _scheduling._DEPLOYMENT_ID_CACHE.clear()
+
+    teardown_method = setup_method
+
+    def test_deployment_lookup_is_cached(self):
+        """Test repeated lookups only hit the Prefect API once."""
+        client = MagicMock()
+        client.read_deployment_by_name = AsyncMock(return_value=MagicMock(id="deployment-123"))
+
+        first = asyncio.run(get_deployment_id(client, "flow/deployment"))
+        second = asyncio.run(get_deployment_id(client, "flow/deployment"))
+
+        assert first == second == "deployment-123"
+        assert client.read_deployment_by_name.await_count == 1
+
+    def test_defaults_to_send_email_deployment(self):
+        """Test the send-email deployment is looked up by default."""
+        client = MagicMock()
+        client.read_deployment_by_name = AsyncMock(return_value=MagicMock(id="deployment-123"))
+
+        asyncio.run(get_deployment_id(client))
+
+        client.read_deployment_by_name.assert_awaited_once_with(
+            _scheduling.SEND_EMAIL_DEPLOYMENT_NAME
+        )
+
+    def test_deployment_lookup_refreshes_after_ttl(self):
+        """Test stale cache entries trigger a fresh lookup."""
+        _scheduling._DEPLOYMENT_ID_CACHE["flow/deployment"] = (
+            "stale-id",
+            -_scheduling.DEPLOYMENT_ID_CACHE_TTL_SECONDS - 1
+        )
+        client = MagicMock()
+        client.read_deployment_by_name = AsyncMock(return_value=MagicMock(id="fresh-id"))
+
+        result = asyncio.run(get_deployment_id(client, "flow/deployment"))
+
+        assert result == "fresh-id"
+        assert client.read_deployment_by_name.await_count == 1
+
+
+class TestTestingModeCache:
+    """Test TESTING_MODE Secret caching shared by the handler schedulers."""
+
+    def setup_method(self):
+        _scheduling._TESTING_MODE_CACHE.clear()
+        _scheduling._env_testing_mode.cache_clear()
+
+    teardown_method = setup_method
+
+    @patch("campaigns.christmas_campaign.flows._scheduling.Secret")
+    def test_secret_is_loaded_once(self, mock_secret):
+        """Test repeated lookups reuse the cached Secret value."""
+        mock_secret.aload = AsyncMock(return_value=MagicMock(get=MagicMock(return_value="true")))
+
+        assert asyncio.run(get_testing_mode(MagicMock())) is True
+        assert asyncio.run(get_testing_mode(MagicMock())) is True
+        assert mock_secret.aload.await_count == 1
+
+    @patch.dict(os.environ, {"TESTING_MODE": "true"})
+    @patch("campaigns.christmas_campaign.flows._scheduling.Secret")
+    def test_env_fallback_is_not_cached(self, mock_secret):
+        """Test Secret load failure falls back to env var and retries next time."""
+        mock_secret.aload = AsyncMock(side_effect=ValueError("block not found"))
+
+        assert asyncio.run(get_testing_mode(MagicMock())) is True
+        assert asyncio.run(get_testing_mode(MagicMock())) is True
+        assert mock_secret.aload.await_count == 2
+
+    @patch("campaigns.christmas_campaign.flows._scheduling.Secret")
+    def test_env_fallback_is_parsed_once(self, mock_secret):
+        """Test the env var fallback is parsed once per process."""
+        mock_secret.aload = AsyncMock(side_effect=ValueError("block not found"))
+
+        with patch.dict(os.environ, {"TESTING_MODE": " True "}):
+            assert asyncio.run(get_testing_mode(MagicMock())) is True
+        with patch.dict(os.environ, {"TESTING_MODE": "false"}):
+            assert asyncio.run(get_testing_mode(MagicMock())) is True
+
+    @patch("campaigns.christmas_campaign.flows._scheduling.Secret")
+    def test_boolean_secret_value(self, mock_secret):
+        """Test boolean Secret values are used as-is."""
+        mock_secret.aload = AsyncMock(return_value=MagicMock(get=MagicMock(return_value=False)))
+
+        assert asyncio.run(get_testing_mode(MagicMock())) is False
+
+
+class TestRunAsync:
+    """Test the event loop used by script entry points."""
+
+    def test_uses_uvloop_when_available(self):
+        """Test coroutines run on uvloop when it is installed."""
+        fake_uvloop = MagicMock()
+        fake_uvloop.run.side_effect = asyncio.run
+
+        async def compute():
+            return 42
+
+        with patch.object(_scheduling, "uvloop", fake_uvloop):
+            assert run_async(compute()) == 42
+        fake_uvloop.run.assert_called_once()
+
+    def test_falls_back_to_asyncio(self):
+        """Test the stdlib loop is used when uvloop is unavailable."""
+        async def compute():
+            return 42
+
+        with patch.object(_scheduling, "uvloop", None):
+            assert run_async(compute()) == 42
+
+
+class TestGatherEager:
+    """Test eager concurrent task start used by the schedulers."""
+
+    def test_results_keep_order(self):
+        """Test results come back in coroutine order, not completion order."""
+        async def delayed(value, delay):
+            await asyncio.sleep(delay)
+            return value
+
+        result = asyncio.run(gather_eager(delayed("a", 0.02), delayed("b", 0), delayed("c", 0.01)))
+
+        assert result == ["a", "b", "c"]
+
+    def test_uses_eager_factory_when_available(self):
+        """Test tasks are created through the eager task factory (Python 3.12+)."""
+        factory = MagicMock(side_effect=lambda loop, coro: loop.create_task(coro))
+
+        async def compute():
+            return 1
+
+        with patch.object(_scheduling, "_EAGER_TASK_FACTORY", factory):
+            assert asyncio.run(gather_eager(compute(), compute())) == [1, 1]
+        assert factory.call_count == 2
+
+    def test_falls_back_without_eager_factory(self):
+        """Test tasks are created normally on older Pythons."""
+        async def compute():
+            return 1
+
+        with patch.object(_scheduling, "_EAGER_TASK_FACTORY", None):
+            assert asyncio.run(gather_eager(compute())) == [1]
+
+
+class TestScheduleEmailBatch:
+    """Test the batch scheduler shared by the onboarding and post-call handlers."""
+
+    @patch("campaigns.christmas_campaign.flows._scheduling.get_deployment_id")
+    @patch("campaigns.christmas_campaign.flows._scheduling.get_client")
+    @patch("campaigns.christmas_campaign.flows._scheduling.get_testing_mode")
+    def test_one_run_per_delay(self, mock_testing_mode, mock_get_client, mock_deployment_id):
+        """Test each delay becomes one flow run with a numbered template."""
+        mock_testing_mode.return_value = False
+        mock_deployment_id.return_value = "deployment-123"
+        client = MagicMock()
+        run_id = uuid4()
+        client.create_flow_run_from_deployment = AsyncMock(return_value=MagicMock(id=run_id))
+        mock_get_client.return_value.__aenter__ = AsyncMock(return_value=client)
+        mock_get_client.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        result = asyncio.run(schedule_email_batch(
+            MagicMock(),
+            sequence_name="Test",
+            template_prefix="test_email_",
+            base_params={"email": "test@example.com", "call_notes": None},
+            production_delays=(timedelta(hours=2), timedelta(hours=48))
+        ))
+
+        assert [r["template_id"] for r in result] == ["test_email_1", "test_email_2"]
+        assert [r["delay_hours"] for r in result] == [2, 48]
+        assert result[0]["flow_run_id"] == str(run_id)
+        # None-valued parameters are not shipped with each flow run
+        params = client.create_flow_run_from_deployment.call_args_list[1].kwargs["parameters"]
+        assert params == {"email": "test@example.com", "template_id": "test_email_2", "email_number": 2}
+
+    def test_format_delays(self):
+        """Test delays render as whole hours or minutes for logging."""
+        assert _scheduling._format_delays((timedelta(hours=1), timedelta(hours=72))) == "1h, 72h"
+        assert _scheduling._format_delays(_scheduling.TESTING_DELAYS) == "1min, 2min, 3min"
+
+
+class TestGetTemplateType:
+    """Test Template Type extraction from existing sequence pages."""
+
+    def test_extracts_template_type(self):
+        """Test the select name is returned when present."""
+        sequence = {"properties": {"Template Type": {"select": {"name": "No-Show Recovery"}}}}
+
+        assert get_template_type(sequence) == "No-Show Recovery"
+
+    @pytest.mark.parametrize("sequence", [
+        {},
+        {"properties": {}},
+        {"properties": {"Template Type": {}}},
+        {"properties": {"Template Type": {"select": None}}},
+    ])
+    def test_missing_template_type_returns_none(self, sequence):
+        """Test missing or empty properties return None."""
+        assert get_template_type(sequence) is None
@@ -12,15 +12,28 @@ Author: Christmas Campaign Team
 Created: 2025-11-28 (Wave 6)
 """
 
+import asyncio
+import threading
 import pytest
 from unittest.mock import MagicMock, patch, AsyncMock
 from datetime import datetime
 
+from campaigns.christmas_campaign.flows.send_email_flow import wait_for_pending_analytics
+
 
 # ==============================================================================
 # Test Fixtures
 # ==============================================================================
 
+@pytest.fixture(autouse=True)
+def clear_template_cache():
+    """Start every test with an empty template cache."""
+    from campaigns.christmas_campaign.tasks.notion_operations import invalidate_template
+    invalidate_template()
+    yield
+    invalidate_template()
+
+
 @pytest.fixture
 def mock_email_sequence_record():
     """Mock Email Sequence DB record from Notion."""
@@ -95,6 +108,12 @@ class TestSendEmailFlowStructure:
         from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
         assert send_email_flow.name == "christmas-send-email"
 
+    def test_flow_is_async(self):
+        """Test the flow is a coroutine function."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+        import inspect
+        assert inspect.iscoroutinefunction(send_email_flow.fn)
+
     def test_flow_accepts_required_parameters(self):
         """Test flow accepts email and email_number parameters."""
         from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
@@ -126,7 +145,7 @@ class TestSequenceLookup:
     """Test Email Sequence DB lookup behavior."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -139,17 +158,17 @@ class TestSequenceLookup:
         # Mock sequence not found
         mock_search.return_value = None
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="unknown@example.com",
             email_number=1
-        )
+        ))
 
         assert result["status"] == "failed"
         assert "sequence not found" in result["error"].lower()
         assert result["email_number"] == 1
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -164,10 +183,10 @@ class TestSequenceLookup:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-id-123"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
         mock_search.assert_called_once_with("test@example.com")
         assert result["status"] == "success"
@@ -182,7 +201,7 @@ class TestIdempotency:
     """Test idempotency checks for duplicate prevention."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     def test_flow_skips_when_email_already_sent(
         self, mock_send, mock_fetch, mock_search, mock_email_sequence_with_sent_email
@@ -192,21 +211,20 @@ class TestIdempotency:
 
         mock_search.return_value = mock_email_sequence_with_sent_email
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1  # Already sent
-        )
+        ))
 
         assert result["status"] == "skipped"
         assert result["reason"] == "already_sent"
         assert "sent_at" in result
 
-        # Verify email was NOT sent
+        # Verify email was NOT sent (the prefetched template is discarded)
         mock_send.assert_not_called()
-        mock_fetch.assert_not_called()
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -221,10 +239,10 @@ class TestIdempotency:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-id-456"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=2  # Not sent yet
-        )
+        ))
 
         assert result["status"] == "success"
         mock_send.assert_called_once()
@@ -238,7 +256,7 @@ class TestTemplateFetching:
     """Test Notion template fetching behavior."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
     def test_flow_fails_when_template_not_found(
         self, mock_analytics, mock_fetch, mock_search, mock_email_sequence_record
@@ -249,16 +267,16 @@ class TestTemplateFetching:
         mock_search.return_value = mock_email_sequence_record
         mock_fetch.return_value = None  # Template not found
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
         assert result["status"] == "failed"
         assert "not found" in result["error"].lower() or "template" in result["error"].lower()
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
     def test_flow_fails_when_template_missing_subject(
         self, mock_analytics, mock_fetch, mock_search, mock_email_sequence_record
@@ -269,16 +287,16 @@ class TestTemplateFetching:
         mock_search.return_value = mock_email_sequence_record
         mock_fetch.return_value = {"html_body": "<p>Test</p>"}  # Missing subject
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
         assert result["status"] == "failed"
         assert "subject" in result["error"].lower() or "missing" in result["error"].lower()
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
     def test_flow_fails_when_template_missing_body(
         self, mock_analytics, mock_fetch, mock_search, mock_email_sequence_record
@@ -289,16 +307,16 @@ class TestTemplateFetching:
         mock_search.return_value = mock_email_sequence_record
         mock_fetch.return_value = {"subject": "Test Subject"}  # Missing body
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
         assert result["status"] == "failed"
         assert "body" in result["error"].lower() or "missing" in result["error"].lower()
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -314,16 +332,125 @@ class TestTemplateFetching:
         mock_send.return_value = "resend-id-789"
 
         # Test CRITICAL segment
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=2,  # Email 2 is segment-specific
             segment="CRITICAL"
-        )
+        ))
 
         # Verify template was fetched
         mock_fetch.assert_called()
         assert result["status"] == "success"
 
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_template_fetched_concurrently_with_sequence(
+        self, mock_analytics, mock_update, mock_send, mock_fetch, mock_search,
+        mock_email_sequence_record, mock_email_template
+    ):
+        """Test the template fetch does not wait for the sequence lookup."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+
+        barrier = threading.Barrier(2, timeout=2)
+
+        def search(email):
+            # Raises BrokenBarrierError if the lookups run one after another
+            barrier.wait()
+            return mock_email_sequence_record
+
+        def fetch(template_id):
+            barrier.wait()
+            return mock_email_template
+
+        mock_search.side_effect = search
+        mock_fetch.side_effect = fetch
+        mock_send.return_value = "resend-id-concurrent"
+
+        result = asyncio.run(send_email_flow(
+            email="test@example.com",
+            email_number=1
+        ))
+
+        assert result["status"] == "success"
+
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
+    def test_template_error_ignored_when_already_sent(
+        self, mock_send, mock_fetch, mock_search, mock_email_sequence_with_sent_email
+    ):
+        """Test a failed template prefetch doesn't turn a skip into a failure."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+
+        mock_search.return_value = mock_email_sequence_with_sent_email
+        mock_fetch.side_effect = Exception("Notion API error")
+
+        result = asyncio.run(send_email_flow(
+            email="test@example.com",
+            email_number=1
+        ))
+
+        assert result["status"] == "skipped"
+        mock_send.assert_not_called()
+
+
+class TestTemplateCache:
+    """Test the in-process email template cache."""
+
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    def test_template_fetched_once_while_fresh(self, mock_fetch, mock_email_template):
+        """Test repeated lookups reuse the cached template."""
+        from campaigns.christmas_campaign.tasks.notion_operations import fetch_email_template_cached
+
+        mock_fetch.return_value = mock_email_template
+
+        assert fetch_email_template_cached("christmas_email_1") == mock_email_template
+        assert fetch_email_template_cached("christmas_email_1") == mock_email_template
+        mock_fetch.assert_called_once_with("christmas_email_1")
+
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    def test_missing_template_not_cached(self, mock_fetch, mock_email_template):
+        """Test a template that was not found is looked up again."""
+        from campaigns.christmas_campaign.tasks.notion_operations import fetch_email_template_cached
+
+        mock_fetch.side_effect = [None, mock_email_template]
+
+        assert fetch_email_template_cached("christmas_email_1") is None
+        assert fetch_email_template_cached("christmas_email_1") == mock_email_template
+        assert mock_fetch.call_count == 2
+
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.TEMPLATE_CACHE_TTL_SECONDS', 0)
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    def test_expired_template_refetched(self, mock_fetch, mock_email_template):
+        """Test a template is fetched again once its TTL has passed."""
+        from campaigns.christmas_campaign.tasks.notion_operations import fetch_email_template_cached
+
+        mock_fetch.return_value = mock_email_template
+
+        fetch_email_template_cached("christmas_email_1")
+        fetch_email_template_cached("christmas_email_1")
+
+        assert mock_fetch.call_count == 2
+
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    def test_invalidated_template_refetched(self, mock_fetch, mock_email_template):
+        """Test invalidating a template forces the next lookup to Notion."""
+        from campaigns.christmas_campaign.tasks.notion_operations import (
+            fetch_email_template_cached,
+            invalidate_template
+        )
+
+        mock_fetch.return_value = mock_email_template
+
+        fetch_email_template_cached("christmas_email_1")
+        invalidate_template("christmas_email_1")
+        fetch_email_template_cached("christmas_email_1")
+
+        assert mock_fetch.call_count == 2
+
 
 # ==============================================================================
 # Email Sending Tests
@@ -333,7 +460,7 @@ class TestEmailSending:
     """Test email sending via Resend."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -348,13 +475,13 @@ class TestEmailSending:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-success-id"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1,
             first_name="John",
             business_name="Test Corp",
             assessment_score=75
-        )
+        ))
 
         # Verify send_template_email was called
         mock_send.assert_called_once()
@@ -364,7 +491,7 @@ class TestEmailSending:
         assert result["resend_email_id"] == "resend-success-id"
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
     def test_flow_handles_send_failure(
@@ -378,14 +505,21 @@ class TestEmailSending:
         mock_fetch.return_value = mock_email_template
         mock_send.side_effect = Exception("Resend API error")
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
         assert result["status"] == "failed"
         assert "error" in result
 
+        # Failure analytics are written in the background, outside any task run
+        wait_for_pending_analytics(timeout=5)
+        mock_analytics.assert_not_called()
+        call_kwargs = mock_analytics.fn.call_args[1]
+        assert call_kwargs["status"] == "failed"
+        assert call_kwargs["error_message"] == "Resend API error"
+
 
 # ==============================================================================
 # Sequence Update Tests
@@ -395,7 +529,7 @@ class TestSequenceUpdate:
     """Test Email Sequence DB update after sending."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -410,10 +544,10 @@ class TestSequenceUpdate:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-id-update"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=3
-        )
+        ))
 
         # Verify update_email_sequence was called with correct params
         mock_update.assert_called_once_with(
@@ -422,6 +556,37 @@ class TestSequenceUpdate:
         )
         assert result["status"] == "success"
 
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_sent_at_taken_from_notion_update(
+        self, mock_analytics, mock_update, mock_send, mock_fetch, mock_search,
+        mock_email_sequence_record, mock_email_template
+    ):
+        """Test sent_at reports the timestamp Notion stored on the sequence."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+
+        mock_search.return_value = mock_email_sequence_record
+        mock_fetch.return_value = mock_email_template
+        mock_send.return_value = "resend-id-update"
+        mock_update.return_value = {
+            "id": "sequence-page-id-123",
+            "properties": {"Email 3 Sent": {"date": {"start": "2025-11-28T09:00:00.000+00:00"}}}
+        }
+
+        result = asyncio.run(send_email_flow(
+            email="test@example.com",
+            email_number=3
+        ))
+
+        assert result["sent_at"] == "2025-11-28T09:00:00.000+00:00"
+
+        # The analytics row records the same timestamp
+        wait_for_pending_analytics(timeout=5)
+        assert mock_analytics.fn.call_args[1]["sent_at"] == "2025-11-28T09:00:00.000+00:00"
+
 
 # ==============================================================================
 # Analytics Logging Tests
@@ -431,7 +596,7 @@ class TestAnalyticsLogging:
     """Test email analytics logging."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -446,19 +611,114 @@ class TestAnalyticsLogging:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-analytics-id"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1
-        )
+        ))
 
-        # Verify analytics was logged
-        mock_analytics.assert_called_once()
-        call_kwargs = mock_analytics.call_args[1]
+        # Verify analytics was logged (written in the background)
+        wait_for_pending_analytics(timeout=5)
+        mock_analytics.fn.assert_called_once()
+        call_kwargs = mock_analytics.fn.call_args[1]
 
         assert call_kwargs["email"] == "test@example.com"
         assert call_kwargs["email_number"] == 1
         assert call_kwargs["status"] == "sent"
 
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_failed_sequence_update_logs_only_failure_analytics(
+        self, mock_analytics, mock_update, mock_send, mock_fetch, mock_search,
+        mock_email_sequence_record, mock_email_template
+    ):
+        """Test a failed sequence update leaves one "failed" analytics row, not "sent" too."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+
+        mock_search.return_value = mock_email_sequence_record
+        mock_fetch.return_value = mock_email_template
+        mock_send.return_value = "resend-analytics-id"
+        mock_update.side_effect = Exception("Notion API error")
+
+        result = asyncio.run(send_email_flow(
+            email="test@example.com",
+            email_number=1
+        ))
+
+        assert result["status"] == "failed"
+        wait_for_pending_analytics(timeout=5)
+        assert [c[1]["status"] for c in mock_analytics.fn.call_args_list] == ["failed"]
+
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_flow_returns_without_waiting_for_analytics(
+        self, mock_analytics, mock_update, mock_send, mock_fetch, mock_search,
+        mock_email_sequence_record, mock_email_template
+    ):
+        """Test a slow or failing analytics write doesn't hold up the flow."""
+        from campaigns.christmas_campaign.flows.send_email_flow import send_email_flow
+
+        release = threading.Event()
+
+        def slow_failing_analytics(**kwargs):
+            release.wait(timeout=5)
+            raise Exception("Notion API error")
+
+        mock_search.return_value = mock_email_sequence_record
+        mock_fetch.return_value = mock_email_template
+        mock_send.return_value = "resend-background-id"
+        mock_analytics.fn.side_effect = slow_failing_analytics
+
+        result = asyncio.run(send_email_flow(
+            email="test@example.com",
+            email_number=1
+        ))
+
+        assert result["status"] == "success"
+        assert not release.is_set()
+
+        release.set()
+        wait_for_pending_analytics(timeout=5)
+        mock_analytics.fn.assert_called_once()
+
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.ANALYTICS_MAX_PENDING', 1)
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_full_queue_drops_entries(self, mock_analytics):
+        """Test analytics entries are dropped once the queue is full."""
+        from campaigns.christmas_campaign.flows.send_email_flow import _log_analytics_in_background
+
+        release = threading.Event()
+        mock_analytics.fn.side_effect = lambda **kwargs: release.wait(timeout=5)
+
+        try:
+            assert _log_analytics_in_background(email="first@example.com") is True
+            assert _log_analytics_in_background(email="second@example.com") is False
+        finally:
+            release.set()
+            wait_for_pending_analytics(timeout=5)
+
+        mock_analytics.fn.assert_called_once_with(email="first@example.com")
+
+    @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
+    def test_background_write_skips_task_and_logs_errors(self, mock_analytics, caplog):
+        """Test background writes call the plain function and log failures."""
+        from campaigns.christmas_campaign.flows.send_email_flow import _log_analytics_in_background
+
+        mock_analytics.fn.side_effect = Exception("Notion API error")
+
+        with caplog.at_level("WARNING", logger="campaigns.christmas_campaign.flows.send_email_flow"):
+            assert _log_analytics_in_background(email="test@example.com") is True
+            wait_for_pending_analytics(timeout=5)
+
+        mock_analytics.assert_not_called()
+        mock_analytics.fn.assert_called_once_with(email="test@example.com")
+        assert "Failed to log email analytics: Notion API error" in caplog.text
+
 
 # ==============================================================================
 # End-to-End Flow Tests
@@ -468,7 +728,7 @@ class TestSendEmailFlowE2E:
     """End-to-end tests for send_email_flow."""
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -483,14 +743,14 @@ class TestSendEmailFlowE2E:
         mock_fetch.return_value = mock_email_template
         mock_send.return_value = "resend-e2e-id"
 
-        result = send_email_flow(
+        result = asyncio.run(send_email_flow(
             email="test@example.com",
             email_number=1,
             first_name="John",
             business_name="Test Corp",
             segment="URGENT",
             assessment_score=55
-        )
+        ))
 
         # Verify all steps completed
         assert result["status"] == "success"
@@ -505,10 +765,11 @@ class TestSendEmailFlowE2E:
         mock_fetch.assert_called_once()
         mock_send.assert_called_once()
         mock_update.assert_called_once()
-        mock_analytics.assert_called_once()
+        wait_for_pending_analytics(timeout=5)
+        mock_analytics.fn.assert_called_once()
 
     @patch('campaigns.christmas_campaign.flows.send_email_flow.search_email_sequence_by_email')
-    @patch('campaigns.christmas_campaign.flows.send_email_flow.fetch_email_template')
+    @patch('campaigns.christmas_campaign.tasks.notion_operations.fetch_email_template')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.send_template_email')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.update_email_sequence')
     @patch('campaigns.christmas_campaign.flows.send_email_flow.log_email_analytics')
@@ -524,10 +785,10 @@ class TestSendEmailFlowE2E:
         mock_send.return_value = "resend-id"
 
         for email_num in range(1, 8):
-            result = send_email_flow(
+            result = asyncio.run(send_email_flow(
                 email="test@example.com",
                 email_number=email_num
-            )
+            ))
 
             assert result["status"] == "success"
             assert result["email_number"] == email_num
@@ -12,13 +12,19 @@ Author: Christmas Campaign Team
 Created: 2025-11-19
 """
 
+import asyncio
+import threading
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
+from datetime import datetime, timedelta
 from typing import Dict, Any
+from uuid import uuid4
 
 # Import flow to test
-from campaigns.christmas_campaign.flows.signup_handler import signup_handler_flow
+from campaigns.christmas_campaign.flows.signup_handler import (
+    signup_handler_flow,
+    schedule_email_sequence  # Real function - conftest mocks the module attribute
+)
 
 
 # ==============================================================================
@@ -58,7 +64,7 @@ def test_signup_handler_new_contact_success(
     }
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
@@ -69,7 +75,7 @@ def test_signup_handler_new_contact_success(
         green_systems=3,
         gps_score=45,
         money_score=38
-    )
+    ))
 
     # Assertions
     assert result["status"] == "success"
@@ -91,7 +97,8 @@ def test_signup_handler_new_contact_success(
 # ==============================================================================
 
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
-def test_signup_handler_duplicate_with_emails_sent(mock_search_sequence):
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+def test_signup_handler_duplicate_with_emails_sent(mock_search_contact, mock_search_sequence):
     """Test that duplicate signups are detected and skipped if emails already sent."""
 
     # Mock: Existing sequence with emails already sent
@@ -111,13 +118,13 @@ def test_signup_handler_duplicate_with_emails_sent(mock_search_sequence):
     }
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52,
         red_systems=2
-    )
+    ))
 
     # Assertions
     assert result["status"] == "skipped"
@@ -159,13 +166,13 @@ def test_signup_handler_duplicate_no_emails_sent(
     mock_search_contact.return_value = {"id": "contact-123"}
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52,
         red_systems=2
-    )
+    ))
 
     # Assertions - should continue with existing sequence
     assert result["status"] == "success"
@@ -188,14 +195,14 @@ def test_segment_classification_critical(
     mock_search_contact.return_value = {"id": "contact-123"}
     mock_create.return_value = {"id": "seq-123"}
 
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Corp",
         assessment_score=20,
         red_systems=3,  # >= 2 = CRITICAL
         orange_systems=1
-    )
+    ))
 
     assert result["segment"] == "CRITICAL"
 
@@ -213,14 +220,14 @@ def test_segment_classification_urgent_red(
     mock_search_contact.return_value = {"id": "contact-123"}
     mock_create.return_value = {"id": "seq-123"}
 
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Corp",
         assessment_score=35,
         red_systems=1,  # == 1 = URGENT
         orange_systems=1
-    )
+    ))
 
     assert result["segment"] == "URGENT"
 
@@ -238,14 +245,14 @@ def test_segment_classification_urgent_orange(
     mock_search_contact.return_value = {"id": "contact-123"}
     mock_create.return_value = {"id": "seq-123"}
 
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Corp",
         assessment_score=40,
         red_systems=0,
         orange_systems=3  # >= 2 = URGENT
-    )
+    ))
 
     assert result["segment"] == "URGENT"
 
@@ -263,7 +270,7 @@ def test_segment_classification_optimize(
     mock_search_contact.return_value = {"id": "contact-123"}
     mock_create.return_value = {"id": "seq-123"}
 
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="test@example.com",
         first_name="Test",
         business_name="Test Corp",
@@ -272,7 +279,7 @@ def test_segment_classification_optimize(
         orange_systems=1,  # < 2 = OPTIMIZE
         yellow_systems=3,
         green_systems=4
-    )
+    ))
 
     assert result["segment"] == "OPTIMIZE"
 
@@ -300,13 +307,13 @@ def test_signup_handler_no_existing_contact(
     mock_create_sequence.return_value = {"id": "seq-new-123"}
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="new@example.com",
         first_name="New",
         business_name="New Corp",
         assessment_score=50,
         red_systems=1
-    )
+    ))
 
     # Assertions - should succeed with sequence creation only
     assert result["status"] == "success"
@@ -340,7 +347,7 @@ def test_orchestrator_receives_complete_context(
     mock_create_sequence.return_value = {"id": "seq-456"}
 
     # Run flow with full data
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
@@ -354,7 +361,7 @@ def test_orchestrator_receives_complete_context(
         weakest_system_1="GPS",
         weakest_system_2="Money",
         revenue_leak_total=14700
-    )
+    ))
 
     # Verify flow completed successfully with all data
     assert result["status"] == "success"
@@ -368,21 +375,23 @@ def test_orchestrator_receives_complete_context(
 # ==============================================================================
 
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
-def test_signup_handler_notion_api_error(mock_search_sequence):
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+def test_signup_handler_notion_api_error(mock_search_contact, mock_search_sequence):
     """Test flow handles Notion API errors gracefully."""
 
     # Mock: Notion API raises exception
     mock_search_sequence.side_effect = Exception("Notion API connection failed")
+    mock_search_contact.return_value = None
 
     # Run flow - should raise exception (Prefect will handle retries)
     with pytest.raises(Exception, match="Notion API connection failed"):
-        signup_handler_flow(
+        asyncio.run(signup_handler_flow(
             email="test@example.com",
             first_name="Test",
             business_name="Test Corp",
             assessment_score=50,
             red_systems=1
-        )
+        ))
 
 
 # ==============================================================================
@@ -408,7 +417,7 @@ def test_create_email_sequence_called_with_correct_params(
     mock_create_sequence.return_value = {"id": "seq-456"}
 
     # Run flow
-    signup_handler_flow(
+    asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
@@ -417,7 +426,7 @@ def test_create_email_sequence_called_with_correct_params(
         orange_systems=1,
         yellow_systems=2,
         green_systems=3
-    )
+    ))
 
     # Verify create_email_sequence called with correct params
     mock_create_sequence.assert_called_once_with(
@@ -452,7 +461,7 @@ def test_update_assessment_data_called_with_correct_params(
     mock_create_sequence.return_value = {"id": "seq-456"}
 
     # Run flow
-    signup_handler_flow(
+    asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
@@ -461,7 +470,7 @@ def test_update_assessment_data_called_with_correct_params(
         orange_systems=1,
         yellow_systems=2,
         green_systems=3
-    )
+    ))
 
     # Verify update_assessment_data called with correct params
     mock_update_assessment.assert_called_once_with(
@@ -482,7 +491,7 @@ def test_update_assessment_data_called_with_correct_params(
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
 @patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
-@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
 def test_schedule_email_sequence_called_correctly(
     mock_schedule,
     mock_create,
@@ -496,19 +505,19 @@ def test_schedule_email_sequence_called_correctly(
     mock_search_contact.return_value = {"id": "contact-123"}
     mock_create.return_value = {"id": "seq-456"}
     mock_schedule.return_value = [
-        {"email_number": 2, "flow_run_id": "run-1", "scheduled_time": "2025-11-20T10:00:00"},
-        {"email_number": 3, "flow_run_id": "run-2", "scheduled_time": "2025-11-22T10:00:00"}
+        {"email_number": n, "flow_run_id": f"run-{n - 1}", "scheduled_time": "2025-11-20T10:00:00"}
+        for n in range(2, 6)
     ]
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52,
         red_systems=2,
         orange_systems=1
-    )
+    ))
 
     # Verify schedule_email_sequence was called
     assert mock_schedule.called
@@ -519,13 +528,13 @@ def test_schedule_email_sequence_called_correctly(
 
     # Verify result includes orchestrator info
     assert result["orchestrator_result"]["status"] == "success"
-    assert result["orchestrator_result"]["scheduled_count"] == 2
+    assert result["orchestrator_result"]["scheduled_count"] == 4
 
 
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
 @patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
 @patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
-@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
 def test_schedule_email_sequence_failure_handled(
     mock_schedule,
     mock_create,
@@ -541,13 +550,13 @@ def test_schedule_email_sequence_failure_handled(
     mock_schedule.side_effect = Exception("Prefect deployment not found")
 
     # Run flow - should succeed even if scheduling fails
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52,
         red_systems=2
-    )
+    ))
 
     # Verify signup succeeded but orchestrator failed
     assert result["status"] == "success"
@@ -575,7 +584,7 @@ def test_signup_with_optional_params(
     mock_create.return_value = {"id": "seq-456"}
 
     # Run flow with ALL optional params
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
@@ -590,7 +599,7 @@ def test_signup_with_optional_params(
         weakest_system_2="Money",
         strongest_system="People",
         revenue_leak_total=14700
-    )
+    ))
 
     # Verify successful completion
     assert result["status"] == "success"
@@ -612,12 +621,12 @@ def test_signup_with_minimal_params(
     mock_create.return_value = {"id": "seq-456"}
 
     # Run flow with ONLY required params
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52
-    )
+    ))
 
     # Verify successful completion
     assert result["status"] == "success"
@@ -644,13 +653,13 @@ def test_result_contains_all_required_fields(
     mock_create.return_value = {"id": "seq-456"}
 
     # Run flow
-    result = signup_handler_flow(
+    result = asyncio.run(signup_handler_flow(
         email="sarah@example.com",
         first_name="Sarah",
         business_name="Sarah's Salon",
         assessment_score=52,
         red_systems=2
-    )
+    ))
 
     # Verify all required fields present
     assert "status" in result
@@ -670,3 +679,380 @@ def test_result_contains_all_required_fields(
     assert isinstance(result["campaign"], str)
     assert isinstance(result["timestamp"], str)
     assert isinstance(result["orchestrator_result"], dict)
+
+
+# ==============================================================================
+# Test: Prefect Client / Deployment Reuse
+# ==============================================================================
+
+@pytest.fixture
+def mock_prefect_client():
+    """Mock Prefect client returned by get_client(), with scheduling caches reset."""
+    from campaigns.christmas_campaign.flows import _scheduling, signup_handler
+
+    client = MagicMock()
+    client.__aenter__ = AsyncMock(return_value=client)
+    client.__aexit__ = AsyncMock(return_value=False)
+    client.read_deployment_by_name = AsyncMock(return_value=MagicMock(id=uuid4()))
+    client.create_flow_run_from_deployment = AsyncMock(side_effect=lambda **kwargs: MagicMock(id=uuid4()))
+
+    secret = MagicMock()
+    secret.get.return_value = False
+
+    signup_handler._PREFECT_SEM = None
+    signup_handler._PREFECT_SEM_LOOP = None
+    _scheduling._DEPLOYMENT_ID_CACHE.clear()
+    _scheduling._TESTING_MODE_CACHE.clear()
+    with patch('campaigns.christmas_campaign.flows.signup_handler.get_client', return_value=client), \
+         patch('campaigns.christmas_campaign.flows._scheduling.Secret.aload', AsyncMock(return_value=secret)), \
+         patch('campaigns.christmas_campaign.flows.signup_handler.get_run_logger'):
+        yield client
+    signup_handler._PREFECT_SEM = None
+    signup_handler._PREFECT_SEM_LOOP = None
+    _scheduling._DEPLOYMENT_ID_CACHE.clear()
+    _scheduling._TESTING_MODE_CACHE.clear()
+
+
+def test_deployment_looked_up_once_across_signups(mock_prefect_client):
+    """Test the send-email deployment ID is resolved once and reused."""
+    for email in ("first@example.com", "second@example.com"):
+        scheduled = asyncio.run(schedule_email_sequence(
+            email=email,
+            first_name="Test",
+            business_name="Test Corp",
+            segment="OPTIMIZE",
+            assessment_score=70
+        ))
+        assert [flow["email_number"] for flow in scheduled] == [2, 3, 4, 5]
+
+    mock_prefect_client.read_deployment_by_name.assert_awaited_once_with(
+        "christmas-send-email/christmas-send-email"
+    )
+    assert mock_prefect_client.create_flow_run_from_deployment.await_count == 8
+
+
+def test_client_is_closed_after_scheduling(mock_prefect_client):
+    """Test each signup enters and exits the client context."""
+    async def schedule_twice():
+        for _ in range(2):
+            await schedule_email_sequence(
+                email="sarah@example.com",
+                first_name="Sarah",
+                business_name="Sarah's Salon",
+                segment="CRITICAL",
+                assessment_score=52
+            )
+
+    asyncio.run(schedule_twice())
+
+    assert mock_prefect_client.__aenter__.await_count == 2
+    assert mock_prefect_client.__aexit__.await_count == 2
+
+
+def test_flow_runs_created_concurrently(mock_prefect_client):
+    """Test all flow runs are created at once rather than one after another."""
+    barrier = asyncio.Barrier(4)
+
+    async def create_flow_run(**kwargs):
+        # Only completes once all 4 creates are in flight
+        await asyncio.wait_for(barrier.wait(), timeout=5)
+        return MagicMock(id=uuid4())
+
+    mock_prefect_client.create_flow_run_from_deployment.side_effect = create_flow_run
+
+    scheduled = asyncio.run(schedule_email_sequence(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        segment="CRITICAL",
+        assessment_score=52
+    ))
+
+    assert [flow["email_number"] for flow in scheduled] == [2, 3, 4, 5]
+
+
+def test_failed_flow_run_does_not_drop_others(mock_prefect_client):
+    """Test one failed flow run creation keeps the emails that were scheduled."""
+    async def create_flow_run(**kwargs):
+        if kwargs["parameters"]["email_number"] == 3:
+            raise Exception("Prefect API timeout")
+        return MagicMock(id=uuid4())
+
+    mock_prefect_client.create_flow_run_from_deployment.side_effect = create_flow_run
+
+    scheduled = asyncio.run(schedule_email_sequence(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        segment="CRITICAL",
+        assessment_score=52
+    ))
+
+    assert [flow["email_number"] for flow in scheduled] == [2, 4, 5]
+
+
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
+def test_failed_flow_run_reported_as_partial(
+    mock_schedule,
+    mock_create,
+    mock_search_contact,
+    mock_search_sequence
+):
+    """Test the flow result names the emails that could not be scheduled."""
+    mock_search_sequence.return_value = None
+    mock_search_contact.return_value = None
+    mock_create.return_value = {"id": "seq-456"}
+    # Email 3's flow run creation failed
+    mock_schedule.return_value = [
+        {"email_number": n, "flow_run_id": f"run-{n}", "scheduled_time": "2025-11-20T10:00:00"}
+        for n in (2, 4, 5)
+    ]
+
+    result = asyncio.run(signup_handler_flow(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        assessment_score=52
+    ))
+
+    orchestrator_result = result["orchestrator_result"]
+    assert orchestrator_result["status"] == "partial"
+    assert orchestrator_result["scheduled_count"] == 3
+    assert orchestrator_result["failed_count"] == 1
+    assert orchestrator_result["failed_emails"] == [3]
+
+
+def test_all_flow_runs_failed_raises(mock_prefect_client):
+    """Test scheduling fails when no flow run could be created."""
+    mock_prefect_client.create_flow_run_from_deployment.side_effect = Exception("Prefect API down")
+
+    with pytest.raises(Exception, match="Prefect API down"):
+        asyncio.run(schedule_email_sequence(
+            email="sarah@example.com",
+            first_name="Sarah",
+            business_name="Sarah's Salon",
+            segment="CRITICAL",
+            assessment_score=52
+        ))
+
+
+def test_testing_mode_secret_loaded_once_across_signups(mock_prefect_client):
+    """Test the testing-mode Secret block is loaded once and reused."""
+    from campaigns.christmas_campaign.flows import _scheduling
+
+    for email in ("first@example.com", "second@example.com"):
+        scheduled = asyncio.run(schedule_email_sequence(
+            email=email,
+            first_name="Test",
+            business_name="Test Corp",
+            segment="OPTIMIZE",
+            assessment_score=70
+        ))
+        assert scheduled[0]["delay_hours"] == 24  # Production delays
+
+    _scheduling.Secret.aload.assert_awaited_once_with("testing-mode")
+
+
+def test_flow_run_parameters_per_email(mock_prefect_client):
+    """Test each flow run gets the shared contact data plus its own email number."""
+    asyncio.run(schedule_email_sequence(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        segment="CRITICAL",
+        assessment_score=52,
+        red_systems=2,
+        start_from_email=4
+    ))
+
+    parameters = [
+        call.kwargs["parameters"]
+        for call in mock_prefect_client.create_flow_run_from_deployment.call_args_list
+    ]
+    assert [params["email_number"] for params in parameters] == [4, 5]
+    for params in parameters:
+        assert params["email"] == "sarah@example.com"
+        assert params["segment"] == "CRITICAL"
+        assert params["red_systems"] == 2
+
+
+def test_flow_is_async():
+    """Test the signup flow is a native async flow (no nested event loop)."""
+    assert asyncio.iscoroutinefunction(signup_handler_flow.fn)
+    assert asyncio.iscoroutinefunction(schedule_email_sequence)
+
+
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.update_assessment_data')
+@patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
+def test_notion_searches_run_concurrently(
+    mock_schedule,
+    mock_create_sequence,
+    mock_update_assessment,
+    mock_search_contact,
+    mock_search_sequence
+):
+    """Test the sequence and contact lookups run at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+
+    def search_sequence(email):
+        # Only returns once both searches are in flight
+        barrier.wait()
+        return None
+
+    def search_contact(email):
+        barrier.wait()
+        return {"id": "contact-123", "properties": {}}
+
+    mock_search_sequence.side_effect = search_sequence
+    mock_search_contact.side_effect = search_contact
+    mock_create_sequence.return_value = {"id": "sequence-456"}
+    mock_schedule.return_value = []
+
+    result = asyncio.run(signup_handler_flow(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        assessment_score=52
+    ))
+
+    assert result["status"] == "success"
+    assert result["contact_id"] == "contact-123"
+
+
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.update_assessment_data')
+@patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
+def test_notion_writes_run_off_event_loop(
+    mock_schedule,
+    mock_create_sequence,
+    mock_update_assessment,
+    mock_search_contact,
+    mock_search_sequence
+):
+    """Test the blocking Notion writes run in worker threads, not on the event loop."""
+    threads = {}
+
+    def update_assessment(**kwargs):
+        threads["update"] = threading.current_thread()
+        return {"id": "contact-123"}
+
+    def create_sequence(**kwargs):
+        threads["create"] = threading.current_thread()
+        return {"id": "sequence-456"}
+
+    mock_search_sequence.return_value = None
+    mock_search_contact.return_value = {"id": "contact-123", "properties": {}}
+    mock_update_assessment.side_effect = update_assessment
+    mock_create_sequence.side_effect = create_sequence
+    mock_schedule.return_value = []
+
+    asyncio.run(signup_handler_flow(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        assessment_score=52
+    ))
+
+    assert threads["update"] is not threading.main_thread()
+    assert threads["create"] is not threading.main_thread()
+
+
+def test_scheduled_times_share_base_time(mock_prefect_client):
+    """Test every email is offset from the same base time."""
+    scheduled = asyncio.run(schedule_email_sequence(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        segment="CRITICAL",
+        assessment_score=52
+    ))
+
+    base_times = {
+        datetime.fromisoformat(flow["scheduled_time"]) - timedelta(hours=flow["delay_hours"])
+        for flow in scheduled
+    }
+    assert len(base_times) == 1
+    # Anchored in UTC, so Prefect schedules the same instant on any host
+    assert all(base_time.utcoffset() == timedelta(0) for base_time in base_times)
+
+
+def test_completed_sequence_skips_prefect_calls(mock_prefect_client):
+    """Test nothing is looked up or created when no emails are left to schedule."""
+    scheduled = asyncio.run(schedule_email_sequence(
+        email="sarah@example.com",
+        first_name="Sarah",
+        business_name="Sarah's Salon",
+        segment="CRITICAL",
+        assessment_score=52,
+        start_from_email=6
+    ))
+
+    assert scheduled == []
+    mock_prefect_client.__aenter__.assert_not_called()
+    mock_prefect_client.read_deployment_by_name.assert_not_called()
+    mock_prefect_client.create_flow_run_from_deployment.assert_not_called()
+
+
+def test_flow_run_creates_bounded_by_semaphore(mock_prefect_client):
+    """Test no more than PREFECT_MAX_CONCURRENT_SCHEDULES creates are in flight."""
+    in_flight = 0
+    peak = 0
+
+    async def create_flow_run(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return MagicMock(id=uuid4())
+
+    mock_prefect_client.create_flow_run_from_deployment.side_effect = create_flow_run
+
+    with patch('campaigns.christmas_campaign.flows.signup_handler.PREFECT_MAX_CONCURRENT_SCHEDULES', 2):
+        scheduled = asyncio.run(schedule_email_sequence(
+            email="sarah@example.com",
+            first_name="Sarah",
+            business_name="Sarah's Salon",
+            segment="CRITICAL",
+            assessment_score=52
+        ))
+
+    assert len(scheduled) == 4
+    assert peak == 2
+
+
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_email_sequence_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.search_contact_by_email')
+@patch('campaigns.christmas_campaign.flows.signup_handler.update_assessment_data')
+@patch('campaigns.christmas_campaign.flows.signup_handler.create_email_sequence')
+@patch('campaigns.christmas_campaign.flows.signup_handler.schedule_email_sequence', new_callable=AsyncMock)
+def test_failed_contact_update_skips_sequence_create(
+    mock_schedule,
+    mock_create_sequence,
+    mock_update_assessment,
+    mock_search_contact,
+    mock_search_sequence
+):
+    """Test the sequence is only created after the contact update succeeds."""
+    mock_search_sequence.return_value = None
+    mock_search_contact.return_value = {"id": "contact-123", "properties": {}}
+    mock_update_assessment.side_effect = RuntimeError("Notion API error")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(signup_handler_flow(
+            email="sarah@example.com",
+            first_name="Sarah",
+            business_name="Sarah's Salon",
+            assessment_score=52
+        ))
+
+    mock_create_sequence.assert_not_called()
+    mock_schedule.assert_not_called()
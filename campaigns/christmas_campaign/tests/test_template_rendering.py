@@ -202,6 +202,20 @@ class TestTemplateVariableRendering:
 
         assert result == "Mike, your CRITICAL results are ready"
 
+    def test_render_values_inserted_literally(self):
+        """Verify values are not re-scanned or treated as regex replacements."""
+        from campaigns.christmas_campaign.tasks import resend_operations
+
+        template = "Path: {{path}}, Note: {{note}}"
+        variables = {
+            "path": r"C:\\new\1",
+            "note": "{{path}}"
+        }
+
+        result = resend_operations.substitute_variables.fn(template, variables)
+
+        assert result == r"Path: C:\\new\1, Note: {{path}}"
+
 
 class TestSendTemplateEmail:
     """Test send_template_email function with variable substitution."""
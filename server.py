@@ -463,23 +463,26 @@ async def christmas_signup_webhook(
         # Import Christmas campaign signup handler
         from campaigns.christmas_campaign.flows.signup_handler import signup_handler_flow
 
-        # Trigger Prefect flow in background
-        background_tasks.add_task(
-            signup_handler_flow,
-            email=request.email,
-            first_name=request.first_name,
-            business_name=request.business_name or "your business",
-            assessment_score=request.assessment_score,
-            red_systems=request.red_systems,
-            orange_systems=request.orange_systems,
-            yellow_systems=request.yellow_systems,
-            green_systems=request.green_systems,
-            gps_score=request.gps_score,
-            money_score=request.money_score,
-            weakest_system_1=request.weakest_system_1,
-            weakest_system_2=request.weakest_system_2,
-            revenue_leak_total=request.revenue_leak_total
-        )
+        # Trigger Prefect flow in background (async flow runs on the server's loop)
+        async def run_flow():
+            result = await signup_handler_flow(
+                email=request.email,
+                first_name=request.first_name,
+                business_name=request.business_name or "your business",
+                assessment_score=request.assessment_score,
+                red_systems=request.red_systems,
+                orange_systems=request.orange_systems,
+                yellow_systems=request.yellow_systems,
+                green_systems=request.green_systems,
+                gps_score=request.gps_score,
+                money_score=request.money_score,
+                weakest_system_1=request.weakest_system_1,
+                weakest_system_2=request.weakest_system_2,
+                revenue_leak_total=request.revenue_leak_total
+            )
+            logger.info(f"✅ Christmas signup flow completed: {result.get('status')}")
+
+        background_tasks.add_task(run_flow)
 
         logger.info(f"✅ Christmas signup flow queued for {request.email}")
 
@@ -578,15 +581,19 @@ async def calcom_booking_webhook(
         logger.info(f"📅 Booking details: {customer_email}, meeting at {meeting_time}")
 
         # Import pre-call prep flow
-        from campaigns.christmas_campaign.flows.precall_prep_flow import precall_prep_flow_sync
+        from campaigns.christmas_campaign.flows.precall_prep_flow import precall_prep_flow
+
+        # Trigger flow in background (on the server's event loop, so the shared
+        # Prefect client and caches stay warm across bookings)
+        async def run_flow():
+            result = await precall_prep_flow(
+                email=customer_email,
+                name=customer_name,
+                meeting_time=meeting_time
+            )
+            logger.info(f"✅ Pre-call prep flow completed: {result.get('status')}")
 
-        # Trigger Prefect flow in background
-        background_tasks.add_task(
-            precall_prep_flow_sync,
-            email=customer_email,
-            name=customer_name,
-            meeting_time=meeting_time
-        )
+        background_tasks.add_task(run_flow)
 
         logger.info(f"✅ Pre-call prep flow queued for {customer_email}")
 
@@ -806,8 +813,8 @@ async def calendly_noshow_webhook(request: CalendlyNoShowRequest, background_tas
         from campaigns.christmas_campaign.flows.noshow_recovery_handler import noshow_recovery_handler_flow
 
         # Trigger flow in background
-        def run_flow():
-            result = noshow_recovery_handler_flow(
+        async def run_flow():
+            result = await noshow_recovery_handler_flow(
                 email=request.email,
                 first_name=request.first_name,
                 business_name=request.business_name,
@@ -857,8 +864,8 @@ async def postcall_maybe_webhook(request: PostCallMaybeRequest, background_tasks
         from campaigns.christmas_campaign.flows.postcall_maybe_handler import postcall_maybe_handler_flow
 
         # Trigger flow in background
-        def run_flow():
-            result = postcall_maybe_handler_flow(
+        async def run_flow():
+            result = await postcall_maybe_handler_flow(
                 email=request.email,
                 first_name=request.first_name,
                 business_name=request.business_name,
@@ -906,11 +913,23 @@ async def onboarding_start_webhook(request: OnboardingStartRequest, background_t
 
     try:
         # Import flow
-        from campaigns.christmas_campaign.flows.onboarding_handler import onboarding_handler_flow
+        from campaigns.christmas_campaign.flows.onboarding_handler import (
+            onboarding_handler_flow,
+            should_handle_onboarding
+        )
+
+        # Skip the flow run entirely for requests the flow would reject
+        if not should_handle_onboarding(request.payment_confirmed, request.email):
+            logger.info(f"⏭️  Ignoring onboarding webhook for {request.email}: payment not confirmed or invalid email")
+            return {
+                "status": "ignored",
+                "message": "Payment not confirmed or invalid email",
+                "email": request.email
+            }
 
         # Trigger flow in background
-        def run_flow():
-            result = onboarding_handler_flow(
+        async def run_flow():
+            result = await onboarding_handler_flow(
                 email=request.email,
                 first_name=request.first_name,
                 business_name=request.business_name,